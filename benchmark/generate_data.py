@@ -0,0 +1,329 @@
+"""
+================================================================================
+FILE: generate_data.py
+================================================================================
+
+PURPOSE:
+    Generate a synthetic copy of the four raw tables into a local DuckDB
+    file so the dbt project can be run and benchmarked offline with
+    `--target duckdb`, at a chosen multiple of the base data volume.
+
+TABLES (schema raw):
+    listings             One row per listing, amenities as a JSON array string
+    calendar             One row per listing per day (2021-06-01 .. 2022-07-31)
+    generated_reviews    0-8 reviews per listing, at most one per day
+    amenities_changelog  0-3 amenity snapshots per listing (0-N with
+                         --amenity-changes N, e.g. to stress the SCD joins)
+
+SCALES:
+    1x = 200 listings (~85k calendar rows), 10x = 2,000, 100x = 20,000
+    (~8.5M calendar rows). All values are derived from hash(seed, key), so
+    the same seed and scale always produce the same data.
+
+INCREMENTS:
+    --increment K simulates the K-th daily load on top of an existing file:
+      - one new calendar day per listing
+      - re-loaded (re-priced) calendar rows for the last 7 days
+      - a few late-arriving corrections to older calendar rows
+      - new reviews, amenity changes and listing updates
+    Every touched row gets _loaded_at = base load time + K days, which is
+    what the watermark incremental models pick up.
+
+USAGE:
+    python benchmark/generate_data.py --path benchmark/data/rental_property.duckdb --scale 10x
+    python benchmark/generate_data.py --path benchmark/data/rental_property.duckdb --scale 10x --increment 1
+    python benchmark/generate_data.py --path benchmark/data/rental_property.duckdb --scale 10x --amenity-changes 60
+
+NOTE:
+    The file name must stay rental_property.duckdb: DuckDB names the
+    database after the file and the raw source lives in RENTAL_PROPERTY.
+================================================================================
+"""
+
+import argparse
+import logging
+import os
+import time
+
+import duckdb
+
+
+log = logging.getLogger(__name__)
+
+SCALES = {'1x': 1, '10x': 10, '100x': 100}
+BASE_LISTINGS = 200
+
+START_DATE = '2021-06-01'
+END_DATE = '2022-07-31'
+BASE_LOADED_AT = '2022-08-01 06:00:00'
+
+NEIGHBORHOODS = [
+    'Allston', 'Back Bay', 'Beacon Hill', 'Brighton', 'Charlestown',
+    'Dorchester', 'Downtown', 'East Boston', 'Fenway', 'Jamaica Plain',
+    'North End', 'Roxbury', 'South Boston', 'South End',
+]
+PROPERTY_TYPES = [
+    'Entire apartment', 'Entire condominium', 'Entire house',
+    'Private room in apartment', 'Private room in house', 'Entire loft',
+]
+ROOM_TYPES = ['Entire home/apt', 'Private room', 'Shared room', 'Hotel room']
+AMENITIES = [
+    'Wifi', 'Kitchen', 'Heating', 'Air conditioning', 'Washer', 'Dryer',
+    'Essentials', 'Smoke alarm', 'Carbon monoxide alarm', 'Hair dryer',
+    'Iron', 'Hangers', 'Dedicated workspace', 'TV', 'Free parking on premises',
+    'Lockbox', 'First aid kit', 'Fire extinguisher', 'Coffee maker',
+    'Dishwasher', 'Long term stays allowed', 'Self check-in', 'Pool',
+    'Hot tub', 'Gym', 'Elevator', 'Patio or balcony', 'Pets allowed',
+]
+
+
+def _sql_list(values):
+    """Returns: DuckDB list literal of quoted strings."""
+    return '[' + ', '.join("'" + v.replace("'", "''") + "'" for v in values) + ']'
+
+
+def _pick(values, key):
+    """Returns: SQL expression choosing one of values by hash(seed, key)."""
+    return f"{_sql_list(values)}[1 + (hash($seed, {key}) % {len(values)})::integer]"
+
+
+def _rand(key, modulo=1000):
+    """Returns: SQL expression, a deterministic integer in [0, modulo)."""
+    return f"(hash($seed, {key}) % {modulo})::integer"
+
+
+def _amenities_json(listing_key, variant_key="''", keep_pct=55):
+    """
+    Returns: SQL expression - JSON array string of the amenities kept for
+             the listing (variant_key changes the draw for snapshots).
+    """
+    return (
+        f"to_json(list_filter({_sql_list(AMENITIES)}, "
+        f"a -> (hash($seed, {listing_key}, a, {variant_key}) % 100)::integer < {keep_pct}))::varchar"
+    )
+
+
+def create_base(con, listings, seed, amenity_changes=3):
+    """Create and fill the raw tables from scratch."""
+    con.execute('create schema if not exists raw')
+    days = f"(date '{END_DATE}' - date '{START_DATE}' + 1)"
+
+    con.execute(f"""
+        create or replace table raw.listings as
+        select
+            id,
+            'Listing ' || id as name,
+            {_pick(NEIGHBORHOODS, "id, 'neighborhood'")} as neighborhood,
+            {_pick(PROPERTY_TYPES, "id, 'property_type'")} as property_type,
+            {_pick(ROOM_TYPES, "id, 'room_type'")} as room_type,
+            1 + {_rand("id, 'accommodates'", 8)} as accommodates,
+            1 + {_rand("id, 'bedrooms'", 4)} as bedrooms,
+            1 + {_rand("id, 'beds'", 5)} as beds,
+            (1 + {_rand("id, 'baths'", 4)} * 0.5)::varchar || ' baths' as bathrooms_text,
+            1 + (id - 1) // 3 as host_id,
+            'Host ' || (1 + (id - 1) // 3) as host_name,
+            'Boston, Massachusetts, United States' as host_location,
+            strftime(date '2012-01-01' + {_rand("(id - 1) // 3, 'host_since'", 3000)}, '%Y-%m-%d') as host_since,
+            '[''email'', ''phone'']' as host_verifications,
+            '$' || format('{{:,.2f}}', (60 + {_rand("id, 'price'", 440)})::double) as price,
+            {_rand("id, 'reviews'", 9)} as number_of_reviews,
+            strftime(date '{START_DATE}' + {_rand("id, 'first_review'", 120)}, '%Y-%m-%d') as first_review,
+            strftime(date '{END_DATE}' - {_rand("id, 'last_review'", 60)}, '%Y-%m-%d') as last_review,
+            round(3 + {_rand("id, 'rating'", 200)} / 100.0, 2) as review_scores_rating,
+            {_amenities_json('id')} as amenities,
+            timestamp '{BASE_LOADED_AT}' as _loaded_at
+        from range(1, $listings + 1) t(id)
+    """, {'seed': seed, 'listings': listings})
+
+    # Availability comes in 3-day blocks so listings have multi-day open spans
+    block = f"l.id, (d.date - date '{START_DATE}') // 3, 'open'"
+    con.execute(f"""
+        create or replace table raw.calendar as
+        select
+            l.id as listing_id,
+            d.date,
+            case when {_rand(block, 100)} < 60
+                 then 't' else 'f' end as available,
+            case when {_rand(block, 100)} >= 70
+                 then 'R' || l.id || '-' || ((d.date - date '{START_DATE}') // 3) end as reservation_id,
+            round(
+                replace(replace(l.price, '$', ''), ',', '')::decimal(10, 2)
+                * (case when dayofweek(d.date) in (5, 6) then 1.2 else 1.0 end)
+                * (1 + ((d.date - date '{START_DATE}') / 365.0) * 0.08), 2
+            )::decimal(10, 2) as price,
+            1 + {_rand("l.id, 'min_nights'", 3)} as minimum_nights,
+            30 + {_rand("l.id, 'max_nights'", 335)} as maximum_nights,
+            timestamp '{BASE_LOADED_AT}' as _loaded_at
+        from raw.listings l
+        cross join (
+            select (date '{START_DATE}' + range::integer) as date
+            from range({days})
+        ) d
+    """, {'seed': seed})
+
+    # Each review gets its own 52-day slot: at most one per listing per day,
+    # the grain fct_daily_listing_performance joins reviews on
+    con.execute(f"""
+        create or replace table raw.generated_reviews as
+        select
+            row_number() over (order by l.id, r.n) as id,
+            l.id as listing_id,
+            date '{START_DATE}' + (r.n * 52)::integer + {_rand("l.id, r.n, 'review_date'", 52)} as review_date,
+            1 + {_rand("l.id, r.n, 'score'", 5)} as review_score,
+            timestamp '{BASE_LOADED_AT}' as _loaded_at
+        from raw.listings l
+        cross join range(8) r(n)
+        where r.n < l.number_of_reviews
+    """, {'seed': seed})
+
+    # Up to amenity_changes snapshots per listing, one per equal slice of the period
+    slot_days = 420 // amenity_changes
+    con.execute(f"""
+        create or replace table raw.amenities_changelog as
+        select
+            l.id as listing_id,
+            (date '{START_DATE}' + (s.n * {slot_days})::integer + {_rand("l.id, s.n, 'change_at'", slot_days)})::timestamp as change_at,
+            {_amenities_json('l.id', 's.n')} as amenities,
+            timestamp '{BASE_LOADED_AT}' as _loaded_at
+        from raw.listings l
+        cross join range({int(amenity_changes)}) s(n)
+        where s.n < {_rand("l.id, 'changes'", int(amenity_changes) + 1)}
+    """, {'seed': seed})
+
+
+def apply_increment(con, k, seed):
+    """Apply the k-th simulated daily load to the raw tables."""
+    loaded_at = f"timestamp '{BASE_LOADED_AT}' + interval {int(k)} day"
+    new_date = f"date '{END_DATE}' + {int(k)}"
+    params = {'seed': seed, 'k': k}
+
+    # New day for every listing (copy of the listing's last day, re-priced)
+    con.execute(f"""
+        insert into raw.calendar
+        select
+            listing_id,
+            {new_date},
+            available,
+            reservation_id,
+            round(price * (1 + {_rand("listing_id, $k, 'new_price'", 10)} / 100.0), 2)::decimal(10, 2),
+            minimum_nights,
+            maximum_nights,
+            {loaded_at}
+        from raw.calendar
+        where date = {new_date} - 1
+    """, params)
+
+    # Recent days re-loaded with new prices / availability
+    con.execute(f"""
+        update raw.calendar
+        set price = round(price * (1 + ({_rand("listing_id, date, $k, 'reprice'", 11)} - 5) / 100.0), 2),
+            available = case when {_rand("listing_id, date, $k, 'flip'", 10)} = 0
+                             then case available when 't' then 'f' else 't' end
+                             else available end,
+            _loaded_at = {loaded_at}
+        where date between {new_date} - 7 and {new_date} - 1
+    """, params)
+
+    # Late arrivals: ~0.2% of older rows corrected
+    con.execute(f"""
+        update raw.calendar
+        set price = round(price * 1.05, 2),
+            _loaded_at = {loaded_at}
+        where date < {new_date} - 7
+          and {_rand("listing_id, date, $k, 'late'", 1000)} < 2
+    """, params)
+
+    con.execute(f"""
+        insert into raw.generated_reviews
+        select
+            (select max(id) from raw.generated_reviews) + row_number() over (order by id),
+            id,
+            {new_date} - 1,
+            1 + {_rand("id, $k, 'new_score'", 5)},
+            {loaded_at}
+        from raw.listings
+        where {_rand("id, $k, 'new_review'", 100)} < 20
+    """, params)
+
+    con.execute(f"""
+        insert into raw.amenities_changelog
+        select
+            id,
+            ({new_date} - 1)::timestamp,
+            {_amenities_json('id', "'increment-' || $k")},
+            {loaded_at}
+        from raw.listings
+        where {_rand("id, $k, 'amenity_change'", 100)} < 2
+    """, params)
+
+    con.execute(f"""
+        update raw.listings
+        set price = '$' || format('{{:,.2f}}', (60 + {_rand("id, $k, 'listing_price'", 440)})::double),
+            _loaded_at = {loaded_at}
+        where {_rand("id, $k, 'listing_update'", 100)} < 2
+    """, params)
+
+
+def table_counts(con):
+    """Returns: Dict of raw table name -> row count."""
+    return {
+        name: con.execute(f'select count(*) from raw.{name}').fetchone()[0]
+        for name in ('listings', 'calendar', 'generated_reviews', 'amenities_changelog')
+    }
+
+
+def generate(path, scale='1x', seed=42, increment=None, amenity_changes=3):
+    """
+    Build (or increment) the synthetic raw data in a DuckDB file.
+
+    Args:
+        path: DuckDB file to write (named rental_property.duckdb)
+        scale: '1x', '10x' or '100x'
+        seed: Hash seed; same seed + scale = same data
+        increment: If set, apply that daily load to the existing file instead
+        amenity_changes: Max amenity snapshots per listing (base load only)
+
+    Returns:
+        Dict: {scale, increment, seconds, rows: {table: count}}
+    """
+    if scale not in SCALES:
+        raise ValueError(f"Unknown scale {scale!r}, expected one of {sorted(SCALES)}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    started = time.monotonic()
+
+    con = duckdb.connect(path)
+    try:
+        if increment is None:
+            create_base(con, BASE_LISTINGS * SCALES[scale], seed, amenity_changes)
+        else:
+            apply_increment(con, increment, seed)
+        rows = table_counts(con)
+    finally:
+        con.close()
+
+    result = {
+        'scale': scale,
+        'increment': increment,
+        'seconds': round(time.monotonic() - started, 2),
+        'rows': rows,
+    }
+    log.info("Generated %s", result)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', default='benchmark/data/rental_property.duckdb')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='1x')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--increment', type=int, help='apply the N-th daily load to an existing file')
+    parser.add_argument('--amenity-changes', type=int, default=3, help='max amenity snapshots per listing')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    generate(args.path, args.scale, args.seed, args.increment, args.amenity_changes)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""
+================================================================================
+FILE: run_benchmark.py
+================================================================================
+
+PURPOSE:
+    Time the whole dbt project on the local DuckDB target at one or more data
+    scales, so the effect of a change on full-refresh and incremental build
+    times can be measured offline and compared against a saved baseline.
+
+LOGIC (per scale):
+    1. Generate fresh synthetic raw data (generate_data.py) into
+       benchmark/data/<scale>/rental_property.duckdb
+    2. Full-refresh build of every model (dbt run --full-refresh)
+    3. For each increment 1..N: apply the simulated daily load, then a
+       normal incremental build (dbt run)
+    4. Record per-model execution_time, totals and wall-clock time
+    5. Save everything to benchmark/results/<label>.json
+
+    All dbt runs go through DbtSession (plugins/rental_pipeline), the same
+    in-process runner the Airflow DAG uses, with --target duckdb.
+
+USAGE:
+    python benchmark/run_benchmark.py --scales 1x 10x --label baseline
+    python benchmark/run_benchmark.py --scales 1x 10x --label my-change \\
+        --compare benchmark/results/baseline.json
+
+    Modes selected by dbt vars are compared the same way, e.g. the amenity
+    SCD join (macros/amenity_scd_join.sql):
+    python benchmark/run_benchmark.py --scales 10x --label scd-range \\
+        --vars '{"amenity_scd_join_mode": "range"}'
+    python benchmark/run_benchmark.py --scales 10x --label scd-asof \\
+        --vars '{"amenity_scd_join_mode": "asof"}' --compare benchmark/results/scd-range.json
+
+OUTPUT:
+    {
+      "label": "...", "created_at": "...", "git_commit": "...", "threads": 4, "vars": {...},
+      "scales": {
+        "10x": {
+          "rows": {"calendar": 852000, ...},
+          "full_refresh": {"wall_s": ..., "total_s": ..., "models": {"stg_listings": {"status": "success", "seconds": 0.4}, ...}},
+          "incremental": [{"increment": 1, "wall_s": ..., "total_s": ..., "models": {...}}]
+        }
+      }
+    }
+================================================================================
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, os.path.join(PROJECT_DIR, 'plugins'))
+sys.path.insert(0, BENCHMARK_DIR)
+
+from generate_data import SCALES, generate  # noqa: E402
+from rental_pipeline import DbtSession  # noqa: E402
+
+
+log = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(BENCHMARK_DIR, 'data')
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, 'results')
+
+
+def timed_run(session, full_refresh=False):
+    """
+    Build every model once and time it.
+
+    Returns:
+        dict: {wall_s, total_s, failed, models: {name: {status, seconds}}}
+    """
+    started = time.monotonic()
+    results = session.run(full_refresh=full_refresh)
+    wall = time.monotonic() - started
+
+    models = {
+        name: {'status': r['status'], 'seconds': r['execution_time']}
+        for name, r in sorted(results.items())
+        if r['unique_id'].startswith('model.')
+    }
+    return {
+        'wall_s': round(wall, 2),
+        'total_s': round(sum(m['seconds'] for m in models.values()), 2),
+        'failed': sorted(name for name, m in models.items() if m['status'] != 'success'),
+        'models': models,
+    }
+
+
+def benchmark_scale(scale, increments=1, threads=4, seed=42, dbt_vars=None, amenity_changes=3):
+    """
+    Full-refresh + incremental benchmark at one data scale.
+
+    Args:
+        dbt_vars: dbt vars for every run (e.g. a mode to compare)
+        amenity_changes: Max amenity snapshots per listing in the generated data
+
+    Returns:
+        dict: {rows, full_refresh, incremental: [...]} (see module docstring)
+    """
+    scale_dir = os.path.join(DATA_DIR, scale)
+    path = os.path.join(scale_dir, 'rental_property.duckdb')
+    shutil.rmtree(scale_dir, ignore_errors=True)
+
+    log.info('[%s] generating data', scale)
+    generated = generate(path, scale, seed, amenity_changes=amenity_changes)
+
+    # Read by the duckdb output in profiles.yml when dbt opens the connection
+    os.environ['DBT_DUCKDB_PATH'] = path
+    session = DbtSession(PROJECT_DIR, profiles_dir=PROJECT_DIR, target='duckdb', threads=threads, vars=dbt_vars)
+
+    log.info('[%s] full refresh', scale)
+    result = {
+        'rows': generated['rows'],
+        'full_refresh': timed_run(session, full_refresh=True),
+        'incremental': [],
+    }
+
+    for k in range(1, increments + 1):
+        log.info('[%s] increment %d', scale, k)
+        generate(path, scale, seed, increment=k)
+        run = timed_run(session)
+        run['increment'] = k
+        result['incremental'].append(run)
+
+    return result
+
+
+def git_commit():
+    """Returns: Short commit hash of the project checkout, or None."""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_DIR, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline):
+    """
+    Print per-model timing deltas of current vs baseline.
+
+    Returns:
+        list: Rows of (scale, phase, model, baseline_s, current_s, delta_pct)
+    """
+    rows = []
+    for scale, cur in current['scales'].items():
+        base = baseline['scales'].get(scale)
+        if base is None:
+            continue
+        phases = [('full_refresh', cur['full_refresh'], base['full_refresh'])]
+        phases += [
+            (f"incremental_{c['increment']}", c, b)
+            for c, b in zip(cur['incremental'], base['incremental'])
+        ]
+        for phase, c, b in phases:
+            for model in sorted(set(c['models']) | set(b['models'])):
+                b_s = b['models'].get(model, {}).get('seconds')
+                c_s = c['models'].get(model, {}).get('seconds')
+                rows.append((scale, phase, model, b_s, c_s, _delta_pct(b_s, c_s)))
+            rows.append((scale, phase, 'TOTAL', b['total_s'], c['total_s'], _delta_pct(b['total_s'], c['total_s'])))
+            rows.append((scale, phase, 'WALL', b['wall_s'], c['wall_s'], _delta_pct(b['wall_s'], c['wall_s'])))
+
+    print(f"\nComparison: {current['label']} vs {baseline['label']}")
+    print(f"{'scale':<6} {'phase':<15} {'model':<40} {'baseline_s':>10} {'current_s':>10} {'delta':>8}")
+    for scale, phase, model, b_s, c_s, delta in rows:
+        print(
+            f"{scale:<6} {phase:<15} {model:<40} "
+            f"{_fmt(b_s):>10} {_fmt(c_s):>10} {(f'{delta:+.0f}%' if delta is not None else '-'):>8}"
+        )
+    return rows
+
+
+def _delta_pct(before, after):
+    if not before or after is None:
+        return None
+    return (after - before) / before * 100
+
+
+def _fmt(seconds):
+    return '-' if seconds is None else f'{seconds:.2f}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', nargs='+', choices=sorted(SCALES), default=['1x'])
+    parser.add_argument('--increments', type=int, default=1, help='incremental runs after the full refresh')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--label', help='results file name (default: git commit or timestamp)')
+    parser.add_argument('--compare', metavar='BASELINE_JSON', help='print deltas against a saved result')
+    parser.add_argument('--vars', type=json.loads, default={}, help='dbt vars (JSON) for every run')
+    parser.add_argument('--amenity-changes', type=int, default=3, help='max amenity snapshots per listing')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    label = args.label or git_commit() or datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    results = {
+        'label': label,
+        'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'threads': args.threads,
+        'seed': args.seed,
+        'vars': args.vars,
+        'amenity_changes': args.amenity_changes,
+        'scales': {},
+    }
+    for scale in args.scales:
+        results['scales'][scale] = benchmark_scale(
+            scale, args.increments, args.threads, args.seed, args.vars, args.amenity_changes
+        )
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, f'{label}.json')
+    with open(out_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    log.info('Results written to %s', out_path)
+
+    for scale, r in results['scales'].items():
+        runs = [('full_refresh', r['full_refresh'])] + [(f"incremental_{i['increment']}", i) for i in r['incremental']]
+        for phase, run in runs:
+            print(f"{scale:<6} {phase:<15} wall {run['wall_s']:>8.2f}s  models {run['total_s']:>8.2f}s"
+                  + (f"  FAILED: {', '.join(run['failed'])}" if run['failed'] else ''))
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+    failed = any(
+        run['failed']
+        for r in results['scales'].values()
+        for run in [r['full_refresh']] + r['incremental']
+    )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
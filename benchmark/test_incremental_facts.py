@@ -0,0 +1,114 @@
+"""
+================================================================================
+FILE: test_incremental_facts.py
+================================================================================
+
+PURPOSE:
+    Check that the watermark-mode incremental runs of the daily fact (and the
+    monthly facts built on it) leave the same rows as a full refresh, on the
+    local DuckDB target: a full build, two simulated daily loads
+    (generate_data.py increments: new calendar days, reviews, re-priced
+    listings, amenity changes) and a back-dated amenity change, per
+    amenity_scd_join_mode.
+
+    Skipped when dbt-duckdb (>= 1.10, for incremental_strategy='merge') is
+    not installed.
+
+USAGE:
+    pytest benchmark/test_incremental_facts.py
+================================================================================
+"""
+
+import os
+import sys
+
+import pytest
+
+
+pytest.importorskip('dbt.adapters.duckdb')
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, os.path.join(PROJECT_DIR, 'plugins'))
+sys.path.insert(0, BENCHMARK_DIR)
+
+from generate_data import generate  # noqa: E402
+from rental_pipeline import DbtSession  # noqa: E402
+
+import duckdb  # noqa: E402
+
+
+FACTS = {
+    'fct_daily_listing_performance': 'listing_id, calendar_date',
+    'fct_monthly_listing_performance': 'listing_id, calendar_month',
+    'fct_monthly_neighborhood_summary': 'neighborhood, calendar_month',
+}
+
+
+def _run(session, **kwargs):
+    results = session.run(**kwargs)
+    failed = [name for name, r in results.items() if r['status'] != 'success']
+    assert not failed, f'dbt models failed: {failed}'
+
+
+def _snapshot(path):
+    """
+    Returns: {fact: rows ordered by key, without dbt_updated_at}; doubles
+             rounded (parallel aggregation sums them in any order)
+    """
+    with duckdb.connect(path) as con:
+        return {
+            name: [
+                tuple(round(v, 6) if isinstance(v, float) else v for v in row)
+                for row in con.execute(f'select * exclude (dbt_updated_at) from mart.{name} order by {key}').fetchall()
+            ]
+            for name, key in FACTS.items()
+        }
+
+
+def _backdate_amenity_change(path):
+    """A changelog snapshot 90 days back for a few listings, in a new load."""
+    with duckdb.connect(path) as con:
+        con.execute("""
+            insert into raw.amenities_changelog
+            select
+                listing_id,
+                max(change_at) - interval 90 day,
+                '["Kitchen","Wifi"]',
+                (select max(_loaded_at) from raw.amenities_changelog) + interval 1 hour
+            from raw.amenities_changelog
+            where listing_id % 25 = 0
+            group by listing_id
+        """)
+
+
+@pytest.mark.parametrize('join_mode', ['asof', 'equi', 'range'])
+def test_incremental_facts_match_full_refresh(tmp_path, join_mode):
+    path = str(tmp_path / 'rental_property.duckdb')
+    environ = dict(os.environ)
+    os.environ.update({
+        'DBT_DUCKDB_PATH': path,
+        'DBT_TARGET_PATH': str(tmp_path / 'target'),
+        'DBT_LOG_PATH': str(tmp_path / 'logs'),
+        'DBT_SEND_ANONYMOUS_USAGE_STATS': 'false',
+    })
+    try:
+        session = DbtSession(PROJECT_DIR, profiles_dir=PROJECT_DIR, target='duckdb', threads=4,
+                             vars={'amenity_scd_join_mode': join_mode})
+        generate(path, '1x')
+        _run(session, full_refresh=True)
+        for k in (1, 2):
+            generate(path, '1x', increment=k)
+            _run(session)
+        _backdate_amenity_change(path)
+        _run(session)
+        incremental = _snapshot(path)
+
+        _run(session, select=['fct_daily_listing_performance+'], full_refresh=True)
+        full_refresh = _snapshot(path)
+    finally:
+        os.environ.clear()
+        os.environ.update(environ)
+
+    for name in FACTS:
+        assert incremental[name] == full_refresh[name], f'{name} differs from a full refresh'
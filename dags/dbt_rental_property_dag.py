@@ -5,7 +5,10 @@ FILE: dbt_rental_property_dag.py
 
 PURPOSE:
     Airflow DAG to orchestrate the dbt rental property analytics pipeline.
-    Executes models sequentially in the correct dependency order.
+    Builds every model in ONE in-process dbt session (rental_pipeline.DbtSession):
+    the project is parsed once and independent models run concurrently on
+    `threads` workers. Each model and each model's tests still appear as
+    their own tasks in the UI, generated from dbt's manifest.json.
     
     Includes source freshness check before pipeline execution.
 
@@ -18,12 +21,43 @@ MONITORING:
     - Email alerts for failures and stale sources
 
 LAYERS EXECUTED:
-    0. Source Freshness Check → Verify raw data is updated
-    1. Staging     → Clean and standardize raw data
-    2. Intermediate → Business transformations & SCD
-    3. Marts       → Dimensions and Fact tables
-    4. Analytics   → Business question answers
-    5. Tests       → Data quality validation
+    0. load_raw_files → Newly landed source files streamed in chunks into
+       the raw tables with parallel bulk loads, deduplicated on natural
+       keys and stamped with _loaded_at (rental_pipeline.RawLoader)
+    0.5 Pre-flight → ONE dbt invocation checks source freshness, late
+       arrivals and schema changes; three branch tasks read its result
+       in parallel (fresh? / refresh strategy for the fact)
+    0.9 rebuild_daily_fact → Only when the fact needs a full refresh: its
+       inputs, then the fact in concurrent month / week batches written to
+       a shadow table and swapped in; a retry resumes at the unfinished
+       batches (rental_pipeline.BatchRebuild)
+    1. dbt_build    → Single `dbt build` invocation for all layers below,
+       limited to the models changed since the last successful build (code:
+       state:modified+, data: source_status:fresher+); the rest are
+       skipped with a reason (rental_pipeline.BuildState)
+       Staging     → Clean and standardize raw data
+       Intermediate → Business transformations & SCD
+       Marts       → Dimensions and Fact tables
+       Analytics   → Business question answers
+       Tests       → Each model's (and source's) tests run right after it,
+                     concurrently with other branches; a failing test skips
+                     everything built on top of it. Tests that passed on
+                     unchanged inputs are skipped (rental_pipeline.TestCache)
+    1.5 backfill_amenity_columns → New amenity columns only (on schema change)
+    2. Per-model status + test tasks → Surface each model's and each model's
+       tests' result from dbt_build, wired by the manifest's lineage
+    2.5 check_model_regressions → Warn on models slower than their rolling baseline
+    3. export_parquet → Changed month / neighborhood partitions of the monthly
+       facts, dim_listings and the analytics outputs as Parquet files plus
+       a manifest, for consumers outside the warehouse
+       (rental_pipeline.ParquetExport); after 1.5, so no new amenity
+       column is exported half-filled
+
+TELEMETRY:
+    Every dbt invocation records per-model metrics (execution time, rows
+    affected, query id, refresh mode) in DEVELOPMENT.PIPELINE_MODEL_METRICS
+    through an on-run-end hook (macros/run_metrics.sql), and tags each
+    model's Snowflake queries with the model name.
 
 ================================================================================
 """
@@ -34,11 +68,15 @@ from airflow.operators.bash import BashOperator
 from airflow.operators.python import PythonOperator, BranchPythonOperator
 from airflow.operators.empty import EmptyOperator
 from airflow.utils.task_group import TaskGroup
-from airflow.exceptions import AirflowSkipException
-import subprocess
+from airflow.exceptions import AirflowException, AirflowFailException, AirflowSkipException
 import json
 import os
 
+from rental_pipeline import (
+    BatchRebuild, BuildState, DbtSession, ParquetExport, RawLoader, TestCache, load_model_graph,
+)
+from rental_pipeline.batch_rebuild import BATCH_END, BATCH_START
+
 
 # =============================================================================
 # DAG Configuration
@@ -61,66 +99,282 @@ DBT_PROJECT_DIR = '/opt/dbt'
 # Base dbt command
 DBT_CMD = f'cd {DBT_PROJECT_DIR} && dbt'
 
+# Worker threads for the in-process dbt session (independent models run concurrently)
+DBT_THREADS = int(os.environ.get('DBT_THREADS', 4))
+
+# dbt_build selection: 'changed' (models whose code changed or whose sources
+# were loaded since the last successful build, compared with the artifacts it
+# saved in DBT_STATE_DIR) or 'all'
+DBT_BUILD_SELECTION = os.environ.get('DBT_BUILD_SELECTION', 'changed')
+DBT_STATE_DIR = os.environ.get('DBT_STATE_DIR', os.path.join(DBT_PROJECT_DIR, 'state'))
+
+# Skip tests that passed on the same inputs in an earlier run (DBT_STATE_DIR/test_cache.json)
+DBT_TEST_CACHE = os.environ.get('DBT_TEST_CACHE', 'true').lower() == 'true'
+
+# manifest.json the per-model tasks are generated from (rewritten by every
+# parse, so new models and tests appear after the next run)
+DBT_MANIFEST_PATH = os.environ.get('DBT_MANIFEST_PATH', os.path.join(DBT_PROJECT_DIR, 'target', 'manifest.json'))
+
+# Raw ingestion: files landed in RAW_LANDING_DIR/<table>/ are loaded into
+# raw.<table> before the pre-flight checks; one manifest per loaded file in
+# RAW_MANIFEST_DIR keeps a file from being loaded twice
+RAW_LANDING_DIR = os.environ.get('RAW_LANDING_DIR', os.path.join(DBT_PROJECT_DIR, 'landing'))
+RAW_MANIFEST_DIR = os.environ.get('RAW_MANIFEST_DIR', os.path.join(DBT_STATE_DIR, 'load_manifests'))
+RAW_LOAD_WORKERS = int(os.environ.get('RAW_LOAD_WORKERS', 4))
+RAW_LOAD_CHUNK_ROWS = int(os.environ.get('RAW_LOAD_CHUNK_ROWS', 500000))
+
+# fct_daily_listing_performance incremental filter: 'watermark' or 'lookback'
+FCT_INCREMENTAL_MODE = os.environ.get('FCT_INCREMENTAL_MODE', 'watermark')
+
+# Staging models as 'view' or 'incremental' tables (see staging_incremental.sql)
+STAGING_MATERIALIZATION = os.environ.get('STAGING_MATERIALIZATION', 'view')
+STAGING_AMENITY_MODELS = ['stg_listings', 'stg_amenities_changelog']
+
+# Above this many late-arrival slices (listing × date range) the fact is
+# full-refreshed instead of repaired slice by slice
+LATE_REPAIR_MAX_SLICES = int(os.environ.get('LATE_REPAIR_MAX_SLICES', 500))
+
+# New amenities: 'column_backfill' (add + backfill only the new amenity columns
+# of the fact) or 'full_refresh' (rebuild the fact)
+SCHEMA_CHANGE_STRATEGY = os.environ.get('SCHEMA_CHANGE_STRATEGY', 'column_backfill')
+
+# calendar_date days per UPDATE in the amenity column backfill
+AMENITY_BACKFILL_CHUNK_DAYS = int(os.environ.get('AMENITY_BACKFILL_CHUNK_DAYS', 30))
+
+# Full refresh of fct_daily_listing_performance: 'batched' (concurrent month /
+# week batches into a shadow table, resumable, see rental_pipeline.BatchRebuild)
+# or 'ctas' (one CREATE TABLE AS inside dbt_build)
+FCT_FULL_REFRESH_MODE = os.environ.get('FCT_FULL_REFRESH_MODE', 'batched')
+FCT_REBUILD_GRAIN = os.environ.get('FCT_REBUILD_GRAIN', 'month')
+FCT_REBUILD_WORKERS = int(os.environ.get('FCT_REBUILD_WORKERS', 4))
+
+# Model performance regression check: warn when a model runs more than
+# THRESHOLD_PCT slower than the median of its last WINDOW_RUNS runs (same
+# refresh mode), ignoring slow-downs under MIN_SECONDS
+MODEL_REGRESSION_THRESHOLD_PCT = float(os.environ.get('MODEL_REGRESSION_THRESHOLD_PCT', 50))
+MODEL_REGRESSION_WINDOW_RUNS = int(os.environ.get('MODEL_REGRESSION_WINDOW_RUNS', 7))
+MODEL_REGRESSION_MIN_SECONDS = float(os.environ.get('MODEL_REGRESSION_MIN_SECONDS', 5))
+
+# Parquet export for BI / data-science consumers: {model: partition columns}
+# ([] = one file). Only partitions whose content changed are rewritten;
+# PARQUET_EXPORT_DIR/manifest.json lists the current files. Empty
+# PARQUET_EXPORT_DIR disables the export.
+PARQUET_EXPORT_DIR = os.environ.get('PARQUET_EXPORT_DIR', os.path.join(DBT_PROJECT_DIR, 'exports'))
+PARQUET_EXPORT_WORKERS = int(os.environ.get('PARQUET_EXPORT_WORKERS', 4))
+PARQUET_EXPORTS = {
+    'fct_monthly_listing_performance': ['calendar_month'],
+    'fct_monthly_neighborhood_summary': ['calendar_month'],
+    'dim_listings': ['neighborhood'],
+    'problem_1_amenity_revenue': [],
+    'problem_2_neighborhood_pricing': [],
+    'problem_3a_max_stay_duration': [],
+    'problem_3b_max_stay_lockbox_firstaid': [],
+}
+
+# Daily fact and the monthly rollups rebuilt from it
+DAILY_FACT = 'fct_daily_listing_performance'
+MONTHLY_MODELS = ['fct_monthly_listing_performance', 'fct_monthly_neighborhood_summary']
+
+
+def _model_graph():
+    """
+    Models, sources and tests for the per-model tasks, from DBT_MANIFEST_PATH
+    or, while dbt is rewriting it, the manifest of the last successful build.
+    
+    Returns:
+        dict: load_model_graph() result (no layers before the first parse)
+    """
+    for path in (DBT_MANIFEST_PATH, os.path.join(DBT_STATE_DIR, 'manifest.json')):
+        try:
+            return load_model_graph(path)
+        except (OSError, ValueError):
+            continue
+    print(f"No dbt manifest at {DBT_MANIFEST_PATH} - per-model tasks appear after the first parse")
+    return {'layers': {}, 'sources': {}}
+
+
+MODEL_GRAPH = _model_graph()
+
 
 # =============================================================================
-# Source Freshness Check Functions
+# Raw Ingestion
 # =============================================================================
 
+def _warehouse_connection(query_tag='raw-load'):
+    """
+    Args:
+        query_tag: Snowflake QUERY_TAG of the session's queries
+
+    Returns:
+        snowflake.connector connection with the dbt service user's
+        credentials (same environment variables as profiles.yml)
+    """
+    import snowflake.connector
+
+    return snowflake.connector.connect(
+        account=os.environ['SNOWFLAKE_ACCOUNT'],
+        user=os.environ.get('SNOWFLAKE_USER', 'dbt'),
+        private_key_file=os.environ['SNOWFLAKE_PRIVATE_KEY_PATH'],
+        private_key_file_pwd=os.environ.get('SNOWFLAKE_PRIVATE_KEY_PASSPHRASE'),
+        role='TRANSFORM',
+        warehouse='COMPUTE_WH',
+        database='RENTAL_PROPERTY',
+        session_parameters={'QUERY_TAG': query_tag},
+    )
+
+
+def load_raw_files(**context):
+    """
+    Load newly landed source files into the raw tables (rental_pipeline.RawLoader):
+    streamed in chunks, bulk-loaded by RAW_LOAD_WORKERS threads, deduplicated
+    on the natural key and stamped with _loaded_at. Files with a manifest
+    from an earlier run are skipped.
+    
+    Pushes:
+        raw_load (dict): {loaded_at, files: [manifest, ...], skipped: [path, ...],
+                          tables: {table: rows replaced + inserted}}
+    """
+    if not os.path.isdir(RAW_LANDING_DIR):
+        print(f"No landing folder at {RAW_LANDING_DIR} - raw tables are loaded outside this DAG")
+        return None
+    
+    connection = _warehouse_connection()
+    try:
+        loader = RawLoader(
+            connection,
+            RAW_LANDING_DIR,
+            RAW_MANIFEST_DIR,
+            dialect='snowflake',
+            workers=RAW_LOAD_WORKERS,
+            chunk_rows=RAW_LOAD_CHUNK_ROWS,
+        )
+        # Wall-clock time, not the run's data interval: a re-run of an old
+        # DAG run must still stamp rows after every model's watermark
+        summary = loader.load()
+    finally:
+        connection.close()
+    
+    for manifest in summary['files']:
+        print(
+            f"📥 {manifest['table']}: {os.path.basename(manifest['file'])} → "
+            f"{manifest['rows_inserted']} new, {manifest['rows_replaced']} replaced, "
+            f"{manifest['rows_unchanged']} unchanged, {manifest['rows_duplicate']} duplicate "
+            f"({manifest['chunks']} chunks, {manifest['seconds']}s)"
+        )
+    if summary['skipped']:
+        print(f"⏭️ {len(summary['skipped'])} file(s) already loaded: {summary['skipped']}")
+    if not summary['files']:
+        print("No new files landed")
+    
+    context['ti'].xcom_push(key='raw_load', value=summary)
+    return summary
+
+
+# =============================================================================
+# Pre-flight Check Functions
+# =============================================================================
+
+def run_preflight(**context):
+    """
+    Run source freshness, late-arrival and schema-change checks in ONE dbt
+    invocation (one parse, one warehouse connection) via the
+    preflight_checks macro, instead of one dbt process per check.
+    
+    The result is written to target/preflight.json and pushed to XCom; the
+    three branch tasks below read it in parallel.
+    
+    Pushes:
+        preflight (dict): {freshness: {...}, late_arrivals: {...}, schema: {...}, timings: {...}}
+    """
+    messages = DbtSession(DBT_PROJECT_DIR).run_operation(
+        'preflight_checks',
+        {'window_days': 7, 'lookback_loaded_hours': 48, 'max_slices': LATE_REPAIR_MAX_SLICES},
+    )
+    
+    preflight = None
+    for message in messages:
+        key, sep, value = message.partition('=')
+        if key == 'PREFLIGHT_RESULT':
+            preflight = json.loads(value)
+    if preflight is None:
+        raise AirflowException('preflight_checks did not log PREFLIGHT_RESULT')
+    
+    artifact = os.path.join(DBT_PROJECT_DIR, 'target', 'preflight.json')
+    os.makedirs(os.path.dirname(artifact), exist_ok=True)
+    with open(artifact, 'w') as f:
+        json.dump(preflight, f, indent=2)
+    
+    print(f"Pre-flight timings: {preflight['timings']}")
+    context['ti'].xcom_push(key='preflight', value=preflight)
+    return preflight
+
+
+def _preflight_result(context, check):
+    """
+    Returns:
+        dict: One check's section of the pre-flight result
+    """
+    preflight = context['ti'].xcom_pull(key='preflight', task_ids='preflight')
+    if not preflight:
+        raise AirflowFailException('No pre-flight result (preflight task failed)')
+    return preflight[check]
+
+
 def check_schema_changes(**context):
     """
     Check if new amenity columns have been added to source.
-    Determines if full refresh is needed instead of incremental.
+    Determines how the fact picks them up: column backfill (default),
+    full refresh (SCHEMA_CHANGE_STRATEGY=full_refresh) or nothing.
+    
+    Pushes:
+        refresh_strategy (str): 'incremental', 'column_backfill' or 'full_refresh'
+        new_amenities (list): Amenity names new to the fact
     
     Returns:
         str: 'schema_changed' or 'schema_unchanged'
     """
-    import subprocess
-    import json
-    
-    # Run dbt operation to check for schema changes
-    result = subprocess.run(
-        f'cd {DBT_PROJECT_DIR} && dbt run-operation check_amenity_schema_change --output json',
-        shell=True,
-        capture_output=True,
-        text=True
-    )
-    
-    # Parse output to determine if schema changed
-    output = result.stdout + result.stderr
+    new_amenities = _preflight_result(context, 'schema')['new_amenities']
     
-    if 'SCHEMA CHANGE DETECTED' in output:
-        context['ti'].xcom_push(key='refresh_strategy', value='full_refresh')
+    ti = context['ti']
+    ti.xcom_push(key='new_amenities', value=new_amenities)
+    if new_amenities:
+        print(f"New amenities: {', '.join(new_amenities)} → {SCHEMA_CHANGE_STRATEGY}")
+        ti.xcom_push(key='refresh_strategy', value=SCHEMA_CHANGE_STRATEGY)
         return 'schema_changed'
     else:
-        context['ti'].xcom_push(key='refresh_strategy', value='incremental')
+        ti.xcom_push(key='refresh_strategy', value='incremental')
         return 'schema_unchanged'
 
 
 def check_late_arrivals(**context):
     """
     Detect late-arriving rows (older business dates but recently ingested)
-    and decide if a backfill/full refresh is needed.
-    """
-    import subprocess
-    import re
+    and collect the slices a bounded repair has to rebuild.
     
-    cmd = (
-        f'cd {DBT_PROJECT_DIR} && '
-        f'dbt run-operation check_late_arrivals '
-        f'--args \'{{"window_days": 7, "lookback_loaded_hours": 48}}\''
-    )
-    result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-    output = result.stdout + result.stderr
+    Pushes:
+        late_arrivals_detected (bool)
+        late_arrival_count (int): Late raw.calendar rows
+        late_arrival_slices (list|None): [{listing_id, start_date, end_date, rows}],
+            None if there are more than LATE_REPAIR_MAX_SLICES
+        late_arrival_months (list): Affected calendar months ('YYYY-MM-01')
     
-    late_count = 0
-    match = re.search(r'LATE_ARRIVAL_COUNT=(\\d+)', output)
-    if match:
-        late_count = int(match.group(1))
+    Returns:
+        str: 'late_arrivals_detected' or 'late_arrivals_clean'
+    """
+    late = _preflight_result(context, 'late_arrivals')
+    late_count = late['count']
+    slices = late['slices']
+    months = late['months']
     
-    context['ti'].xcom_push(key='late_arrivals_detected', value=(late_count > 0))
-    context['ti'].xcom_push(key='late_arrival_count', value=late_count)
+    ti = context['ti']
+    ti.xcom_push(key='late_arrivals_detected', value=(late_count > 0))
+    ti.xcom_push(key='late_arrival_count', value=late_count)
+    ti.xcom_push(key='late_arrival_slices', value=slices)
+    ti.xcom_push(key='late_arrival_months', value=months)
     
     if late_count > 0:
+        print(f"Late arrivals: {late_count} rows, "
+              f"{'too many' if slices is None else len(slices)} slices, months {months}")
         return 'late_arrivals_detected'
     else:
         return 'late_arrivals_clean'
@@ -128,71 +382,27 @@ def check_late_arrivals(**context):
 
 def check_source_freshness(**context):
     """
-    Run dbt source freshness and check if sources are stale.
+    Branch on the source freshness part of the pre-flight result.
+    
+    Pushes:
+        freshness_results (dict): passed / warned / errored source lists
     
     Returns:
-        dict: Freshness check results with status and details
+        str: 'source_freshness_passed', 'source_freshness_warning' or 'source_freshness_failed'
     """
-    import subprocess
-    import json
-    
-    # Run dbt source freshness
-    result = subprocess.run(
-        f'cd {DBT_PROJECT_DIR} && dbt source freshness --output json',
-        shell=True,
-        capture_output=True,
-        text=True
-    )
-    
-    # Parse results
+    freshness = _preflight_result(context, 'freshness')
     freshness_results = {
-        'passed': [],
-        'warned': [],
-        'errored': [],
-        'runtime_error': None
+        'passed': freshness['passed'],
+        'warned': freshness['warned'],
+        'errored': freshness['errored'],
+        'runtime_error': freshness['runtime_error'],
     }
     
-    if result.returncode != 0:
-        # Check if it's a runtime error or just freshness failures
-        if 'Runtime Error' in result.stderr:
-            freshness_results['runtime_error'] = result.stderr
-            context['ti'].xcom_push(key='freshness_results', value=freshness_results)
-            return 'source_freshness_failed'
-    
-    # Try to parse the JSON output
-    try:
-        # Read the freshness output from target directory
-        freshness_file = f'{DBT_PROJECT_DIR}/target/sources.json'
-        if os.path.exists(freshness_file):
-            with open(freshness_file, 'r') as f:
-                sources_data = json.load(f)
-                
-            for source in sources_data.get('results', []):
-                source_name = f"{source.get('unique_id', 'unknown')}"
-                status = source.get('status', 'unknown')
-                max_loaded_at = source.get('max_loaded_at', 'N/A')
-                
-                source_info = {
-                    'name': source_name,
-                    'max_loaded_at': max_loaded_at,
-                    'status': status
-                }
-                
-                if status == 'pass':
-                    freshness_results['passed'].append(source_info)
-                elif status == 'warn':
-                    freshness_results['warned'].append(source_info)
-                elif status == 'error':
-                    freshness_results['errored'].append(source_info)
-                    
-    except Exception as e:
-        freshness_results['runtime_error'] = str(e)
-    
     # Push results to XCom for downstream tasks
     context['ti'].xcom_push(key='freshness_results', value=freshness_results)
     
     # Determine next task based on results
-    if freshness_results['errored']:
+    if freshness_results['errored'] or freshness_results['runtime_error']:
         return 'source_freshness_failed'
     elif freshness_results['warned']:
         return 'source_freshness_warning'
@@ -235,13 +445,18 @@ def handle_freshness_failure(**context):
     
     errored_sources = results.get('errored', [])
     runtime_error = results.get('runtime_error')
+    # Runtime errors (missing table / loaded_at column) have no max_loaded_at
+    source_lines = [
+        f"  - {s['name']}: {s.get('error') or 'Last loaded at ' + str(s['max_loaded_at'])}"
+        for s in errored_sources
+    ]
     
     error_message = f"""
     🚨 SOURCE FRESHNESS ERROR - PIPELINE BLOCKED
     
     The following sources have critically stale data:
     
-    {chr(10).join([f"  - {s['name']}: Last loaded at {s['max_loaded_at']}" for s in errored_sources])}
+    {chr(10).join(source_lines)}
     
     {f"Runtime Error: {runtime_error}" if runtime_error else ""}
     
@@ -255,6 +470,466 @@ def handle_freshness_failure(**context):
     raise Exception(error_message)
 
 
+# =============================================================================
+# dbt Build Functions
+# =============================================================================
+
+def _refresh_plan(ti):
+    """
+    Refresh decision from the late-arrival and schema checks.
+    
+    Late arrivals are repaired, not fully refreshed:
+      - repair_slices ('lookback' mode): the fact rebuilds only the affected
+        listing × date ranges. In 'watermark' mode the fact already picks
+        up every row loaded since its last run.
+      - the monthly facts recompute only the months whose daily rows the
+        fact's merge inserted or updated (changed_months.sql), so repaired
+        months are picked up without extra vars
+    A full refresh of the fact is left for schema changes with
+    SCHEMA_CHANGE_STRATEGY=full_refresh, or late arrivals spread over more
+    than LATE_REPAIR_MAX_SLICES slices in 'lookback' mode. With the default
+    'column_backfill', new amenity columns are filled by
+    backfill_amenity_columns() after the build. With
+    STAGING_MATERIALIZATION='incremental', a schema change also
+    full-refreshes the amenity-pivoting staging tables.
+    
+    Returns:
+        tuple: (full_refresh_models, repair_slices)
+    """
+    schema_strategy = ti.xcom_pull(key='refresh_strategy', task_ids='check_schema_changes')
+    late_arrivals = ti.xcom_pull(key='late_arrivals_detected', task_ids='check_late_arrivals')
+    late_slices = ti.xcom_pull(key='late_arrival_slices', task_ids='check_late_arrivals')
+    late_months = ti.xcom_pull(key='late_arrival_months', task_ids='check_late_arrivals') or []
+    
+    full_refresh_models = []
+    repair_slices = []
+    too_many_slices = late_arrivals and late_slices is None
+    if too_many_slices and FCT_INCREMENTAL_MODE == 'lookback':
+        print("🔄 Full refresh triggered (too many late-arrival slices to repair)")
+        full_refresh_models += [DAILY_FACT] + MONTHLY_MODELS
+    elif late_arrivals:
+        print(f"🩹 Bounded repair of late arrivals in months {late_months}")
+        if FCT_INCREMENTAL_MODE == 'lookback':
+            repair_slices = [
+                {k: s[k] for k in ('listing_id', 'start_date', 'end_date')} for s in late_slices
+            ]
+    if schema_strategy in ('full_refresh', 'column_backfill'):
+        # New amenity columns: rebuild spans and SCD history so every row gets them
+        # (dim_listings keeps its history: it re-slices the listings whose SCD
+        # versions were rewritten, backfill_amenity_columns fills the rest)
+        if STAGING_MATERIALIZATION == 'incremental':
+            full_refresh_models += STAGING_AMENITY_MODELS
+        full_refresh_models += ['int_availability_spans', 'int_listing_amenities_scd']
+    if schema_strategy == 'full_refresh':
+        print("🔄 Full refresh triggered (schema change)")
+        full_refresh_models.append(DAILY_FACT)
+    elif schema_strategy == 'column_backfill':
+        print("🧩 Schema change: new amenity columns are backfilled after the build")
+    if not full_refresh_models and not late_arrivals:
+        print("⚡ Incremental run")
+    return list(dict.fromkeys(full_refresh_models)), repair_slices
+
+
+def _dbt_vars(full_refresh_models, repair_slices=(), **extra):
+    """
+    Returns:
+        dict: dbt vars for a session with the given refresh decision
+    """
+    return {
+        'full_refresh_models': full_refresh_models,
+        'fct_daily_incremental_mode': FCT_INCREMENTAL_MODE,
+        'staging_materialization': STAGING_MATERIALIZATION,
+        'repair_slices': list(repair_slices),
+        **extra,
+    }
+
+
+def rebuild_daily_fact(**context):
+    """
+    Batched, resumable full refresh of fct_daily_listing_performance, when
+    the refresh decision asks for one and FCT_FULL_REFRESH_MODE='batched'.
+    
+    1. Compiles the fact once for a full refresh with placeholder batch
+       bounds (var fct_daily_batch)
+    2. Unless an earlier attempt left a rebuild of that same SQL to resume
+       (BatchRebuild.resumable: its inputs are already built), builds the
+       fact's inputs (with their tests), full-refreshing the ones the
+       refresh decision lists (e.g. the amenity SCD on a schema change),
+       and compiles the fact again (the inputs can add amenity columns)
+    3. rental_pipeline.BatchRebuild inserts FCT_REBUILD_GRAIN batches on
+       FCT_REBUILD_WORKERS threads into a shadow table and swaps it in.
+       Finished batches are recorded in DBT_STATE_DIR, so a retry (e.g.
+       after execution_timeout) goes straight back to the batches left.
+    
+    dbt_build then merges the rows loaded since the fact's watermark and
+    recomputes every month of the monthly facts, because every daily row
+    has a new dbt_updated_at.
+    
+    Pushes:
+        rebuilt_models (list): Full refreshes done here, skipped by dbt_build
+        fact_rebuild (dict): BatchRebuild summary
+    """
+    ti = context['ti']
+    full_refresh_models, _ = _refresh_plan(ti)
+    if DAILY_FACT not in full_refresh_models or FCT_FULL_REFRESH_MODE != 'batched':
+        print(f"No batched rebuild of {DAILY_FACT} in this run")
+        return None
+    
+    inputs_refresh = [m for m in full_refresh_models if m not in [DAILY_FACT] + MONTHLY_MODELS]
+    session = DbtSession(
+        DBT_PROJECT_DIR,
+        threads=DBT_THREADS,
+        vars=_dbt_vars(
+            inputs_refresh + [DAILY_FACT],
+            fct_daily_batch={'start': BATCH_START, 'end': BATCH_END},
+        ),
+    )
+    
+    def batch_rebuild(connection):
+        compiled = session.compile([DAILY_FACT, 'stg_calendar'])
+        return BatchRebuild(
+            connection,
+            compiled[DAILY_FACT]['relation_name'],
+            compiled[DAILY_FACT]['compiled_code'],
+            compiled['stg_calendar']['relation_name'],
+            os.path.join(DBT_STATE_DIR, f'rebuild_{DAILY_FACT}.json'),
+            dialect='snowflake',
+            grain=FCT_REBUILD_GRAIN,
+            workers=FCT_REBUILD_WORKERS,
+        )
+    
+    connection = _warehouse_connection(query_tag=DAILY_FACT)
+    try:
+        rebuild = batch_rebuild(connection)
+        if rebuild.resumable():
+            # Retry: the inputs were built (and tested) by the attempt that started the batches
+            print(f"🧱 Resuming the rebuild of {DAILY_FACT} - inputs already built")
+        else:
+            results = session.build(select=[f'+{DAILY_FACT}'], exclude=[DAILY_FACT])
+            failed = [name for name, result in results.items() if result['status'] == 'error']
+            if failed:
+                raise AirflowException(f"Inputs of {DAILY_FACT} failed: {', '.join(failed)}")
+            failed_tests = [name for name, result in results.items() if result['status'] == 'fail']
+            if failed_tests:
+                # Bad data: a retry would fail the same way
+                raise AirflowFailException(f"Tests on the inputs of {DAILY_FACT} failed: {', '.join(failed_tests)}")
+            rebuild = batch_rebuild(connection)
+        print(f"🧱 Rebuilding {DAILY_FACT}: {len(rebuild.plan())} {FCT_REBUILD_GRAIN} batch(es) to run")
+        summary = rebuild.run()
+    finally:
+        connection.close()
+    
+    print(f"🧱 {summary['target']}: {summary['rows']} rows in {summary['batches']} batches "
+          f"({summary['resumed']} done by an earlier attempt), {summary['seconds']}s")
+    ti.xcom_push(key='fact_rebuild', value=summary)
+    ti.xcom_push(key='rebuilt_models', value=inputs_refresh + [DAILY_FACT])
+    return summary
+
+
+def run_dbt_build(**context):
+    """
+    Build all models in a single in-process dbt session.
+    
+    The refresh strategy decided by the late-arrival and schema checks
+    (_refresh_plan) is applied per model through var('full_refresh_models'),
+    so even a full refresh of the fact table stays inside the same
+    invocation. With FCT_FULL_REFRESH_MODE='batched' the fact's full refresh
+    (and those of its inputs) has already been done by rebuild_daily_fact;
+    those models run incrementally here, and everything downstream of them
+    is built.
+
+    Runs `dbt build`: each model's tests run right after the model, and a
+    failing test skips the models built on top of it. Tests whose inputs
+    are unchanged since they last passed are excluded (TestCache).
+    
+    With DBT_BUILD_SELECTION='changed' only state:modified+ and
+    source_status:fresher+ models are built, compared with the manifest and
+    source freshness saved by the last successful build (the pre-flight
+    freshness result is this run's side of the comparison). Full refreshes
+    and models tagged current_date always run. The artifacts are saved for
+    the next run only when every model succeeded.
+    
+    Pushes:
+        dbt_results (dict): {model_name: status, execution_time, message, ...}
+        skipped_models (dict): {model_name: reason} for models not built
+        cached_tests (list): Tests not run because they passed on the same inputs
+    """
+    ti = context['ti']
+    full_refresh_models, repair_slices = _refresh_plan(ti)
+    rebuilt = ti.xcom_pull(key='rebuilt_models', task_ids='rebuild_daily_fact') or []
+    if rebuilt:
+        print(f"🧱 Full refresh already done by rebuild_daily_fact: {', '.join(rebuilt)}")
+        full_refresh_models = [m for m in full_refresh_models if m not in rebuilt]
+    
+    build_state = BuildState(DBT_PROJECT_DIR, DBT_STATE_DIR)
+    build_state.write_sources(_preflight_result(context, 'freshness'))
+    select = build_state.selection(full_refresh_models + rebuilt) if DBT_BUILD_SELECTION == 'changed' else None
+    if select:
+        print(f"🎯 Building changed models only: {' '.join(select)}")
+    elif DBT_BUILD_SELECTION == 'changed':
+        print(f"📦 No saved build state in {DBT_STATE_DIR} - building every model")
+    
+    session = DbtSession(
+        DBT_PROJECT_DIR,
+        threads=DBT_THREADS,
+        vars=_dbt_vars(full_refresh_models, repair_slices),
+    )
+    session.parse()
+    test_cache = TestCache(os.path.join(DBT_STATE_DIR, 'test_cache.json'))
+    fingerprints = test_cache.fingerprints(build_state.manifest(), build_state.loaded_at())
+    cached_tests = test_cache.cached(fingerprints) if DBT_TEST_CACHE else []
+    ti.xcom_push(key='cached_tests', value=cached_tests)
+    if cached_tests:
+        print(f"🧪 {len(cached_tests)} of {len(fingerprints)} tests passed on the same inputs before - not re-run")
+    
+    results = session.build(
+        select=select,
+        exclude=cached_tests,
+        state=DBT_STATE_DIR if select else None,
+    )
+    ti.xcom_push(key='dbt_results', value=results)
+    test_cache.record(fingerprints, results)
+    
+    skipped = build_state.skipped(results)
+    ti.xcom_push(key='skipped_models', value=skipped)
+    if skipped:
+        print(f"⏭️ Skipped {len(skipped)} unchanged model(s):")
+        for name, reason in sorted(skipped.items()):
+            print(f"    {name:40} {reason}")
+    
+    failed = [
+        name for name, result in results.items()
+        if result['resource_type'] == 'model' and result['status'] == 'error'
+    ]
+    if failed:
+        raise AirflowException(f"dbt models failed: {', '.join(failed)}")
+    failed_tests = [
+        name for name, result in results.items()
+        if result['resource_type'] == 'test' and result['status'] in ('fail', 'error')
+    ]
+    if failed_tests:
+        # Bad data: a retry would fail the same way
+        raise AirflowFailException(f"dbt tests failed: {', '.join(failed_tests)}")
+    
+    build_state.save()
+
+
+def backfill_amenity_columns(**context):
+    """
+    Backfill only the new amenity columns of fct_daily_listing_performance
+    (chunked UPDATE) instead of full-refreshing it, and report the cost next
+    to a full refresh.
+    
+    Runs after dbt_build, which has already added the columns to the fact
+    and dim_listings (on_schema_change) and rebuilt int_listing_amenities_scd
+    with them. dim_listings keeps its history (it is never full-refreshed):
+    the versions the SCD rebuild did not re-slice get the new columns filled
+    here, also when the fact itself was full-refreshed.
+    
+    Pushes:
+        backfill_cost (dict): {'backfill': {...}, 'full_refresh': {...}}
+    """
+    ti = context['ti']
+    strategy = ti.xcom_pull(key='refresh_strategy', task_ids='check_schema_changes')
+    new_amenities = ti.xcom_pull(key='new_amenities', task_ids='check_schema_changes') or []
+    if not new_amenities:
+        print("No new amenities to backfill")
+        return
+    if strategy != 'column_backfill':
+        DbtSession(DBT_PROJECT_DIR).run_operation('fill_dim_listings_amenities', {'amenities': new_amenities})
+        return
+    
+    messages = DbtSession(DBT_PROJECT_DIR).run_operation(
+        'backfill_amenity_columns',
+        {'amenities': new_amenities, 'chunk_days': AMENITY_BACKFILL_CHUNK_DAYS},
+    )
+    
+    cost = {}
+    for message in messages:
+        key, sep, value = message.partition('=')
+        if key == 'AMENITY_BACKFILL_COST':
+            cost['backfill'] = json.loads(value)
+        elif key == 'FULL_REFRESH_COST':
+            cost['full_refresh'] = json.loads(value)
+        else:
+            print(message)
+    ti.xcom_push(key='backfill_cost', value=cost)
+    
+    backfill, full = cost.get('backfill', {}), cost.get('full_refresh', {})
+    print(f"{'':16} {'rows written':>14} {'elapsed (s)':>12} {'bytes scanned':>15}")
+    for label, row in [('column backfill', backfill), ('full refresh', full)]:
+        rows = row.get('rows_updated', row.get('rows'))
+        print(f"{label:16} {rows!s:>14} {row.get('elapsed_s')!s:>12} {row.get('bytes_scanned')!s:>15}")
+
+
+def check_model_regressions(**context):
+    """
+    Compare this run's per-model execution times (recorded by the
+    record_run_metrics on-run-end hook) with each model's rolling baseline
+    and warn about the ones that got slower.
+    
+    Warns only - a slow model does not fail the pipeline.
+    
+    Pushes:
+        model_regressions (list): [{model, refresh_mode, current_s, baseline_s, baseline_runs, change_pct}]
+    """
+    messages = DbtSession(DBT_PROJECT_DIR).run_operation(
+        'check_model_regressions',
+        {
+            'threshold_pct': MODEL_REGRESSION_THRESHOLD_PCT,
+            'window_runs': MODEL_REGRESSION_WINDOW_RUNS,
+            'min_seconds': MODEL_REGRESSION_MIN_SECONDS,
+        },
+    )
+    
+    regressions = []
+    for message in messages:
+        key, sep, value = message.partition('=')
+        if key == 'MODEL_REGRESSIONS':
+            regressions = json.loads(value)
+    context['ti'].xcom_push(key='model_regressions', value=regressions)
+    
+    if not regressions:
+        print(f"✅ No model slower than {MODEL_REGRESSION_THRESHOLD_PCT:g}% over its "
+              f"{MODEL_REGRESSION_WINDOW_RUNS}-run baseline")
+        return
+    
+    warning_message = f"""
+    ⚠️ MODEL PERFORMANCE REGRESSION
+    
+    {'model':40} {'mode':13} {'now (s)':>9} {'median (s)':>11} {'change':>8}
+    {chr(10).join([
+        f"    {r['model']:40} {r['refresh_mode']:13} {r['current_s']:>9} {r['baseline_s']:>11} {r['change_pct']:>+7}%"
+        for r in regressions
+    ])}
+    
+    Baseline: median of the last {MODEL_REGRESSION_WINDOW_RUNS} successful runs in the same refresh mode.
+    Per-run history: DEVELOPMENT.PIPELINE_MODEL_METRICS (query_id / query_tag for warehouse cost).
+    """
+    
+    print(warning_message)
+    
+    # In production, you could send a Slack message or email here
+    # from airflow.providers.slack.operators.slack_webhook import SlackWebhookOperator
+
+
+def export_parquet(**context):
+    """
+    Export the PARQUET_EXPORTS models to PARQUET_EXPORT_DIR
+    (rental_pipeline.ParquetExport): per partition, a content fingerprint
+    is compared with the last export's manifest and only new or changed
+    partitions are written; partitions that disappeared are deleted after
+    the manifest stops listing them.
+    
+    Pushes:
+        parquet_export (dict): {exported_at, seconds, manifest,
+                                tables: {model: {written, deleted, unchanged, ...}}}
+    """
+    if not PARQUET_EXPORT_DIR:
+        print("PARQUET_EXPORT_DIR is empty - Parquet export disabled")
+        return None
+    
+    models = {name: model for layer in _model_graph()['layers'].values() for name, model in layer.items()}
+    missing = [name for name in PARQUET_EXPORTS if name not in models]
+    if missing:
+        raise AirflowFailException(f"Parquet export models not in the dbt manifest: {', '.join(missing)}")
+    tables = {
+        name: {'relation': models[name]['relation_name'], 'partition_by': partition_by}
+        for name, partition_by in PARQUET_EXPORTS.items()
+    }
+    
+    connection = _warehouse_connection(query_tag='parquet-export')
+    try:
+        summary = ParquetExport(
+            connection,
+            PARQUET_EXPORT_DIR,
+            tables,
+            dialect='snowflake',
+            workers=PARQUET_EXPORT_WORKERS,
+        ).run()
+    finally:
+        connection.close()
+    
+    for name, table in summary['tables'].items():
+        print(
+            f"📦 {name}: {table['written']} partition(s) written ({table['rows_written']} rows), "
+            f"{table['deleted']} deleted, {table['unchanged']} unchanged → "
+            f"{table['files']} file(s), {table['bytes'] / 1e6:.1f} MB"
+        )
+    print(f"📦 Manifest: {summary['manifest']} ({summary['seconds']}s)")
+    context['ti'].xcom_push(key='parquet_export', value=summary)
+    return summary
+
+
+def report_model_result(model_name, **context):
+    """
+    Surface one model's outcome from dbt_build as its own Airflow task.
+    
+    - error   → task fails (with dbt's error message in the log)
+    - skipped → task is skipped (an upstream model failed, or the model
+                was unchanged and not selected)
+    - success → task succeeds
+    """
+    ti = context['ti']
+    results = ti.xcom_pull(key='dbt_results', task_ids='dbt_build')
+    if results is None:
+        raise AirflowFailException('dbt_build produced no results (failed before running models)')
+    
+    result = results.get(model_name)
+    if result is None:
+        skipped = ti.xcom_pull(key='skipped_models', task_ids='dbt_build') or {}
+        raise AirflowSkipException(
+            f"{model_name} not selected in this run: {skipped.get(model_name, 'unknown reason')}"
+        )
+    
+    response = result.get('adapter_response') or {}
+    print(f"{model_name}: {result['status']} in {result['execution_time']}s"
+          f" (rows affected: {response.get('rows_affected', 'n/a')}, query id: {response.get('query_id', 'n/a')})")
+    if result['message']:
+        print(result['message'])
+    
+    if result['status'] == 'error':
+        raise AirflowFailException(f"{model_name} failed: {result['message']}")
+    if result['status'] == 'skipped':
+        raise AirflowSkipException(f'{model_name} skipped (upstream failure)')
+
+
+def report_test_results(owner, tests, **context):
+    """
+    Surface the results of one model's (or source's) tests from dbt_build
+    as their own Airflow task, directly downstream of the model's task.
+    
+    - any fail / error      → task fails
+    - pass / warn           → task succeeds (warnings in the log)
+    - none ran (cached, or the model was skipped / not selected) → task is skipped
+    """
+    ti = context['ti']
+    results = ti.xcom_pull(key='dbt_results', task_ids='dbt_build')
+    if results is None:
+        raise AirflowFailException('dbt_build produced no results (failed before running tests)')
+    cached = set(ti.xcom_pull(key='cached_tests', task_ids='dbt_build') or [])
+    
+    ran, failed, not_run = 0, [], 0
+    for test in tests:
+        result = results.get(test)
+        if result is None:
+            not_run += 1
+            print(f"  {test}: {'passed on the same inputs before (cached)' if test in cached else 'not selected'}")
+            continue
+        print(f"  {test}: {result['status']} in {result['execution_time']}s"
+              + (f" ({result['failures']} failing rows)" if result.get('failures') else ''))
+        if result['status'] in ('fail', 'error'):
+            failed.append(test)
+            print(f"    {result['message']}")
+        elif result['status'] in ('pass', 'warn'):
+            ran += 1
+    
+    if failed:
+        raise AirflowFailException(f"{owner}: {len(failed)} test(s) failed: {', '.join(failed)}")
+    if not ran:
+        raise AirflowSkipException(f'{owner}: no tests ran ({len(cached & set(tests))} cached, {not_run} not run)')
+
+
 # =============================================================================
 # DAG Definition
 # =============================================================================
@@ -276,6 +951,41 @@ with DAG(
     
     start = EmptyOperator(task_id='start')
 
+    # =========================================================================
+    # Raw ingestion: landed files → raw.<table>, stamped with _loaded_at
+    # =========================================================================
+    
+    load_raw = PythonOperator(
+        task_id='load_raw_files',
+        python_callable=load_raw_files,
+        provide_context=True,
+        doc_md="""
+        Loads new files from RAW_LANDING_DIR/<table>/ (CSV or JSON lines,
+        optionally .gz / .bz2 / .xz) into raw.<table>: streamed in chunks,
+        bulk-loaded in parallel (PUT + COPY INTO), deduplicated on the
+        natural key and stamped with _loaded_at = load time (UTC).
+        Already-loaded files (same sha256) are skipped; per-file manifests
+        in RAW_MANIFEST_DIR, summary in XCom `raw_load`.
+        """,
+    )
+
+    # =========================================================================
+    # Pre-flight: freshness, late arrivals and schema changes in one dbt call
+    # =========================================================================
+    
+    preflight = PythonOperator(
+        task_id='preflight',
+        python_callable=run_preflight,
+        provide_context=True,
+        doc_md="""
+        Runs the preflight_checks macro: source freshness, late-arrival and
+        schema-change checks in a single dbt invocation (one parse, one
+        connection). Pushes one structured result (XCom `preflight`, also
+        written to target/preflight.json) that the three branch tasks read
+        in parallel.
+        """,
+    )
+    
     # =========================================================================
     # Source Freshness Check (BEFORE Pipeline)
     # =========================================================================
@@ -287,7 +997,8 @@ with DAG(
         doc_md="""
         Check if source tables have been refreshed recently.
         
-        Uses dbt source freshness to verify:
+        Reads the pre-flight freshness result (warn_after / error_after
+        from _sources.yml) for:
         - raw.listings
         - raw.calendar
         - raw.generated_reviews
@@ -345,71 +1056,7 @@ with DAG(
     )
 
     # =========================================================================
-    # Layer 1: Staging Models
-    # =========================================================================
-    
-    with TaskGroup(group_id='staging') as staging_group:
-        
-        stg_listings = BashOperator(
-            task_id='stg_listings',
-            bash_command=f'{DBT_CMD} run --select stg_listings',
-        )
-        
-        stg_calendar = BashOperator(
-            task_id='stg_calendar',
-            bash_command=f'{DBT_CMD} run --select stg_calendar',
-        )
-        
-        stg_reviews = BashOperator(
-            task_id='stg_reviews',
-            bash_command=f'{DBT_CMD} run --select stg_reviews',
-        )
-        
-        stg_amenities_changelog = BashOperator(
-            task_id='stg_amenities_changelog',
-            bash_command=f'{DBT_CMD} run --select stg_amenities_changelog',
-        )
-        
-        # Staging models can run in parallel
-        [stg_listings, stg_calendar, stg_reviews, stg_amenities_changelog]
-
-    # =========================================================================
-    # Layer 2: Intermediate Models
-    # =========================================================================
-    
-    with TaskGroup(group_id='intermediate') as intermediate_group:
-        
-        int_listing_amenities_scd = BashOperator(
-            task_id='int_listing_amenities_scd',
-            bash_command=f'{DBT_CMD} run --select int_listing_amenities_scd',
-        )
-        
-        int_hosts_history = BashOperator(
-            task_id='int_hosts_history',
-            bash_command=f'{DBT_CMD} run --select int_hosts_history',
-        )
-        
-        int_availability_spans = BashOperator(
-            task_id='int_availability_spans',
-            bash_command=f'{DBT_CMD} run --select int_availability_spans',
-        )
-        
-        int_listings_history = BashOperator(
-            task_id='int_listings_history',
-            bash_command=f'{DBT_CMD} run --select int_listings_history',
-        )
-        
-        int_calendar_enriched = BashOperator(
-            task_id='int_calendar_enriched',
-            bash_command=f'{DBT_CMD} run --select int_calendar_enriched',
-        )
-        
-        # Define dependencies within intermediate layer
-        int_listing_amenities_scd >> int_listings_history
-        int_listing_amenities_scd >> int_calendar_enriched
-
-    # =========================================================================
-    # Schema Change Detection (Before Marts)
+    # Schema Change Detection (Before dbt Build)
     # =========================================================================
     
     check_schema_changes_task = BranchPythonOperator(
@@ -420,7 +1067,8 @@ with DAG(
         Checks if new amenity columns have been added to source data.
         
         If new amenities detected:
-        - Full refresh required to backfill historical data
+        - Historical rows need the new amenities (SCHEMA_CHANGE_STRATEGY:
+          column-only backfill by default, or full refresh)
         - Branches to 'schema_changed' path
         
         If no changes:
@@ -431,7 +1079,7 @@ with DAG(
     
     schema_changed = EmptyOperator(
         task_id='schema_changed',
-        doc_md='New amenity columns detected - will run full refresh',
+        doc_md='New amenity columns detected - column backfill (or full refresh)',
     )
     
     schema_unchanged = EmptyOperator(
@@ -445,7 +1093,7 @@ with DAG(
     )
     
     # =========================================================================
-    # Late Arrival Detection (Before Marts)
+    # Late Arrival Detection (Before dbt Build)
     # =========================================================================
     
     check_late_arrivals_task = BranchPythonOperator(
@@ -453,14 +1101,15 @@ with DAG(
         python_callable=check_late_arrivals,
         provide_context=True,
         doc_md="""
-        Detects late-arriving rows (older business dates but recently ingested).
-        If detected, we will trigger a full refresh/backfill for the fact model.
+        Detects late-arriving rows (older business dates but recently ingested)
+        and pushes the affected listing × date-range slices and calendar months
+        for a bounded repair in dbt_build.
         """,
     )
     
     late_arrivals_detected = EmptyOperator(
         task_id='late_arrivals_detected',
-        doc_md='Late arrivals found - favor full refresh for correctness',
+        doc_md='Late arrivals found - repair the affected slices and months',
     )
     
     late_arrivals_clean = EmptyOperator(
@@ -474,97 +1123,128 @@ with DAG(
     )
 
     # =========================================================================
-    # Layer 3: Mart Models (Dimensions & Facts)
+    # dbt Build: All Layers in One In-Process Session
     # =========================================================================
     
-    with TaskGroup(group_id='marts') as marts_group:
-        
-        # Dimensions
-        dim_date = BashOperator(
-            task_id='dim_date',
-            bash_command=f'{DBT_CMD} run --select dim_date',
-        )
-        
-        dim_hosts = BashOperator(
-            task_id='dim_hosts',
-            bash_command=f'{DBT_CMD} run --select dim_hosts',
-        )
-        
-        dim_listings = BashOperator(
-            task_id='dim_listings',
-            bash_command=f'{DBT_CMD} run --select dim_listings',
-        )
-        
-        # Fact table with dynamic refresh strategy
-        # Uses XCom to determine if full refresh is needed
-        fct_daily = BashOperator(
-            task_id='fct_daily_listing_performance',
-            bash_command='''
-                SCHEMA_STRATEGY="{{ ti.xcom_pull(key='refresh_strategy', task_ids='check_schema_changes') }}"
-                LATE_ARRIVALS="{{ ti.xcom_pull(key='late_arrivals_detected', task_ids='check_late_arrivals') }}"
-                if [ "$SCHEMA_STRATEGY" = "full_refresh" ] || [ "$LATE_ARRIVALS" = "True" ]; then
-                    echo "🔄 Full refresh triggered (schema change or late arrivals)"
-                    ''' + DBT_CMD + ''' run --full-refresh --select fct_daily_listing_performance
-                else
-                    echo "⚡ Incremental run"
-                    ''' + DBT_CMD + ''' run --select fct_daily_listing_performance
-                fi
-            ''',
-        )
-        
-        fct_monthly_listing = BashOperator(
-            task_id='fct_monthly_listing_performance',
-            bash_command=f'{DBT_CMD} run --select fct_monthly_listing_performance',
-        )
-        
-        fct_monthly_neighborhood = BashOperator(
-            task_id='fct_monthly_neighborhood_summary',
-            bash_command=f'{DBT_CMD} run --select fct_monthly_neighborhood_summary',
-        )
-        
-        # Define dependencies within marts layer
-        [dim_date, dim_hosts] >> dim_listings
-        dim_listings >> fct_daily
-        fct_daily >> [fct_monthly_listing, fct_monthly_neighborhood]
+    dbt_build = PythonOperator(
+        task_id='dbt_build',
+        python_callable=run_dbt_build,
+        provide_context=True,
+        execution_timeout=timedelta(hours=3),
+        doc_md="""
+        Parses the project once and builds staging → intermediate → marts →
+        analytics in a single dbt invocation with `threads` > 1.
 
-    # =========================================================================
-    # Layer 4: Analytics Models
-    # =========================================================================
-    
-    with TaskGroup(group_id='analytics') as analytics_group:
-        
-        problem_1 = BashOperator(
-            task_id='problem_1_amenity_revenue',
-            bash_command=f'{DBT_CMD} run --select problem_1_amenity_revenue',
-        )
-        
-        problem_2 = BashOperator(
-            task_id='problem_2_neighborhood_pricing',
-            bash_command=f'{DBT_CMD} run --select problem_2_neighborhood_pricing',
-        )
-        
-        problem_3a = BashOperator(
-            task_id='problem_3a_max_stay_duration',
-            bash_command=f'{DBT_CMD} run --select problem_3a_max_stay_duration',
-        )
-        
-        problem_3b = BashOperator(
-            task_id='problem_3b_max_stay_lockbox_firstaid',
-            bash_command=f'{DBT_CMD} run --select problem_3b_max_stay_lockbox_firstaid',
-        )
-        
-        # Analytics can run in parallel
-        [problem_1, problem_2, problem_3a, problem_3b]
+        `dbt build`: each model's tests run right after it and a failing
+        test skips everything downstream. Tests that passed on the same
+        inputs before are excluded (XCom `cached_tests`).
 
+        Only models changed since the last successful build are selected
+        (`state:modified+ source_status:fresher+`, plus full refreshes and
+        `tag:current_date`); the log and XCom `skipped_models` say why each
+        other model was skipped.
+        
+        The fact table is full-refreshed only when the schema or late-arrival
+        checks ask for it (via var `full_refresh_models`, or batched by
+        rebuild_daily_fact beforehand). Late arrivals are
+        otherwise repaired in place (var `repair_slices` in 'lookback' mode),
+        and the monthly facts recompute only the months the fact's merge changed.
+        """,
+    )
+    
+    rebuild_fact = PythonOperator(
+        task_id='rebuild_daily_fact',
+        python_callable=rebuild_daily_fact,
+        provide_context=True,
+        retries=6,
+        doc_md="""
+        Only when fct_daily_listing_performance needs a full refresh (and
+        FCT_FULL_REFRESH_MODE='batched'): builds the fact's inputs, then
+        rebuilds the fact in FCT_REBUILD_GRAIN batches (month / week) on
+        FCT_REBUILD_WORKERS threads into a shadow table that is swapped in
+        at the end. Finished batches are recorded in DBT_STATE_DIR, so a
+        retry after a failure or a timeout resumes where it stopped.
+        Summary in XCom `fact_rebuild`. No-op otherwise.
+        """,
+    )
+    
+    backfill_amenities = PythonOperator(
+        task_id='backfill_amenity_columns',
+        python_callable=backfill_amenity_columns,
+        provide_context=True,
+        execution_timeout=timedelta(hours=2),
+        doc_md="""
+        On a schema change, fills only the new amenity columns of the fact for
+        historical rows (date-chunked UPDATE) and logs its cost next to a full
+        refresh. No-op when there are no new amenities.
+        """,
+    )
+    
+    model_regressions = PythonOperator(
+        task_id='check_model_regressions',
+        python_callable=check_model_regressions,
+        provide_context=True,
+        trigger_rule='all_done',
+        retries=0,
+        doc_md="""
+        Compares each model's execution time in this run (recorded by the
+        on-run-end metrics hook) with the median of its previous runs in the
+        same refresh mode, and logs a warning for models that regressed by
+        more than MODEL_REGRESSION_THRESHOLD_PCT.
+        """,
+    )
+    
+    parquet_export = PythonOperator(
+        task_id='export_parquet',
+        python_callable=export_parquet,
+        provide_context=True,
+        execution_timeout=timedelta(hours=1),
+        doc_md="""
+        Writes the monthly facts (by calendar_month), dim_listings (by
+        neighborhood) and the analytics outputs as Parquet files to
+        PARQUET_EXPORT_DIR. Only partitions whose content changed in this
+        run are rewritten; `manifest.json` lists the current files.
+        Runs after backfill_amenity_columns. Summary in XCom `parquet_export`.
+        """,
+    )
+    
     # =========================================================================
-    # Layer 5: Data Quality Tests
+    # Per-Model Status and Test Tasks (generated from manifest.json, fed by
+    # dbt_build results): <model> → <model>_tests → downstream models
     # =========================================================================
     
-    dbt_test = BashOperator(
-        task_id='dbt_test',
-        bash_command=f'{DBT_CMD} test',
-        doc_md='Run all dbt data quality tests',
-    )
+    model_tasks, test_tasks = {}, {}
+    with TaskGroup(group_id='sources'):
+        for source_name, source in MODEL_GRAPH['sources'].items():
+            if source['tests']:
+                test_tasks[source_name] = PythonOperator(
+                    task_id=source_name.replace('.', '_') + '_tests',
+                    python_callable=report_test_results,
+                    op_kwargs={'owner': source_name, 'tests': source['tests']},
+                    provide_context=True,
+                    trigger_rule='all_done',
+                    retries=0,
+                )
+    for layer, models in MODEL_GRAPH['layers'].items():
+        with TaskGroup(group_id=layer):
+            for model_name, model in models.items():
+                model_tasks[model_name] = PythonOperator(
+                    task_id=model_name,
+                    python_callable=report_model_result,
+                    op_kwargs={'model_name': model_name},
+                    provide_context=True,
+                    trigger_rule='all_done',
+                    retries=0,
+                )
+                if model['tests']:
+                    test_tasks[model_name] = PythonOperator(
+                        task_id=f'{model_name}_tests',
+                        python_callable=report_test_results,
+                        op_kwargs={'owner': model_name, 'tests': model['tests']},
+                        provide_context=True,
+                        trigger_rule='all_done',
+                        retries=0,
+                    )
 
     # =========================================================================
     # Generate Documentation
@@ -586,8 +1266,12 @@ with DAG(
     # DAG Dependencies
     # =========================================================================
     
-    # Source freshness check flow
-    start >> check_source_freshness_task
+    # Load landed files, then one pre-flight invocation, then the three
+    # branch decisions in parallel
+    start >> load_raw >> preflight
+    preflight >> [check_source_freshness_task, check_late_arrivals_task, check_schema_changes_task]
+    
+    # Source freshness branching
     check_source_freshness_task >> [source_freshness_passed, source_freshness_warning, source_freshness_failed]
     
     # Continue pipeline after successful/warning freshness check
@@ -595,20 +1279,48 @@ with DAG(
     source_freshness_warning >> freshness_check_complete
     # source_freshness_failed does NOT connect to freshness_check_complete (blocks pipeline)
     
-    # Main pipeline flow with late-arrival + schema detection
-    freshness_check_complete >> dbt_deps >> dbt_debug >> staging_group
-    staging_group >> intermediate_group >> check_late_arrivals_task
+    # dbt setup runs alongside the pre-flight checks
+    start >> dbt_deps >> dbt_debug
+    
+    # Late-arrival branching
     check_late_arrivals_task >> [late_arrivals_detected, late_arrivals_clean]
     late_arrivals_detected >> late_arrivals_check_complete
     late_arrivals_clean >> late_arrivals_check_complete
     
-    late_arrivals_check_complete >> check_schema_changes_task
-    
     # Schema change branching
     check_schema_changes_task >> [schema_changed, schema_unchanged]
     schema_changed >> schema_check_complete
     schema_unchanged >> schema_check_complete
     
-    # Continue to marts after checks
-    schema_check_complete >> marts_group >> analytics_group
-    analytics_group >> dbt_test >> dbt_docs >> end
+    # Build everything once sources are fresh and the refresh strategy is known
+    # (the fact's batched full refresh first, when one is needed)
+    [freshness_check_complete, dbt_debug, late_arrivals_check_complete, schema_check_complete] >> rebuild_fact
+    rebuild_fact >> dbt_build
+    
+    # Per-model tasks follow the manifest's lineage: a model's task waits for
+    # its parents' test tasks (or the parent itself when it has no tests)
+    # and for the tests of the sources it reads
+    has_downstream = set()
+    for source_name, task in test_tasks.items():
+        if source_name in MODEL_GRAPH['sources']:
+            dbt_build >> task
+    for models in MODEL_GRAPH['layers'].values():
+        for model_name, model in models.items():
+            upstream = [test_tasks.get(p, model_tasks[p]) for p in model['parents'] if p in model_tasks]
+            upstream += [test_tasks[s] for s in model['sources'] if s in test_tasks]
+            (upstream or [dbt_build]) >> model_tasks[model_name]
+            has_downstream.update(task.task_id for task in upstream)
+            if model_name in test_tasks:
+                model_tasks[model_name] >> test_tasks[model_name]
+                has_downstream.add(model_tasks[model_name].task_id)
+    leaves = [
+        task for task in [*model_tasks.values(), *test_tasks.values()]
+        if task.task_id not in has_downstream
+    ]
+    
+    dbt_build >> backfill_amenities
+    dbt_build >> model_regressions >> end
+    # Exports dim_listings: after the amenity backfill has filled its new columns
+    backfill_amenities >> parquet_export >> end
+    [*leaves, backfill_amenities] >> dbt_docs
+    dbt_docs >> end
@@ -0,0 +1,221 @@
+/*
+================================================================================
+FILE: amenity_bitmask.sql
+LAYER: Macros
+================================================================================
+
+PURPOSE:
+    Optional compact encoding for amenities. Instead of one boolean column
+    per amenity, wide models store packed BIGINT bitmasks:
+
+        amenity_bitmask_0  → amenities with amenity_id 1..63
+        amenity_bitmask_1  → amenities with amenity_id 64..126  (if needed)
+
+    Bit positions come from the stable amenity_id in stg_amenity_registry
+    (see dim_amenities), so a new amenity sets a new bit instead of adding
+    a column - the schema only grows once every 63 amenities.
+
+MODES:
+    var('amenity_encoding'):
+        'columns' (default) - one boolean column per amenity
+        'bitmask'           - amenity_bitmask_<n> columns
+
+    Applies to int_availability_spans, dim_listings and
+    fct_daily_listing_performance. Switching modes changes the table schema,
+    so full-refresh fct_daily_listing_performance afterwards.
+    fct_listing_max_stay_index stores bitmasks in both modes.
+
+MACROS:
+    1. amenity_encoding()         - Current mode (validated)
+    2. amenity_bits_per_word()    - Bits packed into each BIGINT (63)
+    3. amenity_bit(name)          - {word, bit, value} for an amenity, or none
+    4. amenity_bitmask_columns()  - Names of the bitmask columns
+    5. amenity_bitmask_select()   - SELECT expressions building the bitmasks
+    6. amenity_flag(name)         - Boolean expression for one amenity
+    7. has_amenities([names])     - Predicate "has ALL of these amenities"
+
+USAGE:
+    where {{ has_amenities(['Lockbox', 'First aid kit'], 'fs') }}
+
+    Compiles to (bitmask mode):
+        where bitand(coalesce(fs.amenity_bitmask_0, 0), 24) = 24
+    or (columns mode):
+        where fs."Lockbox" = true and fs."First aid kit" = true
+
+NOTE:
+    An amenity missing from the registry compiles to `false`, so filters on
+    unknown amenities return no rows instead of failing.
+================================================================================
+*/
+
+
+{% macro amenity_encoding() %}
+{#
+    Returns: 'columns' or 'bitmask'
+#}
+
+{%- set encoding = var('amenity_encoding', 'columns') -%}
+{%- if encoding not in ['columns', 'bitmask'] -%}
+    {{ exceptions.raise_compiler_error(
+        "Invalid var amenity_encoding '" ~ encoding ~ "' - expected 'columns' or 'bitmask'"
+    ) }}
+{%- endif -%}
+
+{{ return(encoding) }}
+
+{% endmacro %}
+
+
+{% macro amenity_bits_per_word() %}
+{#
+    63 bits per BIGINT word: the sign bit is never used, so every mask is a
+    non-negative number on all warehouses.
+
+    Returns: Integer
+#}
+
+{{ return(63) }}
+
+{% endmacro %}
+
+
+{% macro amenity_bit(amenity_name) %}
+{#
+    Look up the bit assigned to an amenity.
+
+    Returns: Dict with word, bit, value (2^bit) - or none if not registered
+#}
+
+{%- for amenity in get_amenity_registry() if amenity.amenity_name == amenity_name -%}
+    {%- set position = amenity.amenity_id - 1 -%}
+    {%- set bit = position % amenity_bits_per_word() -%}
+    {{ return({
+        'word': position // amenity_bits_per_word(),
+        'bit': bit,
+        'value': 2 ** bit
+    }) }}
+{%- endfor -%}
+
+{{ return(none) }}
+
+{% endmacro %}
+
+
+{% macro amenity_bitmask_columns() %}
+{#
+    One column per 63 registered amenities (at least one).
+
+    Returns: List of column names, e.g. ['amenity_bitmask_0']
+#}
+
+{%- set ids = get_amenity_registry() | map(attribute='amenity_id') | list -%}
+{%- set max_id = ids | max if ids else 1 -%}
+{%- set columns = [] -%}
+{%- for word in range((max_id - 1) // amenity_bits_per_word() + 1) -%}
+    {%- do columns.append('amenity_bitmask_' ~ word) -%}
+{%- endfor -%}
+
+{{ return(columns) }}
+
+{% endmacro %}
+
+
+{% macro amenity_bitmask_select(amenity_columns, relation_alias=none) %}
+{#
+    Build the bitmask columns from boolean amenity columns.
+
+    Args:
+        amenity_columns: Amenity names available as boolean columns
+        relation_alias: Optional table alias for the boolean columns
+
+    Returns: Comma-separated SELECT expressions (no trailing comma)
+#}
+
+{%- set prefix = relation_alias ~ '.' if relation_alias else '' -%}
+{%- set words = {} -%}
+{%- for amenity in amenity_columns -%}
+    {%- set bit = amenity_bit(amenity) -%}
+    {%- if bit is not none -%}
+        {%- do words.setdefault(bit.word, []).append(
+            'iff(coalesce(' ~ prefix ~ '"' ~ amenity ~ '", false), ' ~ bit.value ~ ', 0)'
+        ) -%}
+    {%- endif -%}
+{%- endfor -%}
+
+{%- for column in amenity_bitmask_columns() %}
+        {% set terms = words.get(loop.index0, []) -%}
+        ({{ terms | join(' + ') if terms else '0' }})::bigint as {{ column }}{% if not loop.last %},{% endif %}
+{%- endfor -%}
+
+{% endmacro %}
+
+
+{% macro amenity_flag(amenity_name, relation_alias=none, encoding=none) %}
+{#
+    Boolean expression for a single amenity in the current encoding.
+
+    Args:
+        encoding: Encoding of the relation, as in has_amenities()
+
+    Returns: SQL expression string
+#}
+
+{%- set prefix = relation_alias ~ '.' if relation_alias else '' -%}
+
+{%- if (encoding or amenity_encoding()) == 'columns' -%}
+    {{ return(prefix ~ '"' ~ amenity_name ~ '"') }}
+{%- endif -%}
+
+{%- set bit = amenity_bit(amenity_name) -%}
+{%- if bit is none -%}
+    {{ return('false') }}
+{%- endif -%}
+
+{{ return('(bitand(coalesce(' ~ prefix ~ 'amenity_bitmask_' ~ bit.word ~ ', 0), ' ~ bit.value ~ ') <> 0)') }}
+
+{% endmacro %}
+
+
+{% macro has_amenities(amenity_names, relation_alias=none, encoding=none) %}
+{#
+    Predicate that is true when a row has ALL the given amenities.
+    In bitmask mode the amenities are combined into one mask per word, so
+    "has X and Y" is a single bitand per word.
+
+    Args:
+        encoding: Encoding of the relation ('columns' / 'bitmask'), default
+                  amenity_encoding(); models that always store bitmasks
+                  (fct_listing_max_stay_index) pass 'bitmask'
+
+    Returns: SQL predicate string
+#}
+
+{%- set prefix = relation_alias ~ '.' if relation_alias else '' -%}
+
+{%- if (encoding or amenity_encoding()) == 'columns' -%}
+    {%- set checks = [] -%}
+    {%- for amenity in amenity_names -%}
+        {%- do checks.append(prefix ~ '"' ~ amenity ~ '" = true') -%}
+    {%- endfor -%}
+    {{ return(checks | join(' and ') if checks else 'true') }}
+{%- endif -%}
+
+{%- set masks = {} -%}
+{%- for amenity in amenity_names | unique -%}
+    {%- set bit = amenity_bit(amenity) -%}
+    {%- if bit is none -%}
+        {{ return('false') }}
+    {%- endif -%}
+    {%- do masks.update({bit.word: masks.get(bit.word, 0) + bit.value}) -%}
+{%- endfor -%}
+
+{%- set checks = [] -%}
+{%- for word, mask in masks | dictsort -%}
+    {%- do checks.append(
+        'bitand(coalesce(' ~ prefix ~ 'amenity_bitmask_' ~ word ~ ', 0), ' ~ mask ~ ') = ' ~ mask
+    ) -%}
+{%- endfor -%}
+
+{{ return(checks | join(' and ') if checks else 'true') }}
+
+{% endmacro %}
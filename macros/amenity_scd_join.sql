@@ -0,0 +1,128 @@
+/*
+================================================================================
+FILE: amenity_scd_join.sql
+LAYER: Macros
+================================================================================
+
+PURPOSE:
+    Attach the int_listing_amenities_scd version valid on a date to each
+    row of a listing × date relation. The range join
+
+        left join amenities_scd a
+            on c.listing_id = a.listing_id
+            and c.calendar_date >= a.valid_from
+            and c.calendar_date <= a.valid_to
+
+    has no equality on the date, so the warehouse compares every calendar
+    row of a listing with every SCD version of that listing (a per-listing
+    cartesian product filtered afterwards). On listing × day volumes that
+    join dominates the fact build.
+
+MODES (var amenity_scd_join_mode):
+    'asof' (default)
+        ASOF join: per row, the version with the latest valid_from at or
+        before the date. Snowflake: ASOF JOIN ... MATCH_CONDITION,
+        DuckDB: ASOF LEFT JOIN. Adapters without ASOF use 'equi'.
+    'equi'
+        Equi-join on a precomputed change-date key: the SCD valid_from
+        dates and the (listing_id, date) lookups are sorted together per
+        listing; a running max(valid_from) gives each lookup its version
+        key, then a plain hash join on (listing_id, valid_from) fetches it.
+    'range'
+        The original range join.
+
+    All three return the same rows: SCD versions are contiguous and
+    non-overlapping per listing (valid_to = next valid_from - 1 day, the
+    last one 9999-12-31), so "latest valid_from <= date" is the version
+    whose window contains the date. Dates before a listing's first version
+    match nothing, as with the range join.
+
+USAGE:
+    from calendar c
+    inner join listings l on c.listing_id = l.listing_id
+    {{ amenity_scd_join('c', 'calendar_date', 'calendar', ref('int_listing_amenities_scd'), 'a') }}
+
+    Compare the modes: python benchmark/run_benchmark.py --vars '{"amenity_scd_join_mode": "range"}' ...
+================================================================================
+*/
+
+
+{% macro amenity_scd_join(left_alias, date_column, left_relation, scd_relation, scd_alias='a', mode=none) %}
+{#
+    Args:
+        left_alias: Alias of the listing × date side in the FROM clause
+        date_column: Date column of that side
+        left_relation: Relation / CTE behind left_alias (read by 'equi')
+        scd_relation: int_listing_amenities_scd relation or CTE
+        scd_alias: Alias for the SCD columns (a."<amenity>" ...)
+        mode: 'asof', 'equi' or 'range' (default: var amenity_scd_join_mode)
+
+    Returns: SQL join clause(s); unmatched rows keep NULL SCD columns
+#}
+
+{%- set mode = mode or var('amenity_scd_join_mode', 'asof') -%}
+{%- if mode not in ['asof', 'equi', 'range'] -%}
+    {{ exceptions.raise_compiler_error(
+        "amenity_scd_join_mode must be 'asof', 'equi' or 'range', got '" ~ mode ~ "'"
+    ) }}
+{%- endif -%}
+{%- if mode == 'asof' and target.type not in ['snowflake', 'duckdb'] -%}
+    {%- set mode = 'equi' -%}
+{%- endif -%}
+
+{%- if mode == 'asof' -%}
+    {{ adapter.dispatch('amenity_scd_asof_join')(left_alias, date_column, scd_relation, scd_alias) }}
+
+{%- elif mode == 'equi' -%}
+    {%- set key_alias = scd_alias ~ '_key' %}
+    -- Version key per (listing_id, date): running max of valid_from
+    left join (
+        select listing_id, lookup_date, scd_valid_from
+        from (
+            select
+                listing_id,
+                lookup_date,
+                is_lookup,
+                max(scd_valid_from) over (
+                    partition by listing_id
+                    order by lookup_date, is_lookup
+                    rows between unbounded preceding and current row
+                ) as scd_valid_from
+            from (
+                select distinct listing_id, {{ date_column }} as lookup_date, 1 as is_lookup, cast(null as date) as scd_valid_from
+                from {{ left_relation }}
+                union all
+                select listing_id, valid_from, 0, valid_from
+                from {{ scd_relation }}
+            ) keyed
+        ) ordered
+        where is_lookup = 1
+    ) {{ key_alias }}
+        on {{ left_alias }}.listing_id = {{ key_alias }}.listing_id
+        and {{ left_alias }}.{{ date_column }} = {{ key_alias }}.lookup_date
+    left join {{ scd_relation }} {{ scd_alias }}
+        on {{ scd_alias }}.listing_id = {{ key_alias }}.listing_id
+        and {{ scd_alias }}.valid_from = {{ key_alias }}.scd_valid_from
+        and {{ left_alias }}.{{ date_column }} <= {{ scd_alias }}.valid_to
+
+{%- else %}
+    left join {{ scd_relation }} {{ scd_alias }}
+        on {{ left_alias }}.listing_id = {{ scd_alias }}.listing_id
+        and {{ left_alias }}.{{ date_column }} >= {{ scd_alias }}.valid_from
+        and {{ left_alias }}.{{ date_column }} <= {{ scd_alias }}.valid_to
+{%- endif -%}
+
+{% endmacro %}
+
+
+{% macro default__amenity_scd_asof_join(left_alias, date_column, scd_relation, scd_alias) %}
+    asof join {{ scd_relation }} {{ scd_alias }}
+        match_condition ({{ left_alias }}.{{ date_column }} >= {{ scd_alias }}.valid_from)
+        on {{ left_alias }}.listing_id = {{ scd_alias }}.listing_id
+{% endmacro %}
+
+{% macro duckdb__amenity_scd_asof_join(left_alias, date_column, scd_relation, scd_alias) %}
+    asof left join {{ scd_relation }} {{ scd_alias }}
+        on {{ left_alias }}.listing_id = {{ scd_alias }}.listing_id
+        and {{ left_alias }}.{{ date_column }} >= {{ scd_alias }}.valid_from
+{% endmacro %}
@@ -0,0 +1,299 @@
+/*
+================================================================================
+FILE: backfill_amenity_columns.sql
+LAYER: Macros
+================================================================================
+
+PURPOSE:
+    Schema-evolution path for new amenities: add the new amenity columns to
+    fct_daily_listing_performance and backfill ONLY those columns for the
+    historical rows, instead of full-refreshing the fact (and everything
+    downstream) to fill a few booleans.
+
+LOGIC:
+    1. Add any missing column to the fact:
+         - columns mode: one BOOLEAN per new amenity
+         - bitmask mode: the amenity_bitmask_<n> BIGINT word(s) holding the
+           new bits (see amenity_bitmask.sql)
+    2. Walk the fact's calendar_date range in chunks of chunk_days and run
+       one UPDATE per chunk. Values come from the same point-in-time logic
+       as the model:
+           coalesce(int_listing_amenities_scd."X", stg_listings."X")
+    3. Only rows whose value actually changes are written, so a re-run
+       (or a run after a failed chunk) skips the chunks already done
+    4. dim_listings (incremental, never full-refreshed) got the columns from
+       on_schema_change, and dbt_build re-sliced every listing with amenity
+       history from the rebuilt SCD. The versions left NULL (listings
+       without amenity history) get false / no bit, as in its first build
+       (fill_dim_listings_amenities, also run alone by the DAG when the
+       fact is full-refreshed instead).
+    5. Report the cost next to a full refresh of the fact:
+         AMENITY_BACKFILL_COST={"chunks": 12, "rows_updated": ..., "elapsed_s": ..., "bytes_scanned": ...}
+         FULL_REFRESH_COST={"rows": ..., "table_bytes": ..., "elapsed_s": ..., "bytes_scanned": ...}
+       Backfill figures come from the UPDATE statements' query history; the
+       full refresh figures from the fact's size and its last full rebuild
+       (CREATE TABLE AS) in the 7-day INFORMATION_SCHEMA query history,
+       or null if there was none. Query history is Snowflake-only; on other
+       targets (DuckDB) only row counts and wall time are reported.
+
+PREREQUISITE:
+    int_listing_amenities_scd and stg_listings must already contain the new
+    amenities (the DAG runs this after dbt_build, which full-refreshes the SCD
+    on a schema change).
+
+USAGE:
+    dbt run-operation backfill_amenity_columns --args '{"amenities": ["Pool"], "chunk_days": 30}'
+    dbt run-operation backfill_amenity_columns --args '{"amenities": ["Pool"], "dry_run": true}'
+    dbt run-operation fill_dim_listings_amenities --args '{"amenities": ["Pool"]}'
+
+RETURNS:
+    Dict: {backfill: {...}, full_refresh: {...}}
+================================================================================
+*/
+
+{% macro backfill_amenity_columns(amenities, chunk_days=30, dry_run=false) %}
+
+    {%- if not execute -%}
+        {{ return({}) }}
+    {%- endif -%}
+
+    {%- if not amenities -%}
+        {{ exceptions.raise_compiler_error("backfill_amenity_columns: no amenities given") }}
+    {%- endif -%}
+
+    {%- set fact = load_relation(ref('fct_daily_listing_performance')) -%}
+    {%- if fact is none -%}
+        {{ log("fct_daily_listing_performance does not exist yet - nothing to backfill", info=True) }}
+        {{ return({}) }}
+    {%- endif -%}
+
+    {%- set existing = adapter.get_columns_in_relation(fact) | map(attribute='name') | map('upper') | list -%}
+
+    {# -------------------------------------------------------------------- #}
+    {# Columns to add, SET clauses, source expressions, "changed" checks    #}
+    {# -------------------------------------------------------------------- #}
+    {%- set add_columns = {} -%}
+    {%- set set_clauses = [] -%}
+    {%- set source_exprs = [] -%}
+    {%- set changed_checks = [] -%}
+
+    {%- if amenity_encoding() == 'bitmask' -%}
+        {%- set words = {} -%}
+        {%- for amenity in amenities -%}
+            {%- set bit = amenity_bit(amenity) -%}
+            {%- if bit is none -%}
+                {{ exceptions.raise_compiler_error("backfill_amenity_columns: '" ~ amenity ~ "' is not in stg_amenity_registry") }}
+            {%- endif -%}
+            {%- do words.setdefault(bit.word, []).append(
+                'iff(coalesce(a."' ~ amenity ~ '", l."' ~ amenity ~ '", false), ' ~ bit.value ~ ', 0)'
+            ) -%}
+        {%- endfor -%}
+        {%- for word, terms in words | dictsort -%}
+            {%- set column = 'amenity_bitmask_' ~ word -%}
+            {%- if column | upper not in existing -%}
+                {%- do add_columns.update({column: 'bigint'}) -%}
+            {%- endif -%}
+            {%- do source_exprs.append('(' ~ terms | join(' + ') ~ ')::bigint as ' ~ column) -%}
+            {%- do set_clauses.append(column ~ ' = bitor(coalesce(f.' ~ column ~ ', 0), s.' ~ column ~ ')') -%}
+            {%- do changed_checks.append('bitand(coalesce(f.' ~ column ~ ', 0), s.' ~ column ~ ') <> s.' ~ column) -%}
+        {%- endfor -%}
+    {%- else -%}
+        {%- for amenity in amenities -%}
+            {%- if amenity | upper not in existing -%}
+                {%- do add_columns.update({'"' ~ amenity ~ '"': 'boolean'}) -%}
+            {%- endif -%}
+            {%- do source_exprs.append('coalesce(a."' ~ amenity ~ '", l."' ~ amenity ~ '") as "' ~ amenity ~ '"') -%}
+            {%- do set_clauses.append('"' ~ amenity ~ '" = s."' ~ amenity ~ '"') -%}
+            {%- do changed_checks.append('f."' ~ amenity ~ '" is distinct from s."' ~ amenity ~ '"') -%}
+        {%- endfor -%}
+    {%- endif -%}
+
+    {# -------------------------------------------------------------------- #}
+    {# Chunk plan over the fact's calendar_date range                        #}
+    {# -------------------------------------------------------------------- #}
+    {%- set bounds = run_query('select min(calendar_date), max(calendar_date), count(*) from ' ~ fact).rows[0] -%}
+    {%- set chunks = [] -%}
+    {%- if bounds[0] is not none -%}
+        {%- set ns = namespace(start=bounds[0]) -%}
+        {%- for i in range(((bounds[1] - bounds[0]).days // chunk_days) + 1) -%}
+            {%- set chunk_end = ns.start + modules.datetime.timedelta(days=chunk_days - 1) -%}
+            {%- do chunks.append((ns.start, [chunk_end, bounds[1]] | min)) -%}
+            {%- set ns.start = chunk_end + modules.datetime.timedelta(days=1) -%}
+        {%- endfor -%}
+    {%- endif -%}
+
+    {{ log("Backfilling " ~ amenities | join(", ") ~ " in " ~ fact ~ ": "
+           ~ chunks | length ~ " chunk(s) of " ~ chunk_days ~ " days", info=True) }}
+
+    {# -------------------------------------------------------------------- #}
+    {# Add columns and run the chunked UPDATEs                              #}
+    {# -------------------------------------------------------------------- #}
+    {%- set query_ids = [] -%}
+    {%- set ns = namespace(rows_updated=0) -%}
+    {%- set started_at = modules.datetime.datetime.now() -%}
+
+    {%- if not dry_run -%}
+        {%- for column, data_type in add_columns | dictsort -%}
+            {{ log("Adding column " ~ column ~ " " ~ data_type, info=True) }}
+            {%- do run_query('alter table ' ~ fact ~ ' add column ' ~ column ~ ' ' ~ data_type) -%}
+        {%- endfor -%}
+
+        {%- for chunk_start, chunk_end in chunks -%}
+            {%- set update_sql -%}
+                update {{ fact }} f
+                set
+                    {{ set_clauses | join(',\n                    ') }},
+                    dbt_updated_at = current_timestamp()
+                from (
+                    select
+                        k.listing_id,
+                        k.calendar_date,
+                        {{ source_exprs | join(',\n                        ') }}
+                    from {{ fact }} k
+                    inner join {{ ref('stg_listings') }} l
+                        on k.listing_id = l.listing_id
+                    left join {{ ref('int_listing_amenities_scd') }} a
+                        on k.listing_id = a.listing_id
+                        and k.calendar_date >= a.valid_from
+                        and k.calendar_date <= a.valid_to
+                    where k.calendar_date between '{{ chunk_start }}' and '{{ chunk_end }}'
+                ) s
+                where f.listing_id = s.listing_id
+                  and f.calendar_date = s.calendar_date
+                  and f.calendar_date between '{{ chunk_start }}' and '{{ chunk_end }}'
+                  and ({{ changed_checks | join(' or ') }})
+            {%- endset -%}
+            {%- set response, _ = adapter.execute(update_sql, auto_begin=false, fetch=false) -%}
+            {%- set ns.rows_updated = ns.rows_updated + (response.rows_affected or 0) -%}
+            {%- do query_ids.append(response.query_id) -%}
+            {{ log("  chunk " ~ loop.index ~ "/" ~ loop.length ~ " " ~ chunk_start ~ " → " ~ chunk_end
+                   ~ ": " ~ (response.rows_affected or 0) ~ " row(s)", info=True) }}
+        {%- endfor -%}
+
+        {%- do fill_dim_listings_amenities(amenities) -%}
+    {%- endif -%}
+
+    {%- set wall_seconds = (modules.datetime.datetime.now() - started_at).total_seconds() -%}
+
+    {# -------------------------------------------------------------------- #}
+    {# Cost report: backfill vs full refresh                                #}
+    {# -------------------------------------------------------------------- #}
+    {%- set backfill = {
+        'amenities': amenities,
+        'chunks': chunks | length,
+        'rows_updated': ns.rows_updated,
+        'elapsed_s': none,
+        'bytes_scanned': none,
+        'wall_s': wall_seconds | round(1),
+        'dry_run': dry_run
+    } -%}
+    {%- set has_query_history = target.type == 'snowflake' -%}
+    {%- if query_ids and has_query_history -%}
+        {%- set history -%}
+            select
+                sum(total_elapsed_time) / 1000 as elapsed_s,
+                sum(bytes_scanned) as bytes_scanned
+            from table(information_schema.query_history_by_session(result_limit => 10000))
+            where query_id in ('{{ query_ids | join("', '") }}')
+        {%- endset -%}
+        {%- set row = run_query(history).rows[0] -%}
+        {%- do backfill.update({
+            'elapsed_s': row[0] | float | round(1) if row[0] is not none else none,
+            'bytes_scanned': row[1] | int if row[1] is not none else none
+        }) -%}
+    {%- endif -%}
+
+    {%- set size_query -%}
+        select row_count, bytes
+        from {{ fact.database }}.information_schema.tables
+        where table_schema = '{{ fact.schema | upper }}'
+          and table_name = '{{ fact.identifier | upper }}'
+    {%- endset -%}
+    {%- set size = run_query(size_query).rows if has_query_history else [] -%}
+
+    {%- set last_rebuild_query -%}
+        select
+            total_elapsed_time / 1000 as elapsed_s,
+            bytes_scanned,
+            start_time
+        from table({{ fact.database }}.information_schema.query_history(
+            end_time_range_start => dateadd(day, -7, current_timestamp()),
+            result_limit => 10000
+        ))
+        where query_type = 'CREATE_TABLE_AS_SELECT'
+          and execution_status = 'SUCCESS'
+          and contains(lower(query_text), lower('{{ fact }}'))
+          and not contains(lower(query_text), '__dbt_tmp')
+        order by start_time desc
+        limit 1
+    {%- endset -%}
+    {%- set rebuild = run_query(last_rebuild_query).rows if has_query_history else [] -%}
+
+    {%- set full_refresh = {
+        'rows': size[0][0] | int if size else bounds[2] | int,
+        'table_bytes': size[0][1] | int if size and size[0][1] is not none else none,
+        'elapsed_s': rebuild[0][0] | float | round(1) if rebuild else none,
+        'bytes_scanned': rebuild[0][1] | int if rebuild and rebuild[0][1] is not none else none,
+        'measured_at': rebuild[0][2] | string if rebuild else none
+    } -%}
+
+    {{ log("", info=True) }}
+    {{ log("                 rows written     elapsed (s)    bytes scanned", info=True) }}
+    {{ log("column backfill  " ~ backfill.rows_updated ~ "    " ~ backfill.elapsed_s ~ "    " ~ backfill.bytes_scanned, info=True) }}
+    {{ log("full refresh     " ~ full_refresh.rows ~ "    " ~ full_refresh.elapsed_s ~ "    " ~ full_refresh.bytes_scanned
+           ~ ("" if rebuild else "  (no full rebuild in the last 7 days)"), info=True) }}
+    {{ log("AMENITY_BACKFILL_COST=" ~ tojson(backfill), info=True) }}
+    {{ log("FULL_REFRESH_COST=" ~ tojson(full_refresh), info=True) }}
+
+    {{ return({'backfill': backfill, 'full_refresh': full_refresh}) }}
+
+{% endmacro %}
+
+
+{% macro fill_dim_listings_amenities(amenities) %}
+{#
+    Set the new amenity columns of dim_listings to false (bitmask mode: the
+    missing bits to 0) where they are NULL, i.e. on the versions the SCD
+    rebuild did not re-slice. Only NULLs are written, so it is a no-op on
+    a re-run.
+
+    Args:
+        amenities: New amenity names
+
+    Returns: Number of versions updated
+#}
+
+{%- set dim = load_relation(ref('dim_listings')) -%}
+{%- if dim is none -%}
+    {{ return(0) }}
+{%- endif -%}
+{%- set existing = adapter.get_columns_in_relation(dim) | map(attribute='name') | map('upper') | list -%}
+
+{%- set fill = [] -%}
+{%- if amenity_encoding() == 'bitmask' -%}
+    {%- for column in amenity_bitmask_columns() if column | upper in existing -%}
+        {%- do fill.append((column, '0')) -%}
+    {%- endfor -%}
+{%- else -%}
+    {%- for amenity in amenities if amenity | upper in existing -%}
+        {%- do fill.append(('"' ~ amenity ~ '"', 'false')) -%}
+    {%- endfor -%}
+{%- endif -%}
+{%- if not fill -%}
+    {{ return(0) }}
+{%- endif -%}
+
+{%- set fill_sql -%}
+    update {{ dim }}
+    set
+    {%- for column, default in fill %}
+        {{ column }} = coalesce({{ column }}, {{ default }}){% if not loop.last %},{% endif %}
+    {%- endfor %}
+    where {% for column, _ in fill %}{{ column }} is null{% if not loop.last %} or {% endif %}{% endfor %}
+{%- endset -%}
+{%- set response, _ = adapter.execute(fill_sql, auto_begin=true, fetch=false) -%}
+{%- do adapter.commit() -%}
+{{ log(dim ~ ": " ~ (response.rows_affected or 0) ~ " version(s) without amenity history filled", info=True) }}
+{{ return(response.rows_affected or 0) }}
+
+{% endmacro %}
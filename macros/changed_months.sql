@@ -0,0 +1,122 @@
+/*
+================================================================================
+FILE: changed_months.sql
+LAYER: Macros
+================================================================================
+
+PURPOSE:
+    Month-level incremental rebuild of the monthly facts. Each run recomputes
+    only the calendar months in which fct_daily_listing_performance had rows
+    inserted or updated since the monthly model last ran - whatever the
+    cause (new days, re-priced days, late-arrival repairs, full refresh of
+    the daily fact) - so a run costs the changed months, not the history:
+
+        daily merge touched 2024-05-30 .. 2024-06-02  ->  months 2024-05, 2024-06
+        recomputed (MoM reads the month before)       ->  2024-05, 2024-06, 2024-07
+        read as LAG input only                        ->  2024-04
+
+LOGIC:
+    1. The daily fact's merge stamps every inserted / updated row with
+       dbt_updated_at (one value per merge)
+    2. Each monthly model keeps its own watermark on that column
+       (pipeline_watermarks: source_name = 'fct_daily_listing_performance')
+    3. changed_months() reads the distinct calendar_month of daily rows with
+           dbt_updated_at >  get_watermark(model, 'fct_daily_listing_performance')
+           dbt_updated_at <= watermark_upper_bound(fact, 'dbt_updated_at')
+       once per invocation; the model's post_hook stores the upper bound
+    4. var repair_months adds months explicitly (e.g. forced re-aggregation)
+
+MACROS:
+    1. changed_months()          - Months with inserted / updated daily rows
+    2. monthly_refresh_filter()  - Predicate: months an incremental monthly
+                                   fact recomputes (+ LAG input months)
+
+USAGE:
+    {{ config(post_hook="{{ update_watermark('my_monthly_model',
+        {'fct_daily_listing_performance': ref('fct_daily_listing_performance')},
+        column='dbt_updated_at') }}") }}
+
+    where {{ monthly_refresh_filter('calendar_month', lag_months=1) }}
+================================================================================
+*/
+
+
+{% macro changed_months(model_name) %}
+{#
+    Calendar months of fct_daily_listing_performance rows inserted or updated
+    since model_name last stored its watermark, plus var('repair_months').
+
+    Args:
+        model_name: Monthly model owning the watermark
+
+    Returns: Sorted list of month start dates ('YYYY-MM-01' strings)
+#}
+
+{%- if not execute -%}
+    {{ return([]) }}
+{%- endif -%}
+
+{#- graph outlives one invocation when DbtSession reuses the manifest -#}
+{%- set cache = graph.setdefault('_changed_months', {}).setdefault(invocation_id, {}) -%}
+
+{%- if model_name not in cache -%}
+    {%- set fact = ref('fct_daily_listing_performance') -%}
+    {%- set months_query -%}
+        select distinct calendar_month
+        from {{ fact }}
+        where dbt_updated_at > {{ get_watermark(model_name, 'fct_daily_listing_performance') }}
+          and dbt_updated_at <= {{ watermark_upper_bound(fact, 'dbt_updated_at') }}
+    {%- endset -%}
+
+    {%- set months = [] -%}
+    {%- for row in run_query(months_query).rows if row[0] is not none -%}
+        {%- do months.append((row[0] | string)[:7] ~ '-01') -%}
+    {%- endfor -%}
+    {%- for month in var('repair_months', []) -%}
+        {%- do months.append((month | string)[:7] ~ '-01') -%}
+    {%- endfor -%}
+
+    {%- do cache.update({model_name: months | unique | sort | list}) -%}
+    {{ log(model_name ~ ": " ~ cache[model_name] | length ~ " changed month(s) "
+           ~ cache[model_name] | join(', '), info=True) }}
+{%- endif -%}
+
+{{ return(cache[model_name]) }}
+
+{% endmacro %}
+
+
+{% macro monthly_refresh_filter(column, lag_months=0) %}
+{#
+    Months an incremental monthly fact recomputes: each changed month and
+    the month after it (whose month-over-month change reads the changed
+    month). Uses the calling model's changed_months().
+
+    Args:
+        column: Month column to test (calendar_month)
+        lag_months: Extra earlier months to include as window-function input
+                    (1 for models using LAG over calendar_month)
+
+    Returns: SQL boolean expression (false if no month changed)
+#}
+
+{%- set selected = [] -%}
+{%- for month in changed_months(model.name) -%}
+    {%- set index = (month[:4] | int) * 12 + (month[5:7] | int) - 1 -%}
+    {%- for offset in range(-lag_months, 2) -%}
+        {%- set shifted = index + offset -%}
+        {%- do selected.append('%04d-%02d-01' | format(shifted // 12, shifted % 12 + 1)) -%}
+    {%- endfor -%}
+{%- endfor -%}
+
+{%- if selected | length == 0 -%}
+    false
+{%- else -%}
+    {{ column }} in (
+        {%- for month in selected | unique | sort %}
+        '{{ month }}'::date{% if not loop.last %},{% endif %}
+        {%- endfor %}
+    )
+{%- endif -%}
+
+{% endmacro %}
@@ -6,35 +6,45 @@ LAYER: Macros
 
 PURPOSE:
     Detect late-arriving records in raw data whose business date is older than
-    the incremental window (default 7 days), but were recently ingested. This
-    signals that a backfill/full refresh is needed to update historical rows.
+    the incremental window (default 7 days), but were recently ingested, and
+    describe exactly which slices of history they touch so the DAG can run a
+    bounded repair instead of a full refresh.
 
 LOGIC:
     1) Find max calendar_date already in the fact (fct_daily_listing_performance).
     2) In raw.calendar, find rows where:
          - calendar_date < (max_fact_date - window_days)
          - _loaded_at is recent (within lookback_loaded_hours)
-    3) Return the count; log it for easy parsing.
+    3) Collapse them into per-listing contiguous date ranges (gaps-and-islands:
+       calendar_date - row_number() is constant within a run of days)
+    4) Collect the distinct calendar months touched
+    5) Log the count, slices and months for easy parsing:
+         LATE_ARRIVAL_COUNT=42
+         LATE_ARRIVAL_SLICES=[{"listing_id": 1, "start_date": "2024-03-01", "end_date": "2024-03-04", "rows": 4}]
+         LATE_ARRIVAL_MONTHS=["2024-03-01"]
+
+    If there are more than max_slices ranges, LATE_ARRIVAL_SLICES=null - the
+    caller should fall back to a full refresh.
 
 USAGE:
     dbt run-operation check_late_arrivals --args '{"window_days": 7, "lookback_loaded_hours": 48}'
 
 RETURNS:
-    Integer count of late-arriving rows.
+    Dict: {count: int, slices: list or none, months: list of 'YYYY-MM-01'}
 ================================================================================
 */
 
-{% macro check_late_arrivals(window_days=7, lookback_loaded_hours=48) %}
+{% macro check_late_arrivals(window_days=7, lookback_loaded_hours=48, max_slices=500) %}
 
     {%- set calendar_cols = adapter.get_columns_in_relation(source('raw', 'calendar')) if execute else [] -%}
     {%- set has_loaded_at = calendar_cols | map(attribute='name') | map('lower') | select('equalto', '_loaded_at') | list | length > 0 -%}
 
     {%- if not has_loaded_at -%}
         {{ log("LATE_ARRIVAL_COUNT=0 (no _loaded_at column present)", info=True) }}
-        {{ return(0) }}
+        {{ return({'count': 0, 'slices': [], 'months': []}) }}
     {%- endif -%}
 
-    {%- set query -%}
+    {%- set candidates -%}
         with fact_max as (
             select max(calendar_date) as max_date
             from {{ ref('fct_daily_listing_performance') }}
@@ -47,20 +57,88 @@ RETURNS:
             from {{ source('raw', 'calendar') }} c
             cross join fact_max f
             where f.max_date is not null
-              and c.date::date < dateadd(day, -{{ window_days }}, f.max_date)
-              and c._loaded_at >= dateadd(hour, -{{ lookback_loaded_hours }}, current_timestamp())
+              and c.date::date < {{ dbt.dateadd('day', -window_days, 'f.max_date') }}
+              and c._loaded_at >= {{ dbt.dateadd('hour', -lookback_loaded_hours, 'current_timestamp()') }}
+        )
+    {%- endset -%}
+
+    {%- set slices_query -%}
+        {{ candidates }},
+        late_days as (
+            select distinct listing_id, calendar_date
+            from candidates
+        ),
+        islands as (
+            select
+                listing_id,
+                calendar_date,
+                {{ dbt.dateadd(
+                    'day',
+                    '-row_number() over (partition by listing_id order by calendar_date)',
+                    'calendar_date'
+                ) }} as island
+            from late_days
+        ),
+        slices as (
+            select
+                listing_id,
+                min(calendar_date) as start_date,
+                max(calendar_date) as end_date,
+                count(*) as late_rows
+            from islands
+            group by listing_id, island
         )
-        select count(*) as late_count from candidates
+        select
+            listing_id,
+            start_date,
+            end_date,
+            late_rows,
+            count(*) over () as slice_count,
+            (select count(*) from candidates) as late_count
+        from slices
+        order by listing_id, start_date
+        limit {{ max_slices }}
     {%- endset -%}
 
-    {% set result = run_query(query) %}
-    {% if execute %}
-        {% set late_count = result.columns[0].values()[0] %}
-    {% else %}
-        {% set late_count = 0 %}
-    {% endif %}
+    {%- set months_query -%}
+        {{ candidates }}
+        select distinct date_trunc('month', calendar_date)::date as calendar_month
+        from candidates
+        order by 1
+    {%- endset -%}
+
+    {%- if not execute -%}
+        {{ return({'count': 0, 'slices': [], 'months': []}) }}
+    {%- endif -%}
+
+    {%- set rows = run_query(slices_query).rows -%}
+    {%- set late_count = rows[0]['late_count'] | int if rows | length > 0 else 0 -%}
+    {%- set slice_count = rows[0]['slice_count'] | int if rows | length > 0 else 0 -%}
+
+    {%- set slices = [] -%}
+    {%- for row in rows -%}
+        {%- do slices.append({
+            'listing_id': row['listing_id'] | int,
+            'start_date': row['start_date'] | string,
+            'end_date': row['end_date'] | string,
+            'rows': row['late_rows'] | int
+        }) -%}
+    {%- endfor -%}
+    {%- if slice_count > max_slices -%}
+        {{ log("Late arrivals span " ~ slice_count ~ " slices (> " ~ max_slices ~ "), too many for a bounded repair", info=True) }}
+        {%- set slices = none -%}
+    {%- endif -%}
+
+    {%- set months = [] -%}
+    {%- if late_count > 0 -%}
+        {%- for month in run_query(months_query).columns[0].values() -%}
+            {%- do months.append(month | string) -%}
+        {%- endfor -%}
+    {%- endif -%}
 
     {{ log("LATE_ARRIVAL_COUNT=" ~ late_count, info=True) }}
-    {{ return(late_count) }}
+    {{ log("LATE_ARRIVAL_SLICES=" ~ tojson(slices), info=True) }}
+    {{ log("LATE_ARRIVAL_MONTHS=" ~ tojson(months), info=True) }}
+    {{ return({'count': late_count, 'slices': slices, 'months': months}) }}
 
 {% endmacro %}
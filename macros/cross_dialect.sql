@@ -0,0 +1,204 @@
+/*
+================================================================================
+FILE: cross_dialect.sql
+LAYER: Macros
+================================================================================
+
+PURPOSE:
+    Let the project run on DuckDB (target `duckdb`, for offline benchmarks)
+    as well as Snowflake without forking the models. Snowflake SQL is
+    emitted unchanged; DuckDB gets an equivalent.
+
+    Two kinds of differences:
+
+    1. SYNTAX differences -> dispatched macros (adapter.dispatch), used in
+       the models instead of the Snowflake construct:
+         json_array_elements()   LATERAL FLATTEN(PARSE_JSON(..))  | unnest(from_json(..))
+         pivot_amenity_flags()   PIVOT (max(..) FOR .. IN (..))    | conditional aggregation
+         try_to_number()         try_to_number(x, p, s)            | try_cast(x as decimal(p, s))
+         try_to_date()           try_to_date(x)                    | try_cast(x as date)
+         date_spine_days()       table(generator(rowcount => n))   | range(n)
+         hash_agg_columns()      hash_agg(a, b, ..)                | sum(hash(a, b, ..))
+       Date arithmetic uses dbt's own cross-database macros
+       (dbt.dateadd / dbt.datediff).
+
+    2. FUNCTION NAME differences with the same call syntax -> DuckDB SQL
+       macros created by the on-run-start hook duckdb_compat_functions():
+         iff, bitand, bitor, to_char, regexp_substr, current_timestamp()
+       so `iff(a, b, c)` etc. can stay as written. The hook is a no-op on
+       Snowflake.
+
+NOTE:
+    max_by() exists in both warehouses and needs no wrapper.
+    The DuckDB macros are created in the database file, so run-operations
+    (which skip on-run-start) can use them once any `dbt run` has happened.
+================================================================================
+*/
+
+
+{% macro json_array_elements(column, alias='f') %}
+{#
+    FROM-clause item expanding a JSON array string into one row per element.
+    Use after a comma in the FROM clause; the element is `<alias>.value`.
+
+        from source, {{ json_array_elements('amenities') }}
+        -- select trim(f.value::string) ...
+
+    Returns: SQL table expression
+#}
+    {{ return(adapter.dispatch('json_array_elements')(column, alias)) }}
+{% endmacro %}
+
+{% macro default__json_array_elements(column, alias) -%}
+    lateral flatten(input => parse_json({{ column }})) {{ alias }}
+{%- endmacro %}
+
+{% macro duckdb__json_array_elements(column, alias) -%}
+    unnest(from_json({{ column }}, '["VARCHAR"]')) as {{ alias }}(value)
+{%- endmacro %}
+
+
+{% macro pivot_amenity_flags(relation, key_columns, amenities) %}
+{#
+    Pivot (key columns, amenity_name, present) rows into one boolean
+    column per amenity, named exactly like the amenity.
+
+    Args:
+        relation: CTE / relation with key_columns, amenity_name and present
+        key_columns: Columns identifying a pivoted row
+        amenities: Amenity names to turn into columns
+
+    Returns: SELECT statement (key columns + one boolean column per amenity)
+#}
+    {{ return(adapter.dispatch('pivot_amenity_flags')(relation, key_columns, amenities)) }}
+{% endmacro %}
+
+{% macro default__pivot_amenity_flags(relation, key_columns, amenities) %}
+    select
+        {% for key in key_columns %}
+        {{ key }},
+        {% endfor %}
+        {% for amenity in amenities %}
+        coalesce("'{{ amenity }}'"::boolean, false) as "{{ amenity }}"{% if not loop.last %},{% endif %}
+        {% endfor %}
+    from (
+        select {{ key_columns | join(', ') }}, amenity_name, present
+        from {{ relation }}
+    )
+    pivot (
+        max(present)
+        for amenity_name in (
+            {% for amenity in amenities %}
+                '{{ amenity }}'{% if not loop.last %},{% endif %}
+            {% endfor %}
+        )
+    )
+{% endmacro %}
+
+{% macro duckdb__pivot_amenity_flags(relation, key_columns, amenities) %}
+    select
+        {% for key in key_columns %}
+        {{ key }}{% if amenities or not loop.last %},{% endif %}
+        {% endfor %}
+        {% for amenity in amenities %}
+        coalesce(max(case when amenity_name = '{{ amenity | replace("'", "''") }}' then present end)::boolean, false)
+            as "{{ amenity }}"{% if not loop.last %},{% endif %}
+        {% endfor %}
+    from {{ relation }}
+    group by {{ key_columns | join(', ') }}
+{% endmacro %}
+
+
+{% macro try_to_number(expression, precision=38, scale=0) %}
+{#
+    Returns: SQL expression - the number, or NULL if it cannot be parsed
+#}
+    {{ return(adapter.dispatch('try_to_number')(expression, precision, scale)) }}
+{% endmacro %}
+
+{% macro default__try_to_number(expression, precision, scale) -%}
+    try_to_number({{ expression }}, {{ precision }}, {{ scale }})
+{%- endmacro %}
+
+{% macro duckdb__try_to_number(expression, precision, scale) -%}
+    try_cast({{ expression }} as decimal({{ precision }}, {{ scale }}))
+{%- endmacro %}
+
+
+{% macro try_to_date(expression) %}
+{#
+    Returns: SQL expression - the date, or NULL if it cannot be parsed
+#}
+    {{ return(adapter.dispatch('try_to_date')(expression)) }}
+{% endmacro %}
+
+{% macro default__try_to_date(expression) -%}
+    try_to_date({{ expression }})
+{%- endmacro %}
+
+{% macro duckdb__try_to_date(expression) -%}
+    try_cast({{ expression }} as date)
+{%- endmacro %}
+
+
+{% macro date_spine_days(start_date, days) %}
+{#
+    Args:
+        start_date: First date, 'YYYY-MM-DD'
+        days: Number of consecutive days
+
+    Returns: SELECT statement with one column, date_day
+#}
+    {{ return(adapter.dispatch('date_spine_days')(start_date, days)) }}
+{% endmacro %}
+
+{% macro default__date_spine_days(start_date, days) %}
+    select
+        dateadd(day, seq4(), '{{ start_date }}'::date) as date_day
+    from table(generator(rowcount => {{ days }}))
+{% endmacro %}
+
+{% macro duckdb__date_spine_days(start_date, days) %}
+    select
+        '{{ start_date }}'::date + range::integer as date_day
+    from range({{ days }})
+{% endmacro %}
+
+
+{% macro hash_agg_columns(columns) %}
+{#
+    Order-independent aggregate hash of a set of columns over all rows.
+
+    Returns: SQL aggregate expression
+#}
+    {{ return(adapter.dispatch('hash_agg_columns')(columns)) }}
+{% endmacro %}
+
+{% macro default__hash_agg_columns(columns) -%}
+    hash_agg({{ columns | join(', ') }})
+{%- endmacro %}
+
+{% macro duckdb__hash_agg_columns(columns) -%}
+    sum(hash({{ columns | join(', ') }}))
+{%- endmacro %}
+
+
+{% macro duckdb_compat_functions() %}
+{#
+    on-run-start hook: Snowflake function names used by the models,
+    defined as DuckDB macros. No-op on other adapters.
+
+    Returns: SQL statements (or nothing)
+#}
+{%- if target.type == 'duckdb' %}
+    create or replace macro iff(condition, when_true, when_false) as
+        case when condition then when_true else when_false end;
+    create or replace macro bitand(a, b) as (a & b);
+    create or replace macro bitor(a, b) as (a | b);
+    create or replace macro regexp_substr(s, pattern) as
+        nullif(regexp_extract(s, pattern), '');
+    create or replace macro to_char(d, fmt) as
+        strftime(d, replace(replace(replace(fmt, 'YYYY', '%Y'), 'MM', '%m'), 'DD', '%d'));
+    create or replace macro current_timestamp() as now()::timestamp;
+{%- endif %}
+{% endmacro %}
@@ -6,15 +6,23 @@ LAYER: Macros
 
 PURPOSE:
     Detects when new amenity columns are added to source data and determines
-    if a full refresh is required for the fact table.
+    if the fact table needs new amenity data backfilled for historical rows
+    (column-only backfill, see backfill_amenity_columns.sql).
     
 USAGE:
     Run as operation: dbt run-operation check_amenity_schema_change
     
 LOGIC:
     - Compares current amenity columns from source with existing columns in target table
+    - Source amenities = stg_amenity_registry + amenities loaded since the
+      registry was last built (this check runs BEFORE dbt_build refreshes it)
     - Returns list of new amenities that don't exist in target
-    - Used to decide between incremental vs full-refresh strategy
+    - Used to decide between incremental, column backfill and full refresh
+    - In bitmask mode (var amenity_encoding = 'bitmask') new amenities only
+      set new bits, so a schema change is reported only when the amenity
+      count crosses into a new amenity_bitmask_<n> column. The new
+      (unregistered) amenities are still listed so their bits get backfilled
+    - Logs NEW_AMENITIES=<json list> for the DAG
 
 ================================================================================
 */
@@ -24,18 +32,15 @@ LOGIC:
         Standalone operation to check for schema changes.
         Run this as: dbt run-operation check_amenity_schema_change
         
-        Returns a message indicating if full refresh is needed.
+        Returns: Dict with schema_changed, new_amenities (amenity names)
+                 and new_columns (columns missing from the fact)
     #}
     
-    {# Get all amenity columns from source #}
-    {%- set source_amenities = get_amenity_columns() -%}
+    {# Get all amenity columns from source (registry + not-yet-registered) #}
+    {%- set source_amenities = get_amenity_columns() + get_unregistered_amenities() -%}
     
     {# Get target table relation #}
-    {%- set target_relation = adapter.get_relation(
-        database='RENTAL_PROPERTY',
-        schema='MART',
-        identifier='FCT_DAILY_LISTING_PERFORMANCE'
-    ) -%}
+    {%- set target_relation = load_relation(ref('fct_daily_listing_performance')) -%}
     
     {# Get columns from target table if it exists #}
     {%- set target_columns = [] -%}
@@ -48,21 +53,41 @@ LOGIC:
     
     {# Find amenities in source but not in target #}
     {%- set new_amenities = [] -%}
-    {%- for amenity in source_amenities -%}
-        {%- if amenity not in target_columns -%}
-            {%- do new_amenities.append(amenity) -%}
-        {%- endif -%}
-    {%- endfor -%}
+    {%- set new_columns = [] -%}
+    {%- if amenity_encoding() == 'bitmask' -%}
+        {%- do new_amenities.extend(get_unregistered_amenities()) -%}
+        {# Unregistered amenities get the next ids - may need a new mask column #}
+        {%- set ids = get_amenity_registry() | map(attribute='amenity_id') | list -%}
+        {%- set next_max_id = [(ids | max if ids else 0) + get_unregistered_amenities() | length, 1] | max -%}
+        {%- set target_upper = target_columns | map('upper') | list -%}
+        {%- for word in range((next_max_id - 1) // amenity_bits_per_word() + 1) -%}
+            {%- if ('amenity_bitmask_' ~ word) | upper not in target_upper -%}
+                {%- do new_columns.append('amenity_bitmask_' ~ word) -%}
+            {%- endif -%}
+        {%- endfor -%}
+    {%- else -%}
+        {%- for amenity in source_amenities -%}
+            {%- if amenity not in target_columns -%}
+                {%- do new_amenities.append(amenity) -%}
+                {%- do new_columns.append(amenity) -%}
+            {%- endif -%}
+        {%- endfor -%}
+    {%- endif -%}
     
-    {% if new_amenities | length > 0 %}
+    {{ log("NEW_AMENITIES=" ~ tojson(new_amenities), info=True) }}
+    {% if new_columns | length > 0 %}
         {{ log("🚨 SCHEMA CHANGE DETECTED!", info=True) }}
         {{ log("New amenities found in source: " ~ new_amenities | join(", "), info=True) }}
         {{ log("", info=True) }}
-        {{ log("ACTION REQUIRED:", info=True) }}
-        {{ log("Run: dbt run --full-refresh -s fct_daily_listing_performance+", info=True) }}
-        {{ return({"schema_changed": true, "new_amenities": new_amenities}) }}
+        {{ log("ACTION REQUIRED (after dbt run):", info=True) }}
+        {{ log("Run: dbt run-operation backfill_amenity_columns --args '" ~ tojson({'amenities': new_amenities}) ~ "'", info=True) }}
+        {{ log("  or: dbt run --full-refresh -s fct_daily_listing_performance+", info=True) }}
+        {{ return({"schema_changed": true, "new_amenities": new_amenities, "new_columns": new_columns}) }}
+    {% elif new_amenities | length > 0 %}
+        {{ log("New amenities found in source (no new columns): " ~ new_amenities | join(", "), info=True) }}
+        {{ return({"schema_changed": false, "new_amenities": new_amenities, "new_columns": []}) }}
     {% else %}
         {{ log("✅ No schema changes detected. Incremental run is safe.", info=True) }}
-        {{ return({"schema_changed": false, "new_amenities": []}) }}
+        {{ return({"schema_changed": false, "new_amenities": [], "new_columns": []}) }}
     {% endif %}
 {% endmacro %}
@@ -0,0 +1,32 @@
+/*
+================================================================================
+FILE: full_refresh_override.sql
+LAYER: Macros
+================================================================================
+
+PURPOSE:
+    Let the orchestrator full-refresh individual incremental models inside a
+    single `dbt run` invocation, without applying --full-refresh to every
+    selected model.
+
+LOGIC:
+    - Returns true when the model is listed in var('full_refresh_models')
+    - Returns none otherwise, so the normal --full-refresh flag still applies
+
+USAGE:
+    {{ config(
+        materialized='incremental',
+        full_refresh=full_refresh_override('fct_daily_listing_performance')
+    ) }}
+
+    dbt run --vars '{"full_refresh_models": ["fct_daily_listing_performance"]}'
+
+NOTE:
+    config() is evaluated at PARSE time, so the var must be supplied when the
+    project is parsed (DbtSession passes the same vars to parse and run).
+================================================================================
+*/
+
+{% macro full_refresh_override(model_name) %}
+    {{ return(true if model_name in var('full_refresh_models', []) else none) }}
+{% endmacro %}
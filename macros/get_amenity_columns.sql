@@ -5,12 +5,15 @@ LAYER: Macros
 ================================================================================
 
 PURPOSE:
-    Dynamically retrieve distinct amenity names from source data at compile time.
+    Dynamically retrieve distinct amenity names at compile time.
     Enables dynamic PIVOT without hardcoding amenity names.
 
 MACROS:
-    1. get_amenity_columns() - Gets amenities from amenities_changelog
-    2. get_listing_amenity_columns() - Gets amenities from listings
+    1. get_amenity_registry() - All amenities from stg_amenity_registry (cached)
+    2. get_amenity_columns() - Amenities seen in amenities_changelog
+    3. get_listing_amenity_columns() - Amenities seen in listings
+    4. get_unregistered_amenities() - Changelog amenities loaded since the
+       registry was last built (used by check_amenity_schema_change)
 
 USAGE:
     {% set amenity_columns = get_amenity_columns() %}
@@ -22,36 +25,104 @@ BENEFITS:
     - New amenities automatically appear when dbt is recompiled
     - No manual maintenance of amenity lists
     - Single source of truth for amenity names
+    - Compile cost stays flat as raw listings grow: the registry is a small
+      table and it is read at most ONCE per dbt invocation
+
+CACHING:
+    The registry is stored in the invocation's `graph` dict the first time it
+    is read, so every later model compiled in the same invocation reuses it
+    without another query.
+
+DEPENDENCY:
+    get_amenity_registry() calls ref('stg_amenity_registry') even at parse
+    time, so every model using these macros automatically builds after the
+    registry. If the registry table does not exist yet (first deploy), the
+    macros fall back to scanning the raw tables.
 
 NOTE:
     These macros execute queries at COMPILE TIME, not runtime.
-    Results are cached during the dbt compilation phase.
 ================================================================================
 */
 
 
+{% macro get_amenity_registry() %}
+{#
+    Read the amenity registry (once per invocation).
+
+    Returns: List of dicts with amenity_id, amenity_name, in_changelog, in_listings,
+             ordered by amenity_name
+#}
+
+{%- set registry_relation = ref('stg_amenity_registry') -%}
+
+{%- if not execute -%}
+    {{ return([]) }}
+{%- endif -%}
+
+{#- graph outlives one invocation when DbtSession reuses the manifest -#}
+{%- set cache = graph.setdefault('_amenity_registry_cache', {}) -%}
+{%- if invocation_id in cache -%}
+    {{ return(cache[invocation_id]) }}
+{%- endif -%}
+
+{%- if load_relation(registry_relation) is none -%}
+    {{ log("stg_amenity_registry not built yet - scanning raw amenity JSON", info=True) }}
+    {% set query %}
+        SELECT
+            row_number() over (order by amenity_name) as amenity_id,
+            amenity_name,
+            max(in_changelog) as in_changelog,
+            max(in_listings) as in_listings
+        FROM (
+            SELECT trim(f.value::string) as amenity_name, true as in_changelog, false as in_listings
+            FROM {{ source('raw', 'amenities_changelog') }},
+            {{ json_array_elements('amenities') }}
+            UNION ALL
+            SELECT trim(f.value::string) as amenity_name, false as in_changelog, true as in_listings
+            FROM {{ source('raw', 'listings') }},
+            {{ json_array_elements('amenities') }}
+        )
+        WHERE amenity_name IS NOT NULL
+        GROUP BY amenity_name
+        ORDER BY amenity_name
+    {% endset %}
+{%- else -%}
+    {% set query %}
+        SELECT amenity_id, amenity_name, in_changelog, in_listings
+        FROM {{ registry_relation }}
+        ORDER BY amenity_name
+    {% endset %}
+{%- endif -%}
+
+{%- set results = run_query(query) -%}
+{%- set registry = [] -%}
+{%- for row in results.rows -%}
+    {%- do registry.append({
+        'amenity_id': row[0],
+        'amenity_name': row[1],
+        'in_changelog': row[2],
+        'in_listings': row[3]
+    }) -%}
+{%- endfor -%}
+
+{%- do cache.update({invocation_id: registry}) -%}
+{{ return(registry) }}
+
+{% endmacro %}
+
+
 {% macro get_amenity_columns() %}
-{# 
-    Retrieve distinct amenity names from amenities_changelog table.
+{#
+    Retrieve distinct amenity names seen in the amenities_changelog table.
     Used for: stg_amenities_changelog, int_listing_amenities_scd
-    
+
     Returns: List of amenity name strings
 #}
 
-{% set query %}
-    SELECT DISTINCT trim(f.value::string) as amenity_name
-    FROM {{ source('raw', 'amenities_changelog') }},
-    LATERAL FLATTEN(input => PARSE_JSON(amenities)) f
-    ORDER BY amenity_name
-{% endset %}
-
-{% set results = run_query(query) %}
-
-{% if execute %}
-    {% set amenity_list = results.columns[0].values() %}
-{% else %}
-    {% set amenity_list = [] %}
-{% endif %}
+{%- set amenity_list = [] -%}
+{%- for amenity in get_amenity_registry() if amenity.in_changelog -%}
+    {%- do amenity_list.append(amenity.amenity_name) -%}
+{%- endfor -%}
 
 {{ return(amenity_list) }}
 
@@ -59,31 +130,55 @@ NOTE:
 
 
 {% macro get_listing_amenity_columns() %}
-{# 
-    Retrieve distinct amenity names from listings table.
+{#
+    Retrieve distinct amenity names seen in the listings table.
     Used for: stg_listings, int_availability_spans
-    
+
     Returns: List of amenity name strings
-    
-    NOTE: May differ from get_amenity_columns() if listings and 
+
+    NOTE: May differ from get_amenity_columns() if listings and
     amenities_changelog have different amenity sets.
 #}
 
+{%- set amenity_list = [] -%}
+{%- for amenity in get_amenity_registry() if amenity.in_listings -%}
+    {%- do amenity_list.append(amenity.amenity_name) -%}
+{%- endfor -%}
+
+{{ return(amenity_list) }}
+
+{% endmacro %}
+
+
+{% macro get_unregistered_amenities() %}
+{#
+    Amenities in changelog rows loaded AFTER the registry's watermark that
+    the registry does not know yet. Scans only the new rows, so it is cheap
+    to call before the registry model runs (e.g. schema change checks).
+
+    Returns: List of amenity name strings
+#}
+
+{%- set registry_relation = ref('stg_amenity_registry') -%}
+
+{%- if not execute or load_relation(registry_relation) is none -%}
+    {{ return([]) }}
+{%- endif -%}
+
 {% set query %}
     SELECT DISTINCT trim(f.value::string) as amenity_name
-    FROM {{ source('raw', 'listings') }},
-    LATERAL FLATTEN(input => PARSE_JSON(amenities)) f
+    FROM {{ source('raw', 'amenities_changelog') }} c,
+    {{ json_array_elements('c.amenities') }}
+    WHERE c._loaded_at > (
+        SELECT coalesce(max(changelog_loaded_at), '1900-01-01'::timestamp)
+        FROM {{ registry_relation }}
+    )
+      AND trim(f.value::string) NOT IN (
+        SELECT amenity_name FROM {{ registry_relation }} WHERE in_changelog
+    )
     ORDER BY amenity_name
 {% endset %}
 
-{% set results = run_query(query) %}
-
-{% if execute %}
-    {% set amenity_list = results.columns[0].values() %}
-{% else %}
-    {% set amenity_list = [] %}
-{% endif %}
-
-{{ return(amenity_list) }}
+{{ return(run_query(query).columns[0].values() | list) }}
 
 {% endmacro %}
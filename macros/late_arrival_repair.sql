@@ -0,0 +1,50 @@
+/*
+================================================================================
+FILE: late_arrival_repair.sql
+LAYER: Macros
+================================================================================
+
+PURPOSE:
+    Bounded repair of late-arriving calendar rows. check_late_arrivals()
+    reports the affected (listing, date range) slices and calendar months;
+    the DAG passes them back as vars and repair_slices_values() turns them
+    into SQL so only those slices of the fact are rebuilt. The monthly facts
+    pick up the repaired months through the daily fact's merge
+    (changed_months.sql); repair_months can still force months there:
+
+        vars:
+          repair_slices: [{listing_id: 1, start_date: '2024-03-01', end_date: '2024-03-04'}]
+          repair_months: ['2024-03-01']
+
+MACROS:
+    1. repair_slices_values()   - VALUES query over var('repair_slices')
+
+USAGE:
+    inner join ({{ repair_slices_values() }}) r
+        on c.listing_id = r.listing_id
+        and c.calendar_date between r.start_date and r.end_date
+================================================================================
+*/
+
+
+{% macro repair_slices_values() %}
+{#
+    Returns: SQL query with columns listing_id, start_date, end_date
+             (one row per slice in var('repair_slices'), empty if none)
+#}
+
+{%- set slices = var('repair_slices', []) -%}
+
+{%- if slices | length == 0 %}
+    select null::bigint as listing_id, null::date as start_date, null::date as end_date
+    where false
+{%- else %}
+    select listing_id, start_date::date as start_date, end_date::date as end_date
+    from (values
+        {%- for s in slices %}
+        ({{ s['listing_id'] | int }}, '{{ s['start_date'] }}', '{{ s['end_date'] }}'){% if not loop.last %},{% endif %}
+        {%- endfor %}
+    ) as r (listing_id, start_date, end_date)
+{%- endif %}
+
+{% endmacro %}
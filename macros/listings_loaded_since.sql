@@ -0,0 +1,56 @@
+/*
+================================================================================
+FILE: listings_loaded_since.sql
+LAYER: Macros
+================================================================================
+
+PURPOSE:
+    Find the listings whose upstream rows were (re)loaded since the last run
+    of a listing-scoped incremental model, so only those listings are
+    recomputed.
+
+LOGIC:
+    For each upstream relation, compare its _loaded_at with a watermark
+    column stored in the model itself ({{ this }}):
+        _loaded_at > max(<watermark column>) from {{ this }}
+    and return the UNION of matching listing_ids.
+
+USAGE:
+    {% if is_incremental() %}
+    where listing_id in (
+        {{ listings_loaded_since({
+            'calendar_loaded_at': ref('stg_calendar'),
+            'listings_loaded_at': ref('stg_listings')
+        }) }}
+    )
+    {% endif %}
+
+    The model must store max(_loaded_at) per listing in each watermark
+    column, e.g. calendar_loaded_at.
+
+NOTE:
+    Only valid inside an incremental run ({{ this }} must exist). Assumes
+    _loaded_at only increases; re-loaded rows get a new _loaded_at.
+================================================================================
+*/
+
+{% macro listings_loaded_since(watermarks) %}
+{#
+    Args:
+        watermarks: Dict of {watermark column in this model: upstream relation}
+                    (upstream relation must expose listing_id and _loaded_at)
+
+    Returns: SQL query selecting distinct listing_id
+#}
+
+{%- for watermark_column, relation in watermarks | dictsort %}
+    select listing_id
+    from {{ relation }}
+    where _loaded_at > (
+        select coalesce(max({{ watermark_column }}), '1900-01-01'::timestamp)
+        from {{ this }}
+    )
+    {% if not loop.last %}union{% endif %}
+{%- endfor %}
+
+{% endmacro %}
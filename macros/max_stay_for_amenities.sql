@@ -0,0 +1,190 @@
+/*
+================================================================================
+FILE: max_stay_for_amenities.sql
+LAYER: Macros
+================================================================================
+
+PURPOSE:
+    Answer "what is the longest stay for listings with ALL of these
+    amenities?" for ANY amenity combination from the max-stay index
+    (fct_listing_max_stay_index), with the output of problem_3a -
+    including its tie handling (dense_rank, 'Tied for Longest').
+
+    A new combination used to mean a new model (like problem_3b) filtering
+    every availability span.
+
+LOGIC:
+    1. Best span per listing (span_rank = 1) from the index
+    2. Amenity filter = has_amenities(..., encoding='bitmask'): one bitand
+       per 63 amenities on the index's amenity key; an unregistered
+       amenity matches nothing
+    3. Listing attributes from dim_listings (current version), best-span
+       season from dim_date
+    4. dense_rank overall and within neighborhood; every listing at rank 1
+       is flagged 'Tied for Longest'
+
+MACROS:
+    1. max_stay_for_amenities()  - SQL for a model / analysis
+    2. lookup_max_stay()         - run-operation: run and log result
+
+USAGE:
+    {{ max_stay_for_amenities(['Lockbox', 'First aid kit']) }}
+    {{ max_stay_for_amenities([]) }}          -- all listings (problem_3a)
+
+    dbt run-operation lookup_max_stay --args '{"amenities": ["Pool", "Hot tub"], "limit": 10}'
+================================================================================
+*/
+
+
+{% macro max_stay_for_amenities(amenity_names=[], spans_per_listing=1) %}
+{#
+    Args:
+        amenity_names: Amenities a listing must ALL have ([] = no filter)
+        spans_per_listing: Longest spans returned per listing (at most
+                           var('max_stay_index_top_k')); above 1 a span_rank
+                           column is added and the ranks order spans
+
+    Returns: SQL query, one row per qualifying listing (problem_3a columns)
+#}
+
+{%- set top_k = var('max_stay_index_top_k', 3) -%}
+{%- if spans_per_listing > top_k -%}
+    {{ exceptions.raise_compiler_error(
+        "max_stay_for_amenities: spans_per_listing " ~ spans_per_listing
+        ~ " exceeds the index's max_stay_index_top_k (" ~ top_k ~ ")"
+    ) }}
+{%- endif -%}
+
+with listing_max_stays as (
+    select
+        i.listing_id,
+        i.listing_name,
+        i.neighborhood,
+        i.span_rank,
+        i.effective_max_stay_nights as max_possible_stay_nights,
+        i.span_start_date as best_span_start,
+        i.span_end_date as best_span_end,
+        i.total_availability_spans,
+        i.avg_span_duration
+    from {{ ref('fct_listing_max_stay_index') }} i
+    where i.span_rank <= {{ spans_per_listing }}
+      and {{ has_amenities(amenity_names, 'i', encoding='bitmask') }}
+),
+
+enriched as (
+    select
+        lms.*,
+
+        -- Listing attributes from current dimension
+        dl.property_type,
+        dl.room_type,
+        dl.accommodates,
+        dl.capacity_tier,
+        dl.price_tier,
+        dl.rating_tier,
+        dl.base_price,
+        dl.review_scores_rating,
+
+        -- Best span season
+        dd.season as best_span_season,
+        dd.is_peak_season as best_span_in_peak_season,
+
+        -- Ranking
+        dense_rank() over (order by lms.max_possible_stay_nights desc) as overall_stay_rank,
+        dense_rank() over (
+            partition by dl.neighborhood
+            order by lms.max_possible_stay_nights desc
+        ) as neighborhood_stay_rank
+
+    from listing_max_stays lms
+    left join {{ ref('dim_listings') }} dl
+        on lms.listing_id = dl.listing_id
+        and dl.is_current = true
+    left join {{ ref('dim_date') }} dd
+        on lms.best_span_start = dd.date_day
+)
+
+select
+    listing_id,
+    listing_name,
+    neighborhood,
+    property_type,
+    room_type,
+    accommodates,
+    capacity_tier,
+    price_tier,
+    rating_tier,
+    base_price,
+    review_scores_rating,
+
+    {% if spans_per_listing > 1 -%}
+    span_rank,
+    {% endif -%}
+    max_possible_stay_nights,
+    best_span_start,
+    best_span_end,
+    best_span_season,
+    best_span_in_peak_season,
+
+    total_availability_spans,
+    round(avg_span_duration, 1) as avg_span_duration,
+
+    overall_stay_rank,
+    neighborhood_stay_rank,
+
+    -- Flag ties for longest stay
+    case
+        when overall_stay_rank = 1 then 'Tied for Longest'
+        else null
+    end as longest_stay_flag
+
+from enriched
+order by max_possible_stay_nights desc, listing_id
+
+{% endmacro %}
+
+
+{% macro lookup_max_stay(amenities=[], limit=20) %}
+{#
+    run-operation entry point for max_stay_for_amenities().
+
+    Logs:
+        MAX_STAY_LOOKUP={"amenities": [...], "listings": N, "rows": [{...}, ...]}
+
+    Returns: Dict (see log line); rows are the top `limit` listings
+#}
+
+{%- if not execute -%}
+    {{ return({}) }}
+{%- endif -%}
+
+{%- set unknown = [] -%}
+{%- for amenity in amenities if amenity_bit(amenity) is none -%}
+    {%- do unknown.append(amenity) -%}
+{%- endfor -%}
+{%- if unknown -%}
+    {{ log("⚠️ Not in stg_amenity_registry (no listing can match): " ~ unknown | join(', '), info=True) }}
+{%- endif -%}
+
+{%- set result = run_query(max_stay_for_amenities(amenities)) -%}
+{%- set rows = [] -%}
+{%- for row in result.rows[:limit] -%}
+    {%- set values = {} -%}
+    {%- for column in result.column_names -%}
+        {%- set value = row[column] -%}
+        {%- if value is number -%}
+            {%- set value = value | int if value == value | int else value | float -%}
+        {%- elif value is not none and value is not string -%}
+            {%- set value = value | string -%}
+        {%- endif -%}
+        {%- do values.update({column: value}) -%}
+    {%- endfor -%}
+    {%- do rows.append(values) -%}
+{%- endfor -%}
+
+{%- do result.limit(limit).print_table(max_column_width=30) -%}
+{%- set lookup = {'amenities': amenities, 'listings': result.rows | length, 'rows': rows} -%}
+{{ log("MAX_STAY_LOOKUP=" ~ tojson(lookup), info=True) }}
+{{ return(lookup) }}
+
+{% endmacro %}
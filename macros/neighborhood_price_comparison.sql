@@ -0,0 +1,219 @@
+/*
+================================================================================
+FILE: neighborhood_price_comparison.sql
+LAYER: Macros
+================================================================================
+
+PURPOSE:
+    Answer "how did neighborhood prices change between date A and date B?"
+    for ANY pair of dates from the listing × day price index
+    (fct_listing_price_index), with the output of problem_2:
+
+        Neighborhood | Total Listings | Listings with Both Dates | ...
+        | Avg Price (<label A>) | Avg Price (<label B>) | Avg Price Increase ($) | ...
+
+    Each new comparison used to be a copy of problem_2 with its own scans of
+    the full daily fact (two date windows plus a distinct over all listings).
+
+LOGIC:
+    1. Window A / B = date ± window_days (computed at compile time, so the
+       index is read with literal calendar_date ranges)
+    2. Average priced days (adjusted_price > 0) per listing in each window
+    3. LEFT JOIN to every listing with a neighborhood (data completeness)
+    4. Average the per-listing differences by neighborhood and rank
+       neighborhoods by average increase (listings with both windows only)
+
+MACROS:
+    1. neighborhood_price_comparison()  - SQL for a model / analysis
+    2. compare_neighborhood_prices()    - run-operation: run and log result
+
+USAGE:
+    -- in a model (problem_2_neighborhood_pricing)
+    {{ neighborhood_price_comparison('2021-07-12', '2022-07-11', window_days=3,
+                                     label_a='July 2021', label_b='July 2022', missing_label='2022') }}
+
+    -- ad hoc
+    dbt run-operation compare_neighborhood_prices \
+        --args '{"date_a": "2022-01-15", "date_b": "2022-06-15", "window_days": 0}'
+================================================================================
+*/
+
+
+{% macro neighborhood_price_comparison(date_a, date_b, window_days=3, label_a=none, label_b=none, missing_label=none) %}
+{#
+    Args:
+        date_a, date_b: Dates to compare ('YYYY-MM-DD')
+        window_days: Days either side of each date averaged per listing
+                     (0 = the exact dates)
+        label_a, label_b: Period names in the column headers (default: the dates)
+        missing_label: Period name in "Listings Missing <..> Data" (default: label_b)
+
+    Returns: SQL query, one row per neighborhood (problem_2 columns)
+#}
+
+{%- set windows = [] -%}
+{%- for day in [date_a, date_b] -%}
+    {%- set center = modules.datetime.date.fromisoformat(day | string) -%}
+    {%- set delta = modules.datetime.timedelta(days=window_days | int) -%}
+    {%- do windows.append([(center - delta).isoformat(), (center + delta).isoformat()]) -%}
+{%- endfor -%}
+{%- set label_a = label_a or date_a -%}
+{%- set label_b = label_b or date_b -%}
+{%- set missing_label = missing_label or label_b -%}
+{%- set index = ref('fct_listing_price_index') -%}
+
+with prices_a as (
+    -- Average price per listing around date A
+    select
+        listing_id,
+        listing_name,
+        neighborhood,
+        avg(adjusted_price) as price_a,
+        count(*) as days_with_data_a
+    from {{ index }}
+    where calendar_date between '{{ windows[0][0] }}' and '{{ windows[0][1] }}'
+      and is_priced = 1
+    group by listing_id, listing_name, neighborhood
+),
+
+prices_b as (
+    -- Average price per listing around date B
+    select
+        listing_id,
+        avg(adjusted_price) as price_b,
+        count(*) as days_with_data_b
+    from {{ index }}
+    where calendar_date between '{{ windows[1][0] }}' and '{{ windows[1][1] }}'
+      and is_priced = 1
+    group by listing_id
+),
+
+-- Get all listings to understand data completeness
+all_listings as (
+    select distinct
+        listing_id,
+        neighborhood
+    from {{ index }}
+    where neighborhood is not null
+),
+
+price_changes as (
+    -- LEFT JOIN to capture all listings, show data availability
+    select
+        al.listing_id,
+        al.neighborhood,
+        pa.listing_name,
+        pa.price_a,
+        pb.price_b,
+        case
+            when pa.price_a is not null and pb.price_b is not null
+            then pb.price_b - pa.price_a
+            else null
+        end as price_difference,
+        case when pa.price_a is not null then 1 else 0 end as has_a_data,
+        case when pb.price_b is not null then 1 else 0 end as has_b_data,
+        case
+            when pa.price_a is not null and pb.price_b is not null
+            then 1 else 0
+        end as has_both_dates
+    from all_listings al
+    left join prices_a pa on al.listing_id = pa.listing_id
+    left join prices_b pb on al.listing_id = pb.listing_id
+),
+
+neighborhood_averages as (
+    -- Average price increase by neighborhood (only for listings with BOTH dates)
+    select
+        neighborhood,
+        count(listing_id) as total_listings,
+        sum(has_both_dates) as listings_with_both_dates,
+        sum(has_a_data) as listings_with_a_data,
+        sum(has_b_data) as listings_with_b_data,
+        round(sum(has_both_dates) * 100.0 / nullif(count(listing_id), 0), 1) as data_completeness_pct,
+        round(avg(case when has_both_dates = 1 then price_a end), 2) as avg_price_a,
+        round(avg(case when has_both_dates = 1 then price_b end), 2) as avg_price_b,
+        round(avg(price_difference), 2) as avg_price_increase,
+        round(min(price_difference), 2) as min_price_change,
+        round(max(price_difference), 2) as max_price_change,
+        round(stddev(price_difference), 2) as stddev_price_change,
+        round(
+            avg(price_difference) / nullif(avg(case when has_both_dates = 1 then price_a end), 0) * 100,
+            2
+        ) as avg_pct_increase,
+        {{ dbt.listagg(
+            'case when has_both_dates = 1 then listing_id::varchar end',
+            "', '",
+            'order by listing_id'
+        ) }} as listing_ids_with_both_dates,
+        {{ dbt.listagg(
+            'case when has_a_data = 1 and has_b_data = 0 then listing_id::varchar end',
+            "', '",
+            'order by listing_id'
+        ) }} as listings_missing_b_data
+    from price_changes
+    group by neighborhood
+)
+
+select
+    neighborhood as "Neighborhood",
+    total_listings as "Total Listings",
+    listings_with_both_dates as "Listings with Both Dates",
+    data_completeness_pct as "Data Completeness (%)",
+    listing_ids_with_both_dates as "Listing IDs",
+    avg_price_a as "Avg Price ({{ label_a }})",
+    avg_price_b as "Avg Price ({{ label_b }})",
+    avg_price_increase as "Avg Price Increase ($)",
+    avg_pct_increase as "Avg Price Increase (%)",
+    min_price_change as "Min Price Change ($)",
+    max_price_change as "Max Price Change ($)",
+    stddev_price_change as "StdDev Price Change",
+    listings_missing_b_data as "Listings Missing {{ missing_label }} Data",
+    -- Ranking (excluding neighborhoods with no complete data)
+    case
+        when listings_with_both_dates > 0
+        then rank() over (
+            partition by case when listings_with_both_dates > 0 then 1 else 0 end
+            order by avg_price_increase desc nulls last
+        )
+        else null
+    end as "Rank by Increase"
+from neighborhood_averages
+where listings_with_both_dates > 0  -- Only show neighborhoods with comparable data
+order by avg_price_increase desc nulls last
+
+{% endmacro %}
+
+
+{% macro compare_neighborhood_prices(date_a, date_b, window_days=3, label_a=none, label_b=none) %}
+{#
+    run-operation entry point for neighborhood_price_comparison().
+
+    Logs:
+        NEIGHBORHOOD_PRICE_COMPARISON=[{"Neighborhood": ..., "Avg Price Increase ($)": ..., ...}]
+
+    Returns: List of row dicts (see log line)
+#}
+
+{%- if not execute -%}
+    {{ return([]) }}
+{%- endif -%}
+
+{%- set result = run_query(neighborhood_price_comparison(date_a, date_b, window_days, label_a, label_b)) -%}
+{%- set rows = [] -%}
+{%- for row in result.rows -%}
+    {%- set values = {} -%}
+    {%- for column in result.column_names -%}
+        {%- set value = row[column] -%}
+        {%- if value is number -%}
+            {%- set value = value | int if value == value | int else value | float -%}
+        {%- endif -%}
+        {%- do values.update({column: value}) -%}
+    {%- endfor -%}
+    {%- do rows.append(values) -%}
+{%- endfor -%}
+
+{%- do result.print_table(max_rows=none, max_column_width=30) -%}
+{{ log("NEIGHBORHOOD_PRICE_COMPARISON=" ~ tojson(rows), info=True) }}
+{{ return(rows) }}
+
+{% endmacro %}
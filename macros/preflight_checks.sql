@@ -0,0 +1,178 @@
+/*
+================================================================================
+FILE: preflight_checks.sql
+LAYER: Macros
+================================================================================
+
+PURPOSE:
+    Run every pre-build check of the DAG - source freshness, late arrivals
+    and amenity schema changes - in ONE dbt invocation, on one parsed
+    project and one warehouse connection, and return a single structured
+    result the DAG's branch tasks read:
+
+        PREFLIGHT_RESULT={"freshness": {...}, "late_arrivals": {...},
+                          "schema": {...}, "timings": {...}}
+
+    Before, each check was its own dbt process (parse + connect + query),
+    run one after another.
+
+LOGIC:
+    1. source_freshness_status(): one UNION ALL query of max(loaded_at_field)
+       per source table, judged against the warn_after / error_after
+       thresholds declared in _sources.yml (same rules as
+       `dbt source freshness`). A table that does not exist or lacks its
+       loaded_at_field is left out of the query and reported as a runtime
+       error (errored + runtime_error), so the other checks still run
+    2. check_late_arrivals()          (check_late_arrivals.sql)
+    3. check_amenity_schema_change()  (detect_schema_changes.sql)
+
+    The three checks are independent; each one's result is kept as-is.
+
+USAGE:
+    dbt run-operation preflight_checks --args '{"window_days": 7, "lookback_loaded_hours": 48}'
+
+RETURNS:
+    Dict: {freshness: {status, passed, warned, errored, runtime_error},
+           late_arrivals: {count, slices, months},
+           schema: {schema_changed, new_amenities, new_columns},
+           timings: {<check>_s: seconds}}
+================================================================================
+*/
+
+
+{% macro source_freshness_status(source_name='raw') %}
+{#
+    Freshness of every table of a source, from one query.
+
+    Tables that cannot be queried (missing relation or loaded_at_field
+    column) are checked up front - Jinja cannot catch a failed query - and
+    reported instead of failing the whole pre-flight.
+
+    Returns: Dict {status: 'pass'|'warn'|'error', passed: [...], warned: [...],
+                   errored: [...], runtime_error: none|'<unique_id>: <reason>; ...'}
+             with entries {name, max_loaded_at, age_s, status[, error]}
+#}
+
+{%- set period_seconds = {'minute': 60, 'hour': 3600, 'day': 86400} -%}
+{%- set result = {'status': 'pass', 'passed': [], 'warned': [], 'errored': [], 'runtime_error': none} -%}
+{%- set runtime_errors = [] -%}
+{%- set tables = [] -%}
+{%- for node in graph.sources.values()
+        if node.source_name == source_name and node.loaded_at_field -%}
+    {%- set relation = load_relation(source(node.source_name, node.name)) -%}
+    {%- set columns = adapter.get_columns_in_relation(relation) | map(attribute='name') | map('lower') | list
+        if relation is not none else [] -%}
+    {%- if relation is none -%}
+        {%- set error = 'relation does not exist' -%}
+    {%- elif modules.re.fullmatch('\\w+', node.loaded_at_field) and node.loaded_at_field | lower not in columns -%}
+        {%- set error = 'column ' ~ node.loaded_at_field ~ ' does not exist' -%}
+    {%- else -%}
+        {%- set error = none -%}
+    {%- endif -%}
+    {%- if error -%}
+        {%- do result['errored'].append({
+            'name': node.unique_id, 'max_loaded_at': none, 'age_s': none, 'status': 'error', 'error': error
+        }) -%}
+        {%- do runtime_errors.append(node.unique_id ~ ': ' ~ error) -%}
+    {%- else -%}
+        {%- do tables.append(node) -%}
+    {%- endif -%}
+{%- endfor -%}
+
+{%- if runtime_errors -%}
+    {%- do result.update({'status': 'error', 'runtime_error': runtime_errors | join('; ')}) -%}
+{%- endif -%}
+{%- if tables | length == 0 -%}
+    {{ return(result) }}
+{%- endif -%}
+
+{%- set freshness_query -%}
+    {%- for node in tables %}
+    select
+        '{{ node.unique_id }}' as unique_id,
+        max({{ node.loaded_at_field }}) as max_loaded_at,
+        {{ dbt.datediff('max(' ~ node.loaded_at_field ~ ')', dbt.current_timestamp(), 'second') }} as age_s
+    from {{ source(node.source_name, node.name) }}
+    {% if not loop.last %}union all{% endif %}
+    {%- endfor %}
+{%- endset -%}
+
+{%- set ages = {} -%}
+{%- for row in run_query(freshness_query).rows -%}
+    {%- do ages.update({row['unique_id']: row}) -%}
+{%- endfor -%}
+
+{%- for node in tables -%}
+    {%- set row = ages[node.unique_id] -%}
+    {%- set thresholds = {} -%}
+    {%- for level in ['warn_after', 'error_after'] -%}
+        {%- set after = (node.freshness or {}).get(level) or {} -%}
+        {%- if after.get('count') and after.get('period') -%}
+            {%- do thresholds.update({level: after['count'] * period_seconds[after['period']]}) -%}
+        {%- endif -%}
+    {%- endfor -%}
+
+    {%- if row['age_s'] is none -%}
+        {%- set status = 'error' -%}
+    {%- elif 'error_after' in thresholds and row['age_s'] > thresholds['error_after'] -%}
+        {%- set status = 'error' -%}
+    {%- elif 'warn_after' in thresholds and row['age_s'] > thresholds['warn_after'] -%}
+        {%- set status = 'warn' -%}
+    {%- else -%}
+        {%- set status = 'pass' -%}
+    {%- endif -%}
+
+    {%- set key = {'pass': 'passed', 'warn': 'warned', 'error': 'errored'}[status] -%}
+    {%- do result[key].append({
+        'name': node.unique_id,
+        'max_loaded_at': row['max_loaded_at'] | string if row['max_loaded_at'] is not none else none,
+        'age_s': row['age_s'] | int if row['age_s'] is not none else none,
+        'status': status
+    }) -%}
+{%- endfor -%}
+
+{%- do result.update({'status': 'error' if result['errored'] else ('warn' if result['warned'] else 'pass')}) -%}
+{{ return(result) }}
+
+{% endmacro %}
+
+
+{% macro preflight_checks(window_days=7, lookback_loaded_hours=48, max_slices=500) %}
+{#
+    Args:
+        window_days, lookback_loaded_hours, max_slices: Passed to check_late_arrivals()
+
+    Logs:
+        PREFLIGHT_RESULT=<json> (see file header)
+
+    Returns: Dict (see file header)
+#}
+
+{%- if not execute -%}
+    {{ return({}) }}
+{%- endif -%}
+
+{%- set result = {'timings': {}} -%}
+{%- set checks = [
+    ('freshness', source_freshness_status),
+    ('late_arrivals', check_late_arrivals),
+    ('schema', check_amenity_schema_change)
+] -%}
+
+{%- for name, check in checks -%}
+    {%- set started_at = modules.datetime.datetime.now() -%}
+    {%- if name == 'late_arrivals' -%}
+        {%- set value = check(window_days=window_days, lookback_loaded_hours=lookback_loaded_hours, max_slices=max_slices) -%}
+    {%- else -%}
+        {%- set value = check() -%}
+    {%- endif -%}
+    {%- do result.update({name: value}) -%}
+    {%- do result['timings'].update({
+        name ~ '_s': ((modules.datetime.datetime.now() - started_at).total_seconds()) | round(2)
+    }) -%}
+{%- endfor -%}
+
+{{ log("PREFLIGHT_RESULT=" ~ tojson(result), info=True) }}
+{{ return(result) }}
+
+{% endmacro %}
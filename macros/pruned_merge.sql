@@ -0,0 +1,73 @@
+/*
+================================================================================
+FILE: pruned_merge.sql
+LAYER: Macros
+================================================================================
+
+PURPOSE:
+    Custom incremental strategy: a regular MERGE whose target side is
+    restricted to the values of one column present in the new batch, so
+    Snowflake prunes target micro-partitions instead of scanning the
+    whole table to find matches.
+
+LOGIC:
+    1. The batch is staged in a temp TABLE (custom strategies use
+       tmp_relation_type = 'table'), so reading it twice is cheap
+    2. Read the distinct values of config `prune_column` from the batch
+    3. Add them as incremental_predicates on DBT_INTERNAL_DEST:
+         - few values  → prune_column in ('2024-06-01', '2024-06-02', ...)
+         - many values → prune_column between min and max
+    4. Delegate to dbt's standard merge (get_incremental_merge_sql)
+
+    The predicates are derived from the batch itself, so every batch row's
+    target row satisfies them - matches are never missed.
+
+USAGE:
+    {{ config(
+        materialized='incremental',
+        incremental_strategy='pruned_merge',
+        unique_key=['listing_id', 'calendar_date'],
+        prune_column='calendar_date'
+    ) }}
+
+CONFIG:
+    prune_column            Column to prune on (skip pruning if not set)
+    prune_max_values        Max distinct values for an IN list (default 100)
+    incremental_predicates  Optional extra predicates, kept as-is
+================================================================================
+*/
+
+{% macro get_incremental_pruned_merge_sql(arg_dict) %}
+
+{%- set prune_column = config.get('prune_column') -%}
+{%- set predicates = arg_dict['incremental_predicates'] or [] -%}
+{%- set predicates = [predicates] if predicates is string else predicates | list -%}
+
+{%- if prune_column -%}
+    {%- set max_values = config.get('prune_max_values', 100) -%}
+    {%- set values_query -%}
+        select distinct {{ prune_column }}
+        from {{ arg_dict['temp_relation'] }}
+        where {{ prune_column }} is not null
+        order by 1
+    {%- endset -%}
+    {%- set values = run_query(values_query).columns[0].values() | list -%}
+
+    {%- if values | length == 0 -%}
+        {{ log(this ~ ": empty batch, nothing to prune", info=True) }}
+    {%- elif values | length <= max_values -%}
+        {%- do predicates.append(
+            'DBT_INTERNAL_DEST.' ~ prune_column ~ " in ('" ~ values | join("', '") ~ "')"
+        ) -%}
+    {%- else -%}
+        {%- do predicates.append(
+            'DBT_INTERNAL_DEST.' ~ prune_column ~ " between '" ~ values | first ~ "' and '" ~ values | last ~ "'"
+        ) -%}
+    {%- endif -%}
+    {{ log(this ~ ": merge pruned to " ~ values | length ~ " " ~ prune_column ~ " value(s)", info=True) }}
+{%- endif -%}
+
+{%- do arg_dict.update({'incremental_predicates': predicates}) -%}
+{{ return(get_incremental_merge_sql(arg_dict)) }}
+
+{% endmacro %}
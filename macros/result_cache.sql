@@ -0,0 +1,284 @@
+/*
+================================================================================
+FILE: result_cache.sql
+LAYER: Macros (Materialization)
+================================================================================
+
+PURPOSE:
+    `result_cache` materialization for the analytics models. The result is
+    stored as a TABLE, so dashboards read precomputed rows instead of
+    re-running the multi-CTE aggregation over the daily fact / spans on
+    every hit, and the table is rebuilt only when its inputs changed:
+
+        DEVELOPMENT.PIPELINE_RESULT_CACHE
+        | model_name                | fingerprint | upstream_state            | built_at |
+        | problem_1_amenity_revenue | 9c1f...     | {"model...fct_daily": ..} | ...      |
+
+LOGIC:
+    1. Fingerprint = md5 of
+         - the model's compiled SQL (code, vars and amenity columns)
+         - the state of every upstream table (views are expanded to the
+           tables they read), from ONE UNION ALL query:
+             watermark upstreams  count(*) | max(<column>) ...
+                                  (config cache_watermarks, e.g. the daily
+                                  fact's dbt_updated_at - cheap, metadata)
+             other upstreams      count(*) | hash_agg(<columns>)
+                                  (minus cache_ignore_columns, so a dim
+                                  rebuilt with identical rows is unchanged)
+    2. Fingerprint equal to the stored one and the table exists
+         → CACHE HIT: nothing is rebuilt (run status message `CACHE HIT`)
+    3. Otherwise (or --full-refresh / var full_refresh_models)
+         → build into <model>__dbt_tmp, swap it in, store the fingerprint;
+           the upstreams whose state changed are logged
+
+MACROS:
+    1. result_cache_relation()      - Relation of the cache state table
+    2. create_result_cache_table()  - on-run-start DDL
+    3. result_cache_upstreams()     - Upstream tables of a model
+    4. result_cache_fingerprint()   - Fingerprint + per-upstream state
+    5. materialization result_cache
+
+USAGE:
+    {{ config(
+        materialized='result_cache',
+        cache_watermarks={'fct_daily_listing_performance': ['dbt_updated_at']}
+    ) }}
+
+CONFIG:
+    cache_watermarks      {upstream model: [columns]} tracked by count + max
+                          instead of a content hash (columns must only grow
+                          when rows change)
+    cache_ignore_columns  Columns left out of the content hash
+                          (default ['dbt_updated_at'])
+================================================================================
+*/
+
+
+{% macro result_cache_relation() %}
+{#
+    Returns: Relation for <database>.development.pipeline_result_cache
+#}
+
+{{ return(api.Relation.create(
+    database=target.database,
+    schema=generate_schema_name('development', none) | trim,
+    identifier='pipeline_result_cache'
+)) }}
+
+{% endmacro %}
+
+
+{% macro create_result_cache_table() %}
+{#
+    on-run-start hook: create the cache state table once.
+
+    Returns: DDL statement
+#}
+
+{%- if execute -%}
+    {%- set relation = result_cache_relation() -%}
+    {%- do adapter.create_schema(relation) -%}
+    create table if not exists {{ relation }} (
+        model_name varchar,
+        fingerprint varchar,
+        upstream_state varchar,
+        built_at timestamp
+    )
+{%- endif -%}
+
+{% endmacro %}
+
+
+{% macro result_cache_upstreams(node) %}
+{#
+    Tables and sources a node reads. Views and ephemeral models are
+    expanded to their own upstreams (their state lives there).
+
+    Returns: List of dicts {unique_id, name, relation}, sorted by unique_id
+#}
+
+{%- set upstreams = {} -%}
+{%- set pending = node.depends_on.nodes | list -%}
+{%- for _ in range(graph.nodes | length + graph.sources | length) -%}
+    {%- set unique_id = pending.pop() if pending else none -%}
+    {%- if unique_id is none -%}
+    {%- elif unique_id in graph.sources -%}
+        {%- set source_node = graph.sources[unique_id] -%}
+        {%- do upstreams.update({unique_id: {
+            'unique_id': unique_id,
+            'name': source_node.name,
+            'relation': api.Relation.create(
+                database=source_node.database,
+                schema=source_node.schema,
+                identifier=source_node.identifier
+            )
+        }}) -%}
+    {%- elif unique_id in graph.nodes and unique_id not in upstreams -%}
+        {%- set upstream = graph.nodes[unique_id] -%}
+        {%- if upstream.config.materialized in ('view', 'ephemeral') -%}
+            {%- do pending.extend(upstream.depends_on.nodes) -%}
+        {%- else -%}
+            {%- do upstreams.update({unique_id: {
+                'unique_id': unique_id,
+                'name': upstream.name,
+                'relation': api.Relation.create(
+                    database=upstream.database,
+                    schema=upstream.schema,
+                    identifier=upstream.alias
+                )
+            }}) -%}
+        {%- endif -%}
+    {%- endif -%}
+{%- endfor -%}
+
+{{ return(upstreams.values() | sort(attribute='unique_id')) }}
+
+{% endmacro %}
+
+
+{% macro result_cache_fingerprint(node, compiled_sql) %}
+{#
+    Args:
+        node: Model node (config cache_watermarks / cache_ignore_columns)
+        compiled_sql: The model's compiled SQL
+
+    Returns: Dict {fingerprint, state: {unique_id: state string}}
+#}
+
+{%- set watermarks = config.get('cache_watermarks', {}) -%}
+{%- set ignore_columns = config.get('cache_ignore_columns', ['dbt_updated_at']) | map('lower') | list -%}
+
+{%- set state_query -%}
+    {%- for upstream in result_cache_upstreams(node) %}
+    {%- set parts = ['count(*)'] -%}
+    {%- if upstream.name in watermarks -%}
+        {%- for column in watermarks[upstream.name] -%}
+            {%- do parts.append('max(' ~ column ~ ')') -%}
+        {%- endfor -%}
+    {%- else -%}
+        {%- set columns = [] -%}
+        {%- for column in adapter.get_columns_in_relation(upstream.relation)
+                if column.name | lower not in ignore_columns -%}
+            {%- do columns.append(column.quoted) -%}
+        {%- endfor -%}
+        {%- do parts.append(hash_agg_columns(columns)) -%}
+    {%- endif %}
+    select
+        '{{ upstream.unique_id }}' as unique_id,
+        {%- for part in parts %}
+        coalesce(cast({{ part }} as varchar), '') {%- if not loop.last %} || '|' ||{% endif %}
+        {%- endfor %} as state
+    from {{ upstream.relation }}
+    {% if not loop.last %}union all{% endif %}
+    {%- endfor %}
+{%- endset -%}
+
+{%- set state = {} -%}
+{%- if state_query | trim -%}
+    {%- for row in run_query(state_query).rows -%}
+        {%- do state.update({row['unique_id']: row['state']}) -%}
+    {%- endfor -%}
+{%- endif -%}
+
+{{ return({
+    'fingerprint': local_md5(local_md5(compiled_sql) ~ tojson(state, sort_keys=true)),
+    'state': state
+}) }}
+
+{% endmacro %}
+
+
+{% materialization result_cache, default %}
+
+  {%- set existing_relation = load_cached_relation(this) -%}
+  {%- set target_relation = this.incorporate(type='table') -%}
+  {%- set cache_relation = result_cache_relation() -%}
+  {%- set grant_config = config.get('grants') -%}
+  {%- set backup_relation = none -%}
+
+  {%- set current = result_cache_fingerprint(model, sql) -%}
+  {%- set stored = none -%}
+  {%- if existing_relation is not none and existing_relation.is_table and not should_full_refresh() -%}
+    {%- set stored_rows = run_query(
+        "select fingerprint, upstream_state from " ~ cache_relation
+        ~ " where model_name = '" ~ model.name ~ "'"
+    ).rows -%}
+    {%- set stored = stored_rows[0] if stored_rows | length > 0 else none -%}
+  {%- endif -%}
+
+  {{ run_hooks(pre_hooks, inside_transaction=False) }}
+
+  -- `BEGIN` happens here:
+  {{ run_hooks(pre_hooks, inside_transaction=True) }}
+
+  {%- if stored is not none and stored['fingerprint'] == current['fingerprint'] %}
+
+    {{ log(model.name ~ ": result cache hit (" ~ current['fingerprint'][:12] ~ "), not rebuilt", info=True) }}
+    {%- do store_raw_result(name='main', message='CACHE HIT', code='CACHE HIT', rows_affected=0) -%}
+
+  {%- else %}
+
+    {%- if stored is not none -%}
+      {%- set previous_state = fromjson(stored['upstream_state'] or '{}') -%}
+      {%- set changed = [] -%}
+      {%- for unique_id, value in current['state'] | dictsort
+              if previous_state.get(unique_id) != value -%}
+        {%- do changed.append(unique_id.split('.')[-1]) -%}
+      {%- endfor -%}
+      {{ log(model.name ~ ": result cache miss, changed: " ~ (changed | join(', ') or 'model code'), info=True) }}
+    {%- endif -%}
+
+    {%- set intermediate_relation = make_intermediate_relation(target_relation) -%}
+    {%- set backup_relation_type = 'table' if existing_relation is none else existing_relation.type -%}
+    {%- set backup_relation = make_backup_relation(target_relation, backup_relation_type) -%}
+    {{ drop_relation_if_exists(load_cached_relation(intermediate_relation)) }}
+    {{ drop_relation_if_exists(load_cached_relation(backup_relation)) }}
+
+    {% call statement('main') -%}
+      {{ get_create_table_as_sql(False, intermediate_relation, sql) }}
+    {%- endcall %}
+
+    {% if existing_relation is not none %}
+      {% set existing_relation = load_cached_relation(existing_relation) %}
+      {% if existing_relation is not none %}
+        {{ adapter.rename_relation(existing_relation, backup_relation) }}
+      {% endif %}
+    {% endif %}
+    {{ adapter.rename_relation(intermediate_relation, target_relation) }}
+
+    {% call statement('store_fingerprint') -%}
+      merge into {{ cache_relation }} t
+      using (
+          select
+              '{{ model.name }}' as model_name,
+              '{{ current['fingerprint'] }}' as fingerprint,
+              '{{ tojson(current['state'], sort_keys=true) | replace("'", "''") }}' as upstream_state
+      ) s
+          on t.model_name = s.model_name
+      when matched then update set
+          fingerprint = s.fingerprint,
+          upstream_state = s.upstream_state,
+          built_at = current_timestamp()
+      when not matched then insert (model_name, fingerprint, upstream_state, built_at)
+          values (s.model_name, s.fingerprint, s.upstream_state, current_timestamp())
+    {%- endcall %}
+
+  {%- endif %}
+
+  {{ run_hooks(post_hooks, inside_transaction=True) }}
+
+  {% set should_revoke = should_revoke(existing_relation, full_refresh_mode=True) %}
+  {% do apply_grants(target_relation, grant_config, should_revoke=should_revoke) %}
+
+  {% do persist_docs(target_relation, model) %}
+
+  -- `COMMIT` happens here
+  {{ adapter.commit() }}
+
+  {{ drop_relation_if_exists(backup_relation) }}
+
+  {{ run_hooks(post_hooks, inside_transaction=False) }}
+
+  {{ return({'relations': [target_relation]}) }}
+
+{% endmaterialization %}
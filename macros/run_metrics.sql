@@ -0,0 +1,315 @@
+/*
+================================================================================
+FILE: run_metrics.sql
+LAYER: Macros
+================================================================================
+
+PURPOSE:
+    Per-model performance telemetry. Every dbt invocation (run, build, test)
+    records one row per node result - the same results dbt writes to
+    target/run_results.json - in a metrics table, so a slow day can be
+    traced to the model that got slower:
+
+        DEVELOPMENT.PIPELINE_MODEL_METRICS
+        | invocation_id | model_name  | refresh_mode | execution_time_s | rows_affected | query_id |
+        | 8f1c...       | fct_daily.. | incremental  | 41.2             | 18230         | 01b2...  |
+
+LOGIC:
+    1. on-run-start creates the table if it does not exist
+    2. on-run-end (record_run_metrics) inserts execution time, status,
+       rows affected, warehouse query id / bytes scanned (where the
+       adapter reports them), materialization and refresh mode:
+         incremental   - incremental model merged into the existing table
+         full_refresh  - incremental model rebuilt (--full-refresh or
+                         var full_refresh_models)
+         rebuild       - table / view, rebuilt every run (and result_cache
+                         models whose inputs changed)
+         cache_hit     - result_cache model left as it was
+    3. check_model_regressions compares a run's models with the median of
+       their previous runs in the same refresh mode and reports the ones
+       slower than the threshold
+    4. set_query_tag tags every model's Snowflake queries with the model
+       name (JSON), so warehouse cost in QUERY_HISTORY can be attributed
+       per model: query_tag:model = 'fct_daily_listing_performance'
+
+MACROS:
+    1. metrics_relation()          - Relation of the metrics table
+    2. create_metrics_table()      - on-run-start DDL
+    3. model_query_tag()           - JSON query tag for a node
+    4. set_query_tag()             - Snowflake per-model query tag override
+    5. record_run_metrics()        - on-run-end INSERT of node results
+    6. check_model_regressions()   - run-operation: rolling-baseline check
+
+USAGE:
+    dbt run-operation check_model_regressions --args '{"threshold_pct": 50, "window_runs": 7}'
+================================================================================
+*/
+
+
+{% macro metrics_relation() %}
+{#
+    Returns: Relation for <database>.development.pipeline_model_metrics
+#}
+
+{{ return(api.Relation.create(
+    database=target.database,
+    schema=generate_schema_name('development', none) | trim,
+    identifier='pipeline_model_metrics'
+)) }}
+
+{% endmacro %}
+
+
+{% macro create_metrics_table() %}
+{#
+    on-run-start hook: create the metrics table once.
+
+    Returns: DDL statement
+#}
+
+{%- if execute -%}
+    {%- set relation = metrics_relation() -%}
+    {%- do adapter.create_schema(relation) -%}
+    create table if not exists {{ relation }} (
+        invocation_id varchar,
+        command varchar,
+        target_name varchar,
+        run_started_at timestamp,
+        unique_id varchar,
+        model_name varchar,
+        resource_type varchar,
+        materialized varchar,
+        refresh_mode varchar,
+        status varchar,
+        execution_time_s double,
+        rows_affected bigint,
+        query_id varchar,
+        bytes_scanned bigint,
+        query_tag varchar,
+        recorded_at timestamp
+    )
+{%- endif -%}
+
+{% endmacro %}
+
+
+{% macro model_query_tag(node) %}
+{#
+    Returns: JSON string identifying the node's queries
+             {"project": ..., "model": ..., "materialized": ..., "invocation_id": ..., "target": ...}
+#}
+
+{{ return(tojson({
+    'project': project_name,
+    'model': node.name,
+    'materialized': node.config.materialized,
+    'invocation_id': invocation_id,
+    'target': target.name
+})) }}
+
+{% endmacro %}
+
+
+{% macro set_query_tag(extra={}) %}
+{#
+    Overrides dbt-snowflake's set_query_tag: tag each model's session with
+    model_query_tag() (or the model's own query_tag config, if set). dbt
+    restores the original tag after the materialization.
+
+    Returns: The original query tag (or none if unchanged)
+#}
+
+{%- set new_query_tag = config.get('query_tag') or model_query_tag(model) -%}
+{%- set original_query_tag = get_current_query_tag() -%}
+{{ log("Setting query_tag to '" ~ new_query_tag ~ "'. Will reset to '" ~ original_query_tag ~ "' after materialization.") }}
+{%- do run_query("alter session set query_tag = '" ~ new_query_tag | replace("'", "''") ~ "'") -%}
+{{ return(original_query_tag) }}
+
+{% endmacro %}
+
+
+{% macro record_run_metrics(results) %}
+{#
+    on-run-end hook: one metrics row per model / test / seed / snapshot result.
+
+    Args:
+        results: dbt's on-run-end `results` (node results of this invocation)
+
+    Returns: INSERT statement (empty if nothing ran)
+#}
+
+{%- if not execute -%}
+    {{ return('') }}
+{%- endif -%}
+
+{%- set rows = [] -%}
+{%- for result in results
+        if result.node is not none
+        and result.node.resource_type in ('model', 'test', 'seed', 'snapshot') -%}
+    {%- set node = result.node -%}
+    {%- set response = result.adapter_response or {} -%}
+    {%- set materialized = node.config.materialized if node.resource_type == 'model' else none -%}
+    {%- if materialized == 'incremental' -%}
+        {%- set full_refresh = node.config.full_refresh if node.config.full_refresh is not none else flags.FULL_REFRESH -%}
+        {%- set refresh_mode = 'full_refresh' if full_refresh else 'incremental' -%}
+    {%- elif materialized == 'result_cache' and response.get('code') == 'CACHE HIT' -%}
+        {%- set refresh_mode = 'cache_hit' -%}
+    {%- elif materialized is not none -%}
+        {%- set refresh_mode = 'rebuild' -%}
+    {%- else -%}
+        {%- set refresh_mode = none -%}
+    {%- endif -%}
+    {%- set rows_affected = response.get('rows_affected') -%}
+    {%- set bytes_scanned = response.get('bytes_scanned', response.get('bytes_processed')) -%}
+    {%- do rows.append([
+        invocation_id,
+        flags.WHICH,
+        target.name,
+        run_started_at.strftime('%Y-%m-%d %H:%M:%S'),
+        node.unique_id,
+        node.name,
+        node.resource_type,
+        materialized,
+        refresh_mode,
+        result.status | string,
+        result.execution_time | round(3),
+        rows_affected if rows_affected is number and rows_affected >= 0 else none,
+        response.get('query_id'),
+        bytes_scanned if bytes_scanned is number else none,
+        model_query_tag(node) if node.resource_type == 'model' else none
+    ]) -%}
+{%- endfor -%}
+
+{%- if rows | length == 0 -%}
+    {{ return('') }}
+{%- endif -%}
+
+insert into {{ metrics_relation() }} (
+    invocation_id, command, target_name, run_started_at, unique_id, model_name,
+    resource_type, materialized, refresh_mode, status, execution_time_s,
+    rows_affected, query_id, bytes_scanned, query_tag, recorded_at
+)
+values
+{%- for row in rows %}
+    (
+        {%- for value in row -%}
+        {%- if value is none -%}null
+        {%- elif value is number -%}{{ value }}
+        {%- else -%}'{{ value | string | replace("'", "''") }}'
+        {%- endif -%}, {% endfor -%}
+        current_timestamp()
+    ){% if not loop.last %},{% endif %}
+{%- endfor %}
+
+{% endmacro %}
+
+
+{% macro check_model_regressions(invocation_id=none, threshold_pct=50, window_runs=7, min_runs=3, min_seconds=5) %}
+{#
+    Compare each successful model of one run with the median execution
+    time of its previous `window_runs` successful runs in the same
+    refresh mode (an incremental run is never compared with a full refresh).
+
+    Args:
+        invocation_id: Run to check (default: latest `dbt run` / `dbt build`)
+        threshold_pct: Report models slower than baseline by more than this %
+        window_runs: Previous runs forming the rolling baseline
+        min_runs: Skip models with fewer previous runs than this
+        min_seconds: Ignore slow-downs smaller than this many seconds (noise)
+
+    Logs:
+        MODEL_REGRESSIONS=[{"model": ..., "refresh_mode": ..., "current_s": ...,
+                            "baseline_s": ..., "baseline_runs": ..., "change_pct": ...}]
+
+    Returns: List of regression dicts (see log line)
+#}
+
+{%- if not execute -%}
+    {{ return([]) }}
+{%- endif -%}
+
+{%- set relation = metrics_relation() -%}
+{%- set regressions_query -%}
+    with checked_run as (
+        select invocation_id, run_started_at
+        from {{ relation }}
+        where resource_type = 'model'
+        {%- if invocation_id %}
+          and invocation_id = '{{ invocation_id }}'
+        {%- else %}
+          and command in ('run', 'build')
+        {%- endif %}
+        order by run_started_at desc
+        limit 1
+    ),
+    current_models as (
+        select m.model_name, m.refresh_mode, m.execution_time_s, m.run_started_at
+        from {{ relation }} m
+        inner join checked_run c
+            on m.invocation_id = c.invocation_id
+        where m.resource_type = 'model'
+          and m.status = 'success'
+    ),
+    history as (
+        select
+            h.model_name,
+            h.refresh_mode,
+            h.execution_time_s,
+            row_number() over (
+                partition by h.model_name, h.refresh_mode
+                order by h.run_started_at desc
+            ) as run_rank
+        from {{ relation }} h
+        inner join current_models c
+            on h.model_name = c.model_name
+            and h.refresh_mode = c.refresh_mode
+            and h.run_started_at < c.run_started_at
+        where h.resource_type = 'model'
+          and h.status = 'success'
+    ),
+    baseline as (
+        select
+            model_name,
+            refresh_mode,
+            median(execution_time_s) as baseline_s,
+            count(*) as baseline_runs
+        from history
+        where run_rank <= {{ window_runs }}
+        group by model_name, refresh_mode
+    )
+    select
+        c.model_name,
+        c.refresh_mode,
+        c.execution_time_s as current_s,
+        b.baseline_s,
+        b.baseline_runs,
+        round((c.execution_time_s / nullif(b.baseline_s, 0) - 1) * 100, 1) as change_pct
+    from current_models c
+    inner join baseline b
+        on c.model_name = b.model_name
+        and c.refresh_mode = b.refresh_mode
+    where b.baseline_runs >= {{ min_runs }}
+      and c.execution_time_s > b.baseline_s * (1 + {{ threshold_pct }} / 100.0)
+      and c.execution_time_s - b.baseline_s >= {{ min_seconds }}
+    order by change_pct desc
+{%- endset -%}
+
+{%- set regressions = [] -%}
+{%- for row in run_query(regressions_query).rows -%}
+    {%- do regressions.append({
+        'model': row['model_name'],
+        'refresh_mode': row['refresh_mode'],
+        'current_s': row['current_s'] | float | round(2),
+        'baseline_s': row['baseline_s'] | float | round(2),
+        'baseline_runs': row['baseline_runs'] | int,
+        'change_pct': row['change_pct'] | float | round(1)
+    }) -%}
+    {{ log("⚠️ " ~ row['model_name'] ~ " (" ~ row['refresh_mode'] ~ "): " ~ row['current_s'] | float | round(1)
+           ~ "s vs median " ~ row['baseline_s'] | float | round(1) ~ "s over " ~ row['baseline_runs']
+           ~ " run(s), +" ~ row['change_pct'] | float | round(1) ~ "%", info=True) }}
+{%- endfor -%}
+
+{{ log("MODEL_REGRESSIONS=" ~ tojson(regressions), info=True) }}
+{{ return(regressions) }}
+
+{% endmacro %}
@@ -0,0 +1,178 @@
+/*
+================================================================================
+FILE: staging_incremental.sql
+LAYER: Macros
+================================================================================
+
+PURPOSE:
+    Optional incremental materialization of the staging models
+    (var staging_materialization). As views, every downstream reference
+    re-runs the staging SQL - the boolean casts, the bathroom regexp and
+    the amenity flatten + PIVOT - once per consumer per run. As incremental
+    tables each raw row is parsed once, when it is loaded.
+
+LOGIC ('incremental'):
+    1. Batch: raw rows with _loaded_at in (stored watermark, this run's
+       max _loaded_at] (watermarks.sql), latest load per natural key
+    2. _row_hash: md5 of every raw column except _loaded_at
+    3. Skip rows whose key already has the same _row_hash in {{ this }}:
+       re-delivered, unchanged rows are not parsed again and keep their
+       original _loaded_at, so they do not move downstream watermarks
+    4. The model parses only what is left and MERGEs it on its key;
+       the post_hook stores the watermark
+
+    'view' (default) compiles exactly the SQL the staging models had before.
+
+MACROS:
+    1. staging_materialization() - 'view' or 'incremental' from the var
+    2. staging_source()          - SELECT of the raw rows to stage this run
+    3. staging_watermark()       - post_hook (empty in 'view' mode)
+    4. row_hash()                - SQL expression: md5 over columns, NULL-safe
+    5. stored_row_hash()         - {{ this }}._row_hash, computed when missing
+                                   (dim_listings / dim_hosts)
+
+USAGE:
+    {{ config(
+        materialized=staging_materialization(),
+        unique_key=['listing_id', 'calendar_date'],
+        incremental_strategy='merge',
+        post_hook="{{ staging_watermark('stg_calendar', 'calendar') }}"
+    ) }}
+
+    with source as (
+        {{ staging_source('stg_calendar', 'calendar', {'listing_id': 'listing_id', 'calendar_date': 'date'}) }}
+    )
+
+NOTE:
+    Rows with a NULL key cannot be matched and are appended as they are
+    (e.g. the reviews without an id). New amenity columns are appended
+    (on_schema_change) as NULL on existing rows, so the DAG full-refreshes
+    stg_listings and stg_amenities_changelog on a schema change.
+================================================================================
+*/
+
+
+{% macro staging_materialization() %}
+{#
+    Returns: 'view' or 'incremental' (var staging_materialization)
+#}
+
+{%- set materialization = var('staging_materialization', 'view') -%}
+{%- if materialization not in ['view', 'incremental'] -%}
+    {{ exceptions.raise_compiler_error(
+        "staging_materialization must be 'view' or 'incremental', got '" ~ materialization ~ "'"
+    ) }}
+{%- endif -%}
+{{ return(materialization) }}
+
+{% endmacro %}
+
+
+{% macro staging_source(model_name, table_name, key_columns) %}
+{#
+    Args:
+        model_name: Staging model (watermark owner)
+        table_name: Raw table in source 'raw'
+        key_columns: Dict of {key column in the model: raw SQL expression},
+                     e.g. {'calendar_date': 'date'}
+
+    Returns: SELECT of raw columns (+ _row_hash when incremental)
+#}
+
+{%- set relation = source('raw', table_name) -%}
+
+{%- if staging_materialization() == 'view' %}
+    select * from {{ relation }}
+{%- else -%}
+    {%- set hashed = [] -%}
+    {%- for column in (adapter.get_columns_in_relation(relation) if execute else []) -%}
+        {%- if column.name | lower != '_loaded_at' -%}
+            {%- do hashed.append(column.name) -%}
+        {%- endif -%}
+    {%- endfor %}
+    select *
+    from (
+        select
+            *,
+            {{ row_hash(hashed) }} as _row_hash
+        from {{ relation }}
+        {% if is_incremental() %}
+        where _loaded_at > {{ get_watermark(model_name, table_name) }}
+          and _loaded_at <= {{ watermark_upper_bound(relation) }}
+        {% endif %}
+        -- Latest load per key (NULL keys cannot be deduplicated)
+        qualify {% for expression in key_columns.values() %}{{ expression }} is null or {% endfor %}row_number() over (
+            partition by {{ key_columns.values() | join(', ') }}
+            order by _loaded_at desc
+        ) = 1
+    ) s
+    {% if is_incremental() %}
+    -- Unchanged since it was staged: nothing to parse
+    where not exists (
+        select 1
+        from {{ this }} t
+        where t._row_hash = s._row_hash
+        {% for column, expression in key_columns.items() %}
+          and t.{{ column }} = s.{{ expression }}
+        {% endfor %}
+    )
+    {% endif %}
+{%- endif %}
+
+{% endmacro %}
+
+
+{% macro staging_watermark(model_name, table_name) %}
+{#
+    post_hook of a staging model: store the raw table's watermark.
+
+    Returns: update_watermark() MERGE, or nothing in 'view' mode
+#}
+
+{%- if staging_materialization() == 'incremental' -%}
+    {{ update_watermark(model_name, {table_name: source('raw', table_name)}) }}
+{%- endif -%}
+
+{% endmacro %}
+
+
+{% macro row_hash(columns) %}
+{#
+    Args:
+        columns: Column names
+
+    Returns: SQL expression, md5 of the '|'-joined values (NULL as '_null_',
+             so NULL and '' hash differently)
+#}
+    md5(
+        concat_ws('|',
+            {% for column in columns %}
+                coalesce(cast({{ column }} as varchar), '_null_')
+                {%- if not loop.last %},{% endif %}
+            {% endfor %}
+        )
+    )
+{% endmacro %}
+
+
+{% macro stored_row_hash(columns) %}
+{#
+    _row_hash of the rows stored in {{ this }}, for models that compare it
+    with incoming rows. Tables built before they stored _row_hash get the
+    column from on_schema_change only after the model's SELECT ran, so
+    until then (and for rows still without one) it is computed from the
+    stored columns.
+
+    Args:
+        columns: Column names hashed into _row_hash
+
+    Returns: SQL expression
+#}
+    {%- set existing = adapter.get_columns_in_relation(this) | map(attribute='name') | map('lower') | list
+        if execute else [] -%}
+    {%- if '_row_hash' in existing -%}
+        coalesce(_row_hash, {{ row_hash(columns) }})
+    {%- else -%}
+        {{ row_hash(columns) }}
+    {%- endif -%}
+{% endmacro %}
@@ -0,0 +1,159 @@
+/*
+================================================================================
+FILE: watermarks.sql
+LAYER: Macros
+================================================================================
+
+PURPOSE:
+    Load-timestamp (_loaded_at) high-water marks for incremental models,
+    kept in a small state table instead of being derived from the target:
+
+        DEVELOPMENT.PIPELINE_WATERMARKS
+        | model_name                    | source_name | watermark_value     |
+        | fct_daily_listing_performance | calendar    | 2024-06-02 03:10:00 |
+
+LOGIC:
+    1. on-run-start creates the table if it does not exist
+    2. A model selects rows with
+           _loaded_at >  get_watermark(model, source)          (last run)
+           _loaded_at <= watermark_upper_bound(relation)       (this run)
+    3. A post_hook (update_watermark) stores the upper bound, so the next
+       run starts exactly where this one stopped
+
+    The upper bound is max(_loaded_at) read ONCE per invocation (cached in
+    the graph context) - the model and its post_hook see the same value, so
+    rows loaded while the model runs are picked up by the next run instead
+    of being skipped.
+
+MACROS:
+    1. watermark_relation()      - Relation of the watermark table
+    2. create_watermark_table()  - on-run-start DDL
+    3. get_watermark()           - SQL expression: last stored watermark
+    4. watermark_upper_bound()   - SQL literal: max(_loaded_at) for this run
+                                   (or another timestamp column)
+    5. update_watermark()        - post_hook MERGE storing the upper bounds
+
+USAGE:
+    {{ config(post_hook="{{ update_watermark('my_model', {'calendar': ref('stg_calendar')}) }}") }}
+
+    where _loaded_at > {{ get_watermark('my_model', 'calendar') }}
+      and _loaded_at <= {{ watermark_upper_bound(ref('stg_calendar')) }}
+
+    Any other monotonically increasing timestamp can be tracked the same
+    way by passing column=..., e.g. the monthly facts track the daily
+    fact's dbt_updated_at (changed_months.sql).
+
+NOTE:
+    Assumes _loaded_at only increases (re-loaded rows get a new _loaded_at).
+================================================================================
+*/
+
+
+{% macro watermark_relation() %}
+{#
+    Returns: Relation for <database>.development.pipeline_watermarks
+#}
+
+{{ return(api.Relation.create(
+    database=target.database,
+    schema=generate_schema_name('development', none) | trim,
+    identifier='pipeline_watermarks'
+)) }}
+
+{% endmacro %}
+
+
+{% macro create_watermark_table() %}
+{#
+    on-run-start hook: create the watermark table once.
+
+    Returns: DDL statement
+#}
+
+{%- if execute -%}
+    {%- set relation = watermark_relation() -%}
+    {%- do adapter.create_schema(relation) -%}
+    create table if not exists {{ relation }} (
+        model_name varchar,
+        source_name varchar,
+        watermark_value timestamp,
+        updated_at timestamp
+    )
+{%- endif -%}
+
+{% endmacro %}
+
+
+{% macro get_watermark(model_name, source_name) %}
+{#
+    Returns: SQL scalar subquery with the stored watermark (1900-01-01 if none)
+#}
+
+    (
+        select coalesce(max(watermark_value), '1900-01-01'::timestamp)
+        from {{ watermark_relation() }}
+        where model_name = '{{ model_name }}'
+          and source_name = '{{ source_name }}'
+    )
+
+{% endmacro %}
+
+
+{% macro watermark_upper_bound(relation, column='_loaded_at') %}
+{#
+    max(<column>) of a relation, queried once per invocation.
+
+    Returns: SQL timestamp literal
+#}
+
+{%- if not execute -%}
+    {{ return("'1900-01-01'::timestamp") }}
+{%- endif -%}
+
+{#- graph outlives one invocation when DbtSession reuses the manifest -#}
+{%- set cache = graph.setdefault('_watermark_upper_bounds', {}).setdefault(invocation_id, {}) -%}
+{%- set key = relation ~ '.' ~ column -%}
+
+{%- if key not in cache -%}
+    {%- set result = run_query('select max(' ~ column ~ ') from ' ~ relation) -%}
+    {%- set value = result.columns[0].values()[0] -%}
+    {%- do cache.update({key: value}) -%}
+{%- endif -%}
+
+{%- set value = cache[key] -%}
+{{ return("'" ~ (value if value is not none else '1900-01-01') ~ "'::timestamp") }}
+
+{% endmacro %}
+
+
+{% macro update_watermark(model_name, watermarks, column='_loaded_at') %}
+{#
+    post_hook: store this run's upper bound for each source.
+
+    Args:
+        model_name: Model owning the watermarks
+        watermarks: Dict of {source_name: relation}
+        column: Timestamp column the watermarks track
+
+    Returns: MERGE statement
+#}
+
+merge into {{ watermark_relation() }} t
+using (
+    {% for source_name, relation in watermarks | dictsort %}
+    select
+        '{{ model_name }}' as model_name,
+        '{{ source_name }}' as source_name,
+        {{ watermark_upper_bound(relation, column) }} as watermark_value
+    {% if not loop.last %}union all{% endif %}
+    {% endfor %}
+) s
+    on t.model_name = s.model_name
+    and t.source_name = s.source_name
+when matched then update set
+    watermark_value = greatest(t.watermark_value, s.watermark_value),
+    updated_at = current_timestamp()
+when not matched then insert (model_name, source_name, watermark_value, updated_at)
+    values (s.model_name, s.source_name, s.watermark_value, current_timestamp())
+
+{% endmacro %}
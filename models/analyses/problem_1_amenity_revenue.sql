@@ -1,7 +1,10 @@
 {{
     config(
-        materialized='view',
-        schema='analytics'
+        materialized='result_cache',
+        schema='analytics',
+        full_refresh=full_refresh_override('problem_1_amenity_revenue'),
+        cache_watermarks={'fct_daily_listing_performance': ['dbt_updated_at']},
+        cache_ignore_columns=['dbt_updated_at', 'changelog_loaded_at', 'listings_loaded_at']
     )
 }}
 
@@ -42,6 +45,8 @@ KEY METRICS:
 AMENITY VALIDATION:
     This query dynamically checks for AC column existence before using it.
     If column doesn't exist, uses a default approach.
+    amenity_flag() reads either the boolean column or the packed bitmask,
+    depending on var amenity_encoding.
 
 SOURCE: fct_daily_listing_performance, dim_date
 GRAIN: One row per month per AC status (with/without)
@@ -60,14 +65,15 @@ JOIN RATIONALE:
 {% set has_ac_slash = 'A/C' in amenity_columns %}
 {% set has_air_conditioning_caps = 'Air Conditioning' in amenity_columns %}
 
-{# Determine which column to use #}
-{% set ac_column = 
-    '"Air conditioning"' if has_air_conditioning else (
-    '"AC"' if has_ac else (
-    '"A/C"' if has_ac_slash else (
-    '"Air Conditioning"' if has_air_conditioning_caps else 'NULL'
+{# Determine which amenity to use #}
+{% set ac_name = 
+    'Air conditioning' if has_air_conditioning else (
+    'AC' if has_ac else (
+    'A/C' if has_ac_slash else (
+    'Air Conditioning' if has_air_conditioning_caps else none
     )))
 %}
+{% set ac_column = amenity_flag(ac_name, 'f') if ac_name else 'NULL' %}
 
 with monthly_revenue_by_ac as (
     select
@@ -143,7 +149,7 @@ select
     ) as yoy_revenue_change_pct,
     
     -- Amenity validation info
-    '{{ ac_column | replace('"', '') }}' as ac_column_used
+    '{{ ac_name or 'NULL' }}' as ac_column_used
 
 from with_yoy yoy
 join monthly_totals mt on yoy.calendar_month = mt.calendar_month
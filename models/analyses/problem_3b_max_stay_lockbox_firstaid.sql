@@ -1,7 +1,10 @@
 {{
     config(
-        materialized='view',
-        schema='analytics'
+        materialized='result_cache',
+        schema='analytics',
+        full_refresh=full_refresh_override('problem_3b_max_stay_lockbox_firstaid'),
+        cache_watermarks={'fct_listing_max_stay_index': ['calendar_loaded_at', 'listings_loaded_at']},
+        cache_ignore_columns=['dbt_updated_at', 'changelog_loaded_at', 'listings_loaded_at']
     )
 }}
 
@@ -28,13 +31,14 @@ EXAMPLE OUTPUT:
 
 LOGIC:
     1. First validate which amenity column names exist in the data
-    2. Filter int_availability_spans for listings with BOTH amenities
+    2. Filter fct_listing_max_stay_index (best span per listing) for
+       listings with BOTH amenities
        - Check for variations: "Lockbox", "Lock box", "Self check-in"
        - Check for variations: "First aid kit", "First Aid Kit"
-    3. Apply minimum_nights constraint (can't book if below minimum)
-    4. Find maximum span per qualifying listing
-    5. Compare to overall maximum (from all listings)
-    6. Calculate how much shorter this is than the unrestricted max
+    3. minimum_nights constraint is already applied to the spans
+       (effective_max_stay_nights, int_availability_spans)
+    4. Compare to overall maximum (from all listings)
+    5. Calculate how much shorter this is than the unrestricted max
 
 KEY INSIGHT:
     - Listing 10986 has Lockbox but NOT First Aid Kit → excluded
@@ -43,8 +47,10 @@ KEY INSIGHT:
 AMENITY VALIDATION:
     This query dynamically checks for amenity column existence before filtering.
     If column doesn't exist, it will be handled gracefully.
+    has_amenities() / amenity_flag() compile to bitand() on the index's
+    amenity bitmask, whatever var amenity_encoding is.
 
-SOURCE: int_availability_spans, dim_listings, dim_date
+SOURCE: fct_listing_max_stay_index, dim_listings, dim_date
 GRAIN: One row per qualifying listing
 ================================================================================
 */
@@ -57,74 +63,38 @@ GRAIN: One row per qualifying listing
 {% set has_self_checkin = 'Self check-in' in amenity_columns %}
 {% set has_first_aid_kit_caps = 'First Aid Kit' in amenity_columns %}
 
-with filtered_spans as (
-    -- Only include listings with BOTH Lockbox AND First Aid Kit
-    select *
-    from {{ ref('int_availability_spans') }}
-    where 1=1
-        -- Lockbox check (handle variations)
-        {% if has_lockbox %}
-        and "Lockbox" = true
-        {% elif has_self_checkin %}
-        and "Self check-in" = true
-        {% else %}
-        and false  -- No lockbox-type amenity found, return empty result
-        {% endif %}
-        -- First Aid Kit check (handle variations)
-        {% if has_first_aid_kit %}
-        and "First aid kit" = true
-        {% elif has_first_aid_kit_caps %}
-        and "First Aid Kit" = true
-        {% else %}
-        and false  -- No first aid kit amenity found, return empty result
-        {% endif %}
-),
+{# Resolve the amenity names to use (none = not found) #}
+{% set lockbox_name = 'Lockbox' if has_lockbox else ('Self check-in' if has_self_checkin else none) %}
+{% set first_aid_kit_name = 'First aid kit' if has_first_aid_kit else ('First Aid Kit' if has_first_aid_kit_caps else none) %}
 
-listing_max_stays as (
+with listing_max_stays as (
+    -- Only include listings with BOTH Lockbox AND First Aid Kit
     select
-        fs.listing_id,
-        fs.listing_name,
-        fs.neighborhood,
-        {% if has_lockbox %}
-        fs."Lockbox" as has_lockbox,
-        {% elif has_self_checkin %}
-        fs."Self check-in" as has_lockbox,
-        {% else %}
-        false as has_lockbox,
-        {% endif %}
-        {% if has_first_aid_kit %}
-        fs."First aid kit" as has_first_aid_kit,
-        {% elif has_first_aid_kit_caps %}
-        fs."First Aid Kit" as has_first_aid_kit,
+        i.listing_id,
+        i.listing_name,
+        i.neighborhood,
+        {{ amenity_flag(lockbox_name, 'i', encoding='bitmask') if lockbox_name else 'false' }} as has_lockbox,
+        {{ amenity_flag(first_aid_kit_name, 'i', encoding='bitmask') if first_aid_kit_name else 'false' }} as has_first_aid_kit,
+        i.effective_max_stay_nights as max_possible_stay_nights,
+        i.span_start_date as best_span_start,
+        i.span_end_date as best_span_end,
+        i.total_availability_spans,
+        round(i.avg_span_duration, 1) as avg_span_duration
+    from {{ ref('fct_listing_max_stay_index') }} i
+    where i.span_rank = 1
+        {% if lockbox_name and first_aid_kit_name %}
+        -- Lockbox AND First Aid Kit (one bitand per mask)
+        and {{ has_amenities([lockbox_name, first_aid_kit_name], 'i', encoding='bitmask') }}
         {% else %}
-        false as has_first_aid_kit,
-        {% endif %}
-        max(fs.effective_max_stay_nights) as max_possible_stay_nights,
-        max_by(fs.span_start_date, fs.effective_max_stay_nights) as best_span_start,
-        max_by(fs.span_end_date, fs.effective_max_stay_nights) as best_span_end,
-        count(*) as total_availability_spans,
-        round(avg(fs.effective_max_stay_nights), 1) as avg_span_duration
-    from filtered_spans fs
-    group by 
-        fs.listing_id, 
-        fs.listing_name, 
-        fs.neighborhood
-        {% if has_lockbox %}
-        , fs."Lockbox"
-        {% elif has_self_checkin %}
-        , fs."Self check-in"
-        {% endif %}
-        {% if has_first_aid_kit %}
-        , fs."First aid kit"
-        {% elif has_first_aid_kit_caps %}
-        , fs."First Aid Kit"
+        and false  -- Lockbox or first aid kit amenity not found, return empty result
         {% endif %}
 ),
 
 -- Get the overall max stay for comparison (from Problem 3A)
 overall_max as (
     select max(effective_max_stay_nights) as global_max_stay
-    from {{ ref('int_availability_spans') }}
+    from {{ ref('fct_listing_max_stay_index') }}
+    where span_rank = 1
 ),
 
 enriched as (
@@ -196,8 +166,8 @@ select
     global_max_stay || ' nights' as insight_summary,
     
     -- Amenity validation info
-    '{{ "Lockbox" if has_lockbox else ("Self check-in" if has_self_checkin else "NOT FOUND") }}' as lockbox_column_used,
-    '{{ "First aid kit" if has_first_aid_kit else ("First Aid Kit" if has_first_aid_kit_caps else "NOT FOUND") }}' as first_aid_kit_column_used
+    '{{ lockbox_name or "NOT FOUND" }}' as lockbox_column_used,
+    '{{ first_aid_kit_name or "NOT FOUND" }}' as first_aid_kit_column_used
     
 from enriched
 order by max_possible_stay_nights desc, listing_id
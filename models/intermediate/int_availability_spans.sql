@@ -1,6 +1,21 @@
 {{
     config(
-        materialized='view'
+        materialized='incremental',
+        unique_key='listing_id',
+        incremental_strategy='delete+insert',
+        on_schema_change='sync_all_columns',
+        full_refresh=full_refresh_override('int_availability_spans'),
+        pre_hook="
+            {% if is_incremental() %}
+            delete from {{ this }}
+            where listing_id in (
+                {{ listings_loaded_since({
+                    'calendar_loaded_at': ref('stg_calendar'),
+                    'listings_loaded_at': ref('stg_listings')
+                }) }}
+            )
+            {% endif %}
+        "
     )
 }}
 
@@ -25,6 +40,20 @@ LOGIC:
        - If span duration < minimum_nights: booking not possible (effective = 0)
        - If span duration > maximum_nights: cap at maximum_nights
     5. Join listing attributes and amenities for filtering
+       (boolean columns, or amenity_bitmask_<n> when
+       var amenity_encoding = 'bitmask' - see amenity_bitmask.sql)
+
+INCREMENTAL STRATEGY (listing-scoped):
+    - First run: spans for every listing
+    - Subsequent runs: only listings whose stg_calendar or stg_listings rows
+      have a _loaded_at newer than the calendar_loaded_at /
+      listings_loaded_at watermarks stored in this table
+    - Those listings' spans are recomputed over their FULL calendar (spans
+      can merge or split anywhere) and replace the old ones
+      (delete+insert on listing_id)
+    - pre_hook deletes the changed listings first, so a listing that now has
+      no available days loses its stale spans too
+    - Full refresh needed when amenity columns change (schema check)
 
 JOIN RATIONALE:
     - availability_spans → listings uses INNER JOIN because spans come from the
@@ -49,19 +78,44 @@ SOURCE: stg_calendar, stg_listings
 GRAIN: One row per availability span per listing
 
 DOWNSTREAM DEPENDENCIES:
-    - problem_3a_max_stay_duration
-    - problem_3b_max_stay_lockbox_firstaid
+    - fct_listing_max_stay_index (top-k spans per listing + amenity key),
+      read by problem_3a_max_stay_duration / problem_3b_max_stay_lockbox_firstaid
 ================================================================================
 */
 
 {% set amenity_columns = get_listing_amenity_columns() %}
 
-with calendar as (
+with {% if is_incremental() %}
+-- Listings with calendar or listing rows loaded since the last run
+changed_listings as (
+    {{ listings_loaded_since({
+        'calendar_loaded_at': ref('stg_calendar'),
+        'listings_loaded_at': ref('stg_listings')
+    }) }}
+),
+
+{% endif %}
+calendar as (
     select * from {{ ref('stg_calendar') }}
+    {% if is_incremental() %}
+    where listing_id in (select listing_id from changed_listings)
+    {% endif %}
 ),
 
 listings as (
     select * from {{ ref('stg_listings') }}
+    {% if is_incremental() %}
+    where listing_id in (select listing_id from changed_listings)
+    {% endif %}
+),
+
+-- Load watermark per listing (covers ALL calendar rows, not only available days)
+calendar_loads as (
+    select
+        listing_id,
+        max(_loaded_at) as calendar_loaded_at
+    from calendar
+    group by listing_id
 ),
 
 -- Only look at available days
@@ -73,10 +127,11 @@ available_days as (
         maximum_nights,
         -- Create a group identifier for consecutive days
         -- Subtracting row_number from date: consecutive dates get same value
-        dateadd(day, -row_number() over (
-            partition by listing_id 
-            order by calendar_date
-        ), calendar_date) as span_group
+        {{ dbt.dateadd(
+            'day',
+            '-row_number() over (partition by listing_id order by calendar_date)',
+            'calendar_date'
+        ) }} as span_group
     from calendar
     where is_available = true
 ),
@@ -133,14 +188,23 @@ spans_with_max_stay as (
         l.room_type,
         l.accommodates,
         
+        -- Incremental watermarks
+        cl.calendar_loaded_at,
+        l._loaded_at as listings_loaded_at,
+        
         -- Include all dynamic amenity columns for filtering
+        {% if amenity_encoding() == 'bitmask' %}
+        {{ amenity_bitmask_select(amenity_columns, 'l') }}
+        {% else %}
         {% for amenity in amenity_columns %}
         l."{{ amenity }}"{% if not loop.last %},{% endif %}
         {% endfor %}
+        {% endif %}
     -- INNER JOIN: Only include spans for valid listings
     -- (calendar entries without matching listings are data quality issues)
     from availability_spans s
     inner join listings l on s.listing_id = l.listing_id
+    inner join calendar_loads cl on s.listing_id = cl.listing_id
 )
 
 select * from spans_with_max_stay
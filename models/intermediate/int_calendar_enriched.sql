@@ -19,7 +19,9 @@ LOGIC:
     1. Start with stg_calendar (day × listing grain)
     2. Join stg_listings for static listing attributes
     3. Join int_listing_amenities_scd for time-aware amenities
-       - Uses: calendar_date BETWEEN valid_from AND valid_to
+       - The version whose valid_from..valid_to contains calendar_date,
+         via amenity_scd_join() (ASOF join by default, see
+         amenity_scd_join.sql for the equi / range modes)
        - Ensures amenities reflect what the listing had ON THAT DATE
     4. Calculate daily_revenue (price if reserved, else 0)
     5. Create occupancy flag for aggregation
@@ -39,8 +41,9 @@ JOIN RATIONALE:
     - calendar → listings: INNER JOIN because every calendar row must have a
       valid listing; orphan calendar entries are treated as data quality issues
       and excluded early.
-    - calendar → amenities_scd: LEFT JOIN because not every date will have an
-      SCD record; uses >= and <= for clearer optimizer hints on date ranges.
+    - calendar → amenities_scd: LEFT (ASOF) JOIN because not every date will
+      have an SCD record; an ASOF / equi join avoids the per-listing
+      cartesian product of a >= / <= range join.
 ================================================================================
 */
 
@@ -115,11 +118,8 @@ enriched as (
     -- INNER JOIN for listings: calendar entries must have valid listing data
     from calendar c
     inner join listings l on c.listing_id = l.listing_id
-    -- LEFT JOIN for amenities: not all dates have SCD records; uses >= and <= for optimizer
-    left join amenities_scd a 
-        on c.listing_id = a.listing_id 
-        and c.calendar_date >= a.valid_from 
-        and c.calendar_date <= a.valid_to
+    -- LEFT (ASOF) JOIN for amenities: not all dates have SCD records
+    {{ amenity_scd_join('c', 'calendar_date', 'calendar', 'amenities_scd', 'a') }}
 )
 
 select * from enriched
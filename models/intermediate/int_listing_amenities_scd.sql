@@ -1,6 +1,25 @@
 {{
     config(
-        materialized='view'
+        materialized='incremental',
+        unique_key=['listing_id', 'valid_from'],
+        incremental_strategy='merge',
+        on_schema_change='sync_all_columns',
+        full_refresh=full_refresh_override('int_listing_amenities_scd'),
+        post_hook="
+            {% if is_incremental() %}
+            -- Remove versions superseded by an out-of-order change in this run
+            delete from {{ this }} t
+            using (
+                select listing_id, valid_from, valid_to, dbt_updated_at
+                from {{ this }}
+                where dbt_updated_at = (select max(dbt_updated_at) from {{ this }})
+            ) s
+            where t.listing_id = s.listing_id
+              and t.dbt_updated_at < s.dbt_updated_at
+              and t.valid_from <= s.valid_to
+              and t.valid_to >= s.valid_from
+            {% endif %}
+        "
     )
 }}
 
@@ -18,9 +37,28 @@ PURPOSE:
 
 LOGIC:
     1. Take amenity snapshots from stg_amenities_changelog
-    2. Use LEAD() window function to find the next change date
-    3. Set valid_to = next_change_date - 1 day (or 9999-12-31 if current)
-    4. Each row represents a period when the listing had a specific amenity set
+    2. Hash the set of amenities present (amenity_hash) and skip snapshots
+       whose set is identical to the previous one (no-op changes)
+    3. Use LEAD() window function to find the next change date
+    4. Set valid_to = next_change_date - 1 day (or 9999-12-31 if current)
+    5. Each row represents a period when the listing had a specific amenity set
+
+INCREMENTAL STRATEGY:
+    - First run: Full history from the changelog
+    - Subsequent runs: Only changelog rows with _loaded_at newer than the
+      changelog_loaded_at watermark in this table
+    - For each affected listing, the existing versions from the one active
+      the day before its earliest new change onward (normally just the open
+      valid_to = 9999-12-31 row) are combined with the new snapshots and
+      re-sliced; MERGE closes the open row and inserts the new versions
+    - post_hook deletes old versions that an out-of-order (back-dated)
+      change made redundant, so validity windows never overlap
+    - Work is proportional to the day's changes, not the whole changelog
+    - Full refresh needed when amenity columns change (schema check)
+
+ROW HASH:
+    amenity_hash = md5 of the names of the amenities that are TRUE. A new
+    (always FALSE) amenity column does not change existing hashes.
 
 EXAMPLE:
     If listing 123 added "Air conditioning" on 2022-03-15:
@@ -42,7 +80,91 @@ DOWNSTREAM DEPENDENCIES:
 {% set amenity_columns = get_amenity_columns() %}
 
 with changelog as (
-    select * from {{ ref('stg_amenities_changelog') }}
+    select
+        listing_id,
+        change_at,
+        _loaded_at,
+        {% for amenity in amenity_columns %}
+        "{{ amenity }}",
+        {% endfor %}
+        md5(''
+            {% for amenity in amenity_columns %}
+            || iff("{{ amenity }}", '{{ amenity | replace("'", "''") }}|', '')
+            {% endfor %}
+        ) as amenity_hash
+    from {{ ref('stg_amenities_changelog') }}
+    {% if is_incremental() %}
+    where _loaded_at > (
+        select coalesce(max(changelog_loaded_at), '1900-01-01'::timestamp) from {{ this }}
+    )
+    {% endif %}
+    -- A re-loaded snapshot replaces the earlier load of the same change
+    qualify row_number() over (
+        partition by listing_id, change_at
+        order by _loaded_at desc
+    ) = 1
+),
+
+{% if is_incremental() %}
+
+-- Listings touched by this batch and their earliest new change
+affected_listings as (
+    select
+        listing_id,
+        min(change_at) as first_change_at
+    from changelog
+    group by listing_id
+),
+
+-- Existing versions that the new snapshots can affect: the one active the
+-- day before the earliest new change onward (usually only the open row)
+existing_tail as (
+    select
+        s.listing_id,
+        s.valid_from as change_at,
+        s.changelog_loaded_at as _loaded_at,
+        {% for amenity in amenity_columns %}
+        s."{{ amenity }}",
+        {% endfor %}
+        s.amenity_hash
+    from {{ this }} s
+    inner join affected_listings a
+        on s.listing_id = a.listing_id
+    where s.valid_to >= {{ dbt.dateadd('day', -1, 'a.first_change_at') }}
+),
+
+snapshots as (
+    select * from changelog
+    union all
+    select t.*
+    from existing_tail t
+    where not exists (
+        select 1
+        from changelog c
+        where c.listing_id = t.listing_id
+          and c.change_at = t.change_at
+    )
+),
+
+{% else %}
+
+snapshots as (
+    select * from changelog
+),
+
+{% endif %}
+
+-- Skip no-op changes: same amenity set as the previous snapshot
+changes_only as (
+    select
+        *,
+        -- Latest changelog load applied to this listing (incremental watermark)
+        max(_loaded_at) over (partition by listing_id) as changelog_loaded_at
+    from snapshots
+    qualify amenity_hash is distinct from lag(amenity_hash) over (
+        partition by listing_id
+        order by change_at
+    )
 ),
 
 with_validity as (
@@ -50,16 +172,21 @@ with_validity as (
         listing_id,
         change_at as valid_from,
         coalesce(
-            dateadd(day, -1, lead(change_at) over (
-                partition by listing_id 
-                order by change_at
-            )),
+            {{ dbt.dateadd(
+                'day', -1,
+                'lead(change_at) over (partition by listing_id order by change_at)'
+            ) }},
             '9999-12-31'::date
         ) as valid_to,
         {% for amenity in amenity_columns %}
-        "{{ amenity }}"{% if not loop.last %},{% endif %}
+        "{{ amenity }}",
         {% endfor %}
-    from changelog
+        amenity_hash,
+        changelog_loaded_at,
+
+        -- Audit
+        current_timestamp() as dbt_updated_at
+    from changes_only
 )
 
 select * from with_validity
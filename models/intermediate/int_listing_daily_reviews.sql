@@ -0,0 +1,98 @@
+{{
+    config(
+        materialized='incremental',
+        unique_key=['listing_id', 'review_date'],
+        incremental_strategy='pruned_merge',
+        prune_column='review_date',
+        on_schema_change='sync_all_columns',
+        full_refresh=full_refresh_override('int_listing_daily_reviews'),
+        post_hook="
+            {{ update_watermark('int_listing_daily_reviews', {
+                'reviews': ref('stg_reviews')
+            }) }}
+        "
+    )
+}}
+
+/*
+================================================================================
+FILE: int_listing_daily_reviews.sql
+LAYER: Intermediate
+SCHEMA: development
+================================================================================
+
+PURPOSE:
+    Reviews pre-aggregated to the daily fact's grain, so
+    fct_daily_listing_performance joins exactly one row per listing-day.
+    Joining stg_reviews directly fanned out a fact row per review on days
+    with several reviews (duplicated revenue, non-unique merge keys).
+
+LOGIC:
+    1. Find the (listing_id, review_date) days with reviews loaded since the
+       last run (_loaded_at in (stored watermark, this run's max _loaded_at])
+    2. Re-aggregate ALL reviews of those days (a new review changes the
+       day's count and average, not just adds a row)
+    3. Merge on (listing_id, review_date)
+
+SOURCE: stg_reviews
+GRAIN: One row per listing per review date
+
+INCREMENTAL STRATEGY:
+    - First run: every review
+    - Subsequent runs: only the days touched by newly loaded reviews;
+      watermark in DEVELOPMENT.PIPELINE_WATERMARKS (see watermarks.sql),
+      advanced by the post_hook
+    - pruned_merge: the MERGE only scans target rows of the batch's dates
+    - _loaded_at = latest _loaded_at of the day's reviews, so the fact can
+      watermark this model exactly as it watermarked stg_reviews
+    - A review re-loaded under another listing or date leaves its old day
+      counted until a full refresh
+
+DOWNSTREAM DEPENDENCIES:
+    - fct_daily_listing_performance (left join on listing_id + calendar_date)
+================================================================================
+*/
+
+with {% if is_incremental() %}
+-- Days whose reviews were loaded since the last run
+changed_days as (
+    select distinct listing_id, review_date
+    from {{ ref('stg_reviews') }}
+    where _loaded_at > {{ get_watermark('int_listing_daily_reviews', 'reviews') }}
+      and _loaded_at <= {{ watermark_upper_bound(ref('stg_reviews')) }}
+),
+
+{% endif %}
+reviews as (
+    select
+        r.listing_id,
+        r.review_date,
+        r.review_id,
+        r.review_score,
+        r._loaded_at
+    from {{ ref('stg_reviews') }} r
+    {% if is_incremental() %}
+    inner join changed_days d
+        on r.listing_id = d.listing_id
+        and r.review_date = d.review_date
+    {% endif %}
+    where r.listing_id is not null
+      and r.review_date is not null
+)
+
+select
+    listing_id,
+    review_date,
+    count(*) as review_count,
+    sum(review_score) as review_score_sum,
+    avg(review_score) as avg_review_score,
+    max(review_id) as latest_review_id,
+
+    -- Load metadata (drives the fact's watermark)
+    max(_loaded_at) as _loaded_at,
+
+    -- Audit
+    current_timestamp() as dbt_updated_at
+
+from reviews
+group by listing_id, review_date
@@ -104,7 +104,7 @@ select
     review_scores_rating,
     valid_from,
     coalesce(
-        dateadd(day, -1, next_valid_from),
+        {{ dbt.dateadd('day', -1, 'next_valid_from') }},
         '9999-12-31'::date
     ) as valid_to,
     case 
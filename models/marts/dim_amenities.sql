@@ -0,0 +1,71 @@
+{{
+    config(
+        materialized='table',
+        schema='mart'
+    )
+}}
+
+/*
+================================================================================
+FILE: dim_amenities.sql
+LAYER: Marts (Dimension)
+SCHEMA: mart
+================================================================================
+
+PURPOSE:
+    Amenity dictionary for the compact bitmask encoding
+    (var amenity_encoding = 'bitmask'). Maps each amenity to the bitmask
+    column and bit that represent it in int_availability_spans, dim_listings
+    and fct_daily_listing_performance.
+
+LOGIC:
+    1. Read stable amenity ids from stg_amenity_registry
+    2. bitmask_word = (amenity_id - 1) / 63, bit_position = (amenity_id - 1) % 63
+    3. bit_value = 2^bit_position
+
+EXAMPLE:
+    Decode amenities of a fact row:
+        select f.listing_id, f.calendar_date, a.amenity_name
+        from fct_daily_listing_performance f
+        join dim_amenities a
+            on a.bitmask_word = 0
+            and bitand(f.amenity_bitmask_0, a.bit_value) <> 0
+
+SOURCE: stg_amenity_registry
+GRAIN: One row per amenity
+
+DOWNSTREAM DEPENDENCIES:
+    - Ad-hoc decoding of amenity bitmasks
+================================================================================
+*/
+
+with registry as (
+    select * from {{ ref('stg_amenity_registry') }}
+),
+
+bits as (
+    select
+        amenity_id,
+        amenity_name,
+        floor((amenity_id - 1) / {{ amenity_bits_per_word() }})::int as bitmask_word,
+        mod(amenity_id - 1, {{ amenity_bits_per_word() }})::int as bit_position,
+        in_changelog,
+        in_listings,
+        first_seen_at
+    from registry
+)
+
+select
+    amenity_id,
+    amenity_name,
+    bitmask_word,
+    'amenity_bitmask_' || bitmask_word as bitmask_column,
+    bit_position,
+    power(2, bit_position)::bigint as bit_value,
+    in_changelog,
+    in_listings,
+    first_seen_at,
+
+    -- Audit
+    current_timestamp() as dbt_updated_at
+from bits
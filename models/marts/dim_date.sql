@@ -1,7 +1,8 @@
 {{
     config(
         materialized='table',
-        schema='mart'
+        schema='mart',
+        tags=['current_date']
     )
 }}
 
@@ -35,6 +36,10 @@ KEY FEATURES:
 SOURCE: Generated (no source table)
 GRAIN: One row per calendar date
 
+TAG current_date:
+    days_ago changes every day, so the DAG rebuilds this model on every run
+    even when its code is unchanged (see rental_pipeline/build_state.py)
+
 DOWNSTREAM DEPENDENCIES:
     - fct_daily_listing_performance (joins on date_key)
     - All analytics views for time intelligence
@@ -43,9 +48,7 @@ DOWNSTREAM DEPENDENCIES:
 
 with date_spine as (
     -- Generate dates from 2020 to 2030
-    select
-        dateadd(day, seq4(), '2020-01-01'::date) as date_day
-    from table(generator(rowcount => 4018))  -- ~11 years of dates
+    {{ date_spine_days('2020-01-01', 4018) }}  -- ~11 years of dates
 ),
 
 holidays as (
@@ -85,7 +88,7 @@ select
     -- Week attributes
     weekofyear(d.date_day) as week_of_year,
     date_trunc('week', d.date_day)::date as week_start_date,
-    dateadd(day, 6, date_trunc('week', d.date_day))::date as week_end_date,
+    {{ dbt.dateadd('day', 6, "date_trunc('week', d.date_day)") }}::date as week_end_date,
     
     -- Month attributes
     month(d.date_day) as month_number,
@@ -142,12 +145,12 @@ select
     end as is_peak_season,
     
     -- Period-over-period helpers
-    dateadd(day, -7, d.date_day) as same_day_last_week,
-    dateadd(month, -1, d.date_day) as same_day_last_month,
-    dateadd(year, -1, d.date_day) as same_day_last_year,
+    {{ dbt.dateadd('day', -7, 'd.date_day') }} as same_day_last_week,
+    {{ dbt.dateadd('month', -1, 'd.date_day') }} as same_day_last_month,
+    {{ dbt.dateadd('year', -1, 'd.date_day') }} as same_day_last_year,
     
     -- Relative date flags (calculated at query time in views, but useful reference)
-    datediff(day, d.date_day, current_date()) as days_ago,
+    {{ dbt.datediff('d.date_day', 'current_date()', 'day') }} as days_ago,
     
     -- ISO format for compatibility
     to_char(d.date_day, 'YYYY-MM-DD') as date_iso,
@@ -1,7 +1,13 @@
 {{
     config(
-        materialized='table',
-        schema='mart'
+        materialized='incremental',
+        schema='mart',
+        unique_key='host_sk',
+        incremental_strategy='merge',
+        on_schema_change='sync_all_columns',
+        full_refresh=false,
+        tags=['current_date'],
+        post_hook="{{ update_watermark('dim_hosts', {'listings': ref('stg_listings')}) }}"
     )
 }}
 
@@ -17,28 +23,159 @@ PURPOSE:
     Provides host attributes and derived metrics for analysis.
 
 LOGIC:
-    1. Source host history from int_hosts_history
-    2. Generate surrogate key from host_id + valid_from
+    1. Source host history from int_hosts_history (first build) or the
+       changed hosts only (incremental, see below)
+    2. Generate surrogate key from host_id + valid_from (stable across
+       runs: a version keeps its valid_from)
     3. Calculate derived attributes:
        - host_tenure_years: Years since host joined
        - host_experience_tier: New/Established/Veteran classification
     4. Preserve SCD metadata (valid_from, valid_to, is_current)
 
+INCREMENTAL STRATEGY (hash-diff SCD Type 2):
+    - First run: one version per host from int_hosts_history
+    - full_refresh=false: later versions exist only in this table (raw
+      keeps the latest row per listing), so --full-refresh keeps the
+      history. Drop the table to rebuild it from int_hosts_history.
+    - _row_hash = row_hash() of the tracked attributes (host_name,
+      host_location, host_since_date); rows stored without one are
+      hashed on the fly
+    - Subsequent runs read int_hosts_history only for hosts with
+      stg_listings rows loaded since the 'listings' watermark
+      (PIPELINE_WATERMARKS, see watermarks.sql):
+        - new host: first version, valid_from = host_since_date
+        - _row_hash differs from the current version: the current version
+          is closed (valid_to = load date - 1 day) and a new one starts on
+          the load date (same day as the current version: rewritten in place)
+    - Versions whose host_tenure_years is out of date (a host's
+      anniversary) are rewritten with the new tenure / tier
+    - MERGE on host_sk; the post_hook stores the watermark
+    - Work is proportional to the day's host changes and anniversaries
+
 KEY FEATURES:
     - Surrogate key (host_sk) for dimension joins
     - Natural key (host_id) for business identification
     - Experience tier classification
-    - SCD Type 2 support (currently single record per host)
+    - SCD Type 2, maintained incrementally (new version per attribute change)
 
-SOURCE: int_hosts_history
+SOURCE: int_hosts_history, stg_listings
 GRAIN: One row per host per validity period
 
+TAG current_date:
+    host_tenure_years / host_experience_tier age with the date, so the DAG
+    runs this model on every run even when raw.listings did not move (the
+    incremental run then only rewrites versions whose tenure changed)
+
 DOWNSTREAM DEPENDENCIES:
     - Can be joined to fact tables via host_id
 ================================================================================
 */
 
-with host_scd as (
+{% set tracked_columns = ['host_name', 'host_location', 'host_since_date'] %}
+{% set source_tracked_columns = [] %}
+{% for column in tracked_columns %}
+    {% do source_tracked_columns.append('h.' ~ column) %}
+{% endfor %}
+
+with {% if is_incremental() %}
+-- Current version per host (hash recomputed for rows stored without one)
+current_versions as (
+    select host_id, valid_from, {{ stored_row_hash(tracked_columns) }} as _row_hash
+    from {{ this }}
+    where is_current
+),
+
+-- Hosts with listing rows loaded since the last run, and the load date
+loaded_hosts as (
+    select
+        host_id,
+        max(_loaded_at)::date as loaded_date
+    from {{ ref('stg_listings') }}
+    where host_id is not null
+      and _loaded_at > {{ get_watermark('dim_hosts', 'listings') }}
+      and _loaded_at <= {{ watermark_upper_bound(ref('stg_listings')) }}
+    group by host_id
+),
+
+-- New hosts and hosts whose tracked attributes changed
+host_changes as (
+    select
+        h.host_id,
+        h.host_name,
+        h.host_location,
+        h.host_since_date,
+        c.valid_from as current_valid_from,
+        case
+            when c.host_id is null then coalesce(h.host_since_date, '1900-01-01'::date)
+            else greatest(lh.loaded_date, c.valid_from)
+        end as change_date
+    from {{ ref('int_hosts_history') }} h
+    inner join loaded_hosts lh
+        on h.host_id = lh.host_id
+    left join current_versions c
+        on h.host_id = c.host_id
+    where c.host_id is null
+       or c._row_hash is distinct from {{ row_hash(source_tracked_columns) }}
+),
+
+host_versions as (
+    -- New versions
+    select
+        host_id,
+        host_name,
+        host_location,
+        host_since_date,
+        change_date as valid_from,
+        '9999-12-31'::date as valid_to,
+        true as is_current
+    from host_changes
+
+    union all
+
+    -- Current versions closed by a change
+    select
+        e.host_id,
+        e.host_name,
+        e.host_location,
+        e.host_since_date,
+        e.valid_from,
+        cast({{ dbt.dateadd('day', -1, 'c.change_date') }} as date) as valid_to,
+        false as is_current
+    from {{ this }} e
+    inner join host_changes c
+        on e.host_id = c.host_id
+        and e.valid_from = c.current_valid_from
+    where e.is_current
+      and c.change_date > c.current_valid_from
+
+    union all
+
+    -- Unchanged versions whose tenure moved with the date
+    select
+        e.host_id,
+        e.host_name,
+        e.host_location,
+        e.host_since_date,
+        e.valid_from,
+        e.valid_to,
+        e.is_current
+    from {{ this }} e
+    where e.host_tenure_years is distinct from {{ dbt.datediff('e.host_since_date', 'current_date()', 'year') }}
+      and not exists (
+          select 1
+          from host_changes c
+          where c.host_id = e.host_id
+            and e.valid_from = c.current_valid_from
+      )
+),
+
+{% else %}
+host_versions as (
+    select * from {{ ref('int_hosts_history') }}
+),
+
+{% endif %}
+host_scd as (
     select
         -- Surrogate key for SCD
         {{ generate_surrogate_key(['host_id', 'valid_from']) }} as host_sk,
@@ -52,10 +189,10 @@ with host_scd as (
         host_since_date,
         
         -- Derived attributes
-        datediff(year, host_since_date, current_date()) as host_tenure_years,
+        {{ dbt.datediff('host_since_date', 'current_date()', 'year') }} as host_tenure_years,
         case
-            when datediff(year, host_since_date, current_date()) < 1 then 'New Host'
-            when datediff(year, host_since_date, current_date()) < 3 then 'Established Host'
+            when {{ dbt.datediff('host_since_date', 'current_date()', 'year') }} < 1 then 'New Host'
+            when {{ dbt.datediff('host_since_date', 'current_date()', 'year') }} < 3 then 'Established Host'
             else 'Veteran Host'
         end as host_experience_tier,
         
@@ -63,11 +200,12 @@ with host_scd as (
         valid_from,
         valid_to,
         is_current,
+        {{ row_hash(tracked_columns) }} as _row_hash,
         
         -- Audit columns
         current_timestamp() as dbt_updated_at
         
-    from {{ ref('int_hosts_history') }}
+    from host_versions
 )
 
 select * from host_scd
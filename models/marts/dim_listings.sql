@@ -1,7 +1,30 @@
 {{
     config(
-        materialized='table',
-        schema='mart'
+        materialized='incremental',
+        schema='mart',
+        unique_key='listing_sk',
+        incremental_strategy='merge',
+        on_schema_change='sync_all_columns',
+        full_refresh=false,
+        post_hook=[
+            "
+            {% if is_incremental() %}
+            -- Remove versions superseded by the re-sliced history of this run
+            delete from {{ this }} t
+            using (
+                select listing_id, valid_from, valid_to, dbt_updated_at
+                from {{ this }}
+                where dbt_updated_at = (select max(dbt_updated_at) from {{ this }})
+            ) s
+            where t.listing_id = s.listing_id
+              and t.dbt_updated_at < s.dbt_updated_at
+              and t.valid_from <= s.valid_to
+              and t.valid_to >= s.valid_from
+            {% endif %}
+            ",
+            "{{ update_watermark('dim_listings', {'listings': ref('stg_listings')}) }}",
+            "{{ update_watermark('dim_listings', {'amenity_scd': ref('int_listing_amenities_scd')}, column='dbt_updated_at') }}"
+        ]
     )
 }}
 
@@ -17,23 +40,53 @@ PURPOSE:
     Includes listing attributes, derived tiers, and point-in-time amenities.
 
 LOGIC:
-    1. Source listing history from int_listings_history
+    1. Source listing history from int_listings_history (first build) or
+       the changed listings only (incremental, see below)
     2. Join amenities from int_listing_amenities_scd for each validity period
-    3. Generate surrogate key from listing_id + valid_from
+       (version valid on the period's valid_from, via amenity_scd_join)
+    3. Generate surrogate key from listing_id + valid_from (stable across
+       runs: a version keeps its valid_from)
     4. Calculate derived tier attributes:
        - capacity_tier: Small/Medium/Large/Extra Large
        - price_tier: Budget/Economy/Mid-Range/Premium/Luxury
        - rating_tier: Based on review scores
-    5. Include all dynamic amenity columns
+    5. Include all dynamic amenity columns (or packed amenity_bitmask_<n>
+       columns when var amenity_encoding = 'bitmask'; decode via dim_amenities)
+
+INCREMENTAL STRATEGY (hash-diff SCD Type 2):
+    - First run: whole history from int_listings_history
+    - full_refresh=false: the load-dated versions below exist only in this
+      table (raw.listings keeps the latest row per listing), so
+      --full-refresh / var full_refresh_models keep the history. Drop the
+      table to rebuild it from int_listings_history.
+    - _row_hash = row_hash() of the tracked attributes (name, neighborhood,
+      property / room type, accommodates, beds, host, base price);
+      number_of_reviews / review_scores_rating are overwritten (type 1).
+      Rows stored without a _row_hash are hashed on the fly.
+    - Subsequent runs only touch listings that changed, found through the
+      PIPELINE_WATERMARKS table (watermarks.sql):
+        a. stg_listings rows loaded since the 'listings' watermark: new
+           listings, a _row_hash that differs from the current version
+           (attribute change, dated by the load) or changed type-1 values
+        b. int_listing_amenities_scd versions written since the
+           'amenity_scd' watermark (dbt_updated_at)
+    - A changed listing's whole timeline is re-sliced: versions start at
+      each amenity version, each stored attribute change and this run's
+      attribute change. Versions before the change keep their stored
+      attributes, later ones take the current listing row. MERGE on
+      listing_sk (listing_id + valid_from, so unchanged versions keep their key).
+    - post_hook deletes versions the new ones supersede (overlapping
+      windows), then stores both watermarks
+    - Work is proportional to the day's listing and amenity changes
 
 KEY FEATURES:
     - Surrogate key (listing_sk) for dimension joins
     - Natural key (listing_id) for business identification
     - Tier classifications for segmentation
     - Point-in-time correct amenities
-    - SCD Type 2 full history
+    - SCD Type 2 full history, maintained incrementally
 
-SOURCE: int_listings_history, int_listing_amenities_scd
+SOURCE: int_listings_history, stg_listings, int_listing_amenities_scd
 GRAIN: One row per listing per validity period
 
 DOWNSTREAM DEPENDENCIES:
@@ -42,7 +95,164 @@ DOWNSTREAM DEPENDENCIES:
 ================================================================================
 */
 
-with listings_with_amenities as (
+
+{% set tracked_columns = [
+    'listing_name', 'neighborhood', 'property_type', 'room_type',
+    'accommodates', 'beds', 'host_id', 'base_price'
+] %}
+{% set type1_columns = ['number_of_reviews', 'review_scores_rating'] %}
+
+with {% if is_incremental() %}
+-- Current version per listing (hash recomputed for rows stored without one)
+current_versions as (
+    select
+        listing_id,
+        {{ stored_row_hash(tracked_columns) }} as _row_hash,
+        {{ type1_columns | join(', ') }}
+    from {{ this }}
+    where is_current
+),
+
+-- Listing rows loaded since the last run, hashed like the stored versions
+loaded_listings as (
+    select
+        listing_id,
+        coalesce(first_review_date, '2020-01-01'::date) as listing_created_date,
+        {{ row_hash(tracked_columns) }} as _row_hash,
+        {{ type1_columns | join(', ') }},
+        _loaded_at::date as loaded_date
+    from {{ ref('stg_listings') }}
+    where _loaded_at > {{ get_watermark('dim_listings', 'listings') }}
+      and _loaded_at <= {{ watermark_upper_bound(ref('stg_listings')) }}
+),
+
+-- Listings with amenity versions (re)written since the last run
+changed_amenities as (
+    select distinct listing_id
+    from {{ ref('int_listing_amenities_scd') }}
+    where dbt_updated_at > {{ get_watermark('dim_listings', 'amenity_scd') }}
+      and dbt_updated_at <= {{ watermark_upper_bound(ref('int_listing_amenities_scd'), 'dbt_updated_at') }}
+),
+
+-- New listings, changed tracked / type-1 values, changed amenities
+listing_changes as (
+    select
+        l.listing_id,
+        l.listing_created_date,
+        -- Tracked attributes changed: versions from the load date take the new values
+        case
+            when c._row_hash <> l._row_hash then l.loaded_date
+        end as attribute_change_date
+    from loaded_listings l
+    left join current_versions c
+        on l.listing_id = c.listing_id
+    where c.listing_id is null
+       or c._row_hash <> l._row_hash
+       {% for column in type1_columns %}
+       or c.{{ column }} is distinct from l.{{ column }}
+       {% endfor %}
+    union all
+    select listing_id, null, null
+    from changed_amenities
+),
+
+affected_listings as (
+    select
+        listing_id,
+        max(listing_created_date) as listing_created_date,
+        max(attribute_change_date) as attribute_change_date
+    from listing_changes
+    group by listing_id
+),
+
+-- Stored history of the affected listings
+stored_versions as (
+    select
+        e.listing_id,
+        {{ tracked_columns | join(', ') }},
+        e.valid_from,
+        e.valid_to,
+        {{ stored_row_hash(tracked_columns) }} as _row_hash
+    from {{ this }} e
+    inner join affected_listings a
+        on e.listing_id = a.listing_id
+),
+
+-- The affected listings' timelines are re-sliced as a whole. Version starts:
+-- every amenity version, every stored attribute change (a stored version
+-- whose hash differs from the one before it, incl. the first version) and
+-- this run's attribute change. Listings without either start at creation.
+version_starts as (
+    select listing_id, valid_from
+    from (
+        select
+            listing_id,
+            valid_from,
+            _row_hash,
+            lag(_row_hash) over (partition by listing_id order by valid_from) as previous_row_hash
+        from stored_versions
+    ) h
+    where previous_row_hash is distinct from _row_hash
+    union
+    select s.listing_id, s.valid_from
+    from {{ ref('int_listing_amenities_scd') }} s
+    inner join affected_listings a
+        on s.listing_id = a.listing_id
+    union
+    select listing_id, attribute_change_date
+    from affected_listings
+    where attribute_change_date is not null
+    union
+    select a.listing_id, a.listing_created_date
+    from affected_listings a
+    where a.listing_created_date is not null
+      and not exists (select 1 from stored_versions e where e.listing_id = a.listing_id)
+      and not exists (
+          select 1 from {{ ref('int_listing_amenities_scd') }} s where s.listing_id = a.listing_id
+      )
+),
+
+listing_versions as (
+    select
+        v.listing_id,
+        {% for column in tracked_columns %}
+        case
+            when e.listing_id is not null
+             and v.valid_from < coalesce(a.attribute_change_date, '9999-12-31'::date)
+                then e.{{ column }}
+            else l.{{ column }}
+        end as {{ column }},
+        {% endfor %}
+        -- Type 1: every version takes the current values
+        {% for column in type1_columns %}
+        l.{{ column }},
+        {% endfor %}
+        v.valid_from,
+        coalesce(
+            cast({{ dbt.dateadd('day', -1, 'lead(v.valid_from) over (partition by v.listing_id order by v.valid_from)') }} as date),
+            '9999-12-31'::date
+        ) as valid_to,
+        lead(v.valid_from) over (partition by v.listing_id order by v.valid_from) is null as is_current
+    from version_starts v
+    inner join affected_listings a
+        on v.listing_id = a.listing_id
+    -- Stored version in effect on the start date (attribute values before the change)
+    left join stored_versions e
+        on v.listing_id = e.listing_id
+        and v.valid_from >= e.valid_from
+        and v.valid_from <= e.valid_to
+    -- Current listing row (only changed listings are read)
+    inner join {{ ref('stg_listings') }} l
+        on v.listing_id = l.listing_id
+),
+
+{% else %}
+listing_versions as (
+    select * from {{ ref('int_listings_history') }}
+),
+
+{% endif %}
+listings_with_amenities as (
     select
         lh.listing_id,
         lh.listing_name,
@@ -64,10 +274,8 @@ with listings_with_amenities as (
         coalesce(a."{{ amenity }}", false) as "{{ amenity }}"{% if not loop.last %},{% endif %}
         {% endfor %}
         
-    from {{ ref('int_listings_history') }} lh
-    left join {{ ref('int_listing_amenities_scd') }} a
-        on lh.listing_id = a.listing_id
-        and lh.valid_from between a.valid_from and a.valid_to
+    from listing_versions lh
+    {{ amenity_scd_join('lh', 'valid_from', 'listing_versions', ref('int_listing_amenities_scd'), 'a') }}
 ),
 
 listing_scd as (
@@ -117,14 +325,19 @@ listing_scd as (
         end as rating_tier,
         
         -- Amenity columns
+        {% if amenity_encoding() == 'bitmask' %}
+        {{ amenity_bitmask_select(get_amenity_columns()) }},
+        {% else %}
         {% for amenity in get_amenity_columns() %}
         "{{ amenity }}"{% if not loop.last %},{% endif %}
         {% endfor %},
+        {% endif %}
         
         -- SCD metadata
         valid_from,
-        valid_to,
+        cast(valid_to as date) as valid_to,
         is_current,
+        {{ row_hash(tracked_columns) }} as _row_hash,
         
         -- Audit columns
         current_timestamp() as dbt_updated_at
@@ -3,8 +3,28 @@
         materialized='incremental',
         schema='mart',
         unique_key=['listing_id', 'calendar_date'],
-        incremental_strategy='merge',
-        on_schema_change='sync_all_columns'
+        incremental_strategy='pruned_merge',
+        prune_column='calendar_date',
+        on_schema_change='sync_all_columns',
+        full_refresh=full_refresh_override('fct_daily_listing_performance'),
+        post_hook=[
+            "
+            {% if var('fct_daily_incremental_mode', 'watermark') == 'watermark' %}
+            {{ update_watermark('fct_daily_listing_performance', {
+                'calendar': ref('stg_calendar'),
+                'reviews': ref('int_listing_daily_reviews'),
+                'listings': ref('stg_listings')
+            }) }}
+            {% endif %}
+            ",
+            "
+            {% if var('fct_daily_incremental_mode', 'watermark') == 'watermark' %}
+            {{ update_watermark('fct_daily_listing_performance', {
+                'amenity_scd': ref('int_listing_amenities_scd')
+            }, column='changelog_loaded_at') }}
+            {% endif %}
+            "
+        ]
     )
 }}
 
@@ -24,7 +44,10 @@ LOGIC:
     1. Start with stg_calendar for the day × listing grain
     2. Join stg_listings for static listing attributes
     3. Join int_listing_amenities_scd for point-in-time correct amenities
-    4. Join stg_reviews for daily review scores
+       (amenity_scd_join: ASOF join by default, var amenity_scd_join_mode)
+    4. Join int_listing_daily_reviews (one row per listing-day: review
+       count, average score, latest review id) - never more than one
+       match, so busy review days do not duplicate fact rows / revenue
     5. Calculate derived metrics:
        - daily_revenue: Price if reserved, else 0
        - is_occupied: 1 if reserved, else 0
@@ -33,17 +56,53 @@ LOGIC:
 
 INCREMENTAL STRATEGY:
     - First run: Full load of all data
-    - Subsequent runs: Only process last 7 days
-    - Uses MERGE to handle late-arriving data and updates
+    - var fct_daily_incremental_mode = 'watermark' (default):
+        Only the (listing_id, calendar_date) keys whose inputs changed
+        since the last run, i.e. _loaded_at in (stored watermark, this
+        run's max _loaded_at]:
+          - calendar: stg_calendar rows loaded
+          - reviews: int_listing_daily_reviews rows loaded
+          - listings: every date of a listing whose stg_listings row was
+            loaded (base_price, price_variance and the listing attributes)
+          - amenity_scd: the dates from valid_from on of the
+            int_listing_amenities_scd versions written by a changelog load
+            (changelog_loaded_at, not dbt_updated_at: rebuilding the SCD on
+            a schema change re-stamps dbt_updated_at but not the content
+            the fact already has; the column backfill fills the new columns)
+        Watermarks live in DEVELOPMENT.PIPELINE_WATERMARKS (see
+        watermarks.sql) and are advanced by the post_hooks. Late-arriving
+        rows of ANY date are picked up by a small merge - no full refresh
+        needed.
+    - var fct_daily_incremental_mode = 'lookback' (previous behaviour):
+        Re-process the last 7 days of calendar_date
+    - var repair_slices (set by the DAG from check_late_arrivals): the
+      listed (listing_id, start_date..end_date) slices are rebuilt as well,
+      so late arrivals in lookback mode need no full refresh
+    - pruned_merge strategy: the MERGE only scans target rows whose
+      calendar_date appears in the batch (incremental_predicates)
+    - Full refresh (DAG default): batched instead of one CREATE TABLE AS.
+      var fct_daily_batch = {start, end} restricts a full build to
+      start <= calendar_date < end; rental_pipeline.BatchRebuild compiles
+      the model with placeholder bounds, inserts month / week batches
+      concurrently into a shadow table and swaps it in (resumable)
     
 SCHEMA CHANGE HANDLING (New Amenities):
     When a new amenity is added to the source:
     1. get_amenity_columns() macro detects the new amenity at compile time
     2. on_schema_change='sync_all_columns' adds new column to target table
-    3. Incremental run populates new column for recent 7 days only
-    4. Historical rows will have NULL for new amenity
+    3. Incremental run populates new column for the current batch only
+    4. Historical rows will have NULL for new amenity until backfilled
     
-    To backfill historical data: Run `dbt run --full-refresh -s fct_daily_listing_performance`
+    To backfill historical data: the DAG runs the column-only backfill
+    (`dbt run-operation backfill_amenity_columns`, a date-chunked UPDATE of
+    the new columns). A full refresh also works but rebuilds every row.
+
+    BITMASK ENCODING (var amenity_encoding = 'bitmask'):
+    Amenities are stored as packed amenity_bitmask_<n> BIGINT columns
+    (63 amenities per column, bit = amenity_id - 1, see dim_amenities)
+    instead of one boolean column each. A new amenity only sets a new bit,
+    so the schema does not change and no full refresh is needed; rows built
+    before the amenity existed simply have the bit unset (FALSE).
     
     Recommended: Set up weekly full refresh OR create a separate detection macro
     that triggers full refresh when schema changes are detected.
@@ -54,7 +113,7 @@ KEY FEATURES:
     - Pre-calculated revenue and occupancy flags
     - Date key for dim_date joins
 
-SOURCE: stg_calendar, stg_listings, int_listing_amenities_scd, stg_reviews
+SOURCE: stg_calendar, stg_listings, int_listing_amenities_scd, int_listing_daily_reviews
 GRAIN: One row per listing per calendar date
 
 DOWNSTREAM DEPENDENCIES:
@@ -66,34 +125,98 @@ DOWNSTREAM DEPENDENCIES:
 JOIN RATIONALE:
     - calendar_data → listings_data: INNER JOIN because calendar rows must have
       a valid listing; removing orphans early improves clarity and performance.
-    - calendar_data → amenities_scd: LEFT JOIN with explicit >= and <= to
-      preserve dates without SCD rows while giving the optimizer clearer
-      predicates on the date range.
-    - enriched → reviews_data: LEFT JOIN because many dates have no reviews.
+    - calendar_data → amenities_scd: LEFT (ASOF) JOIN to preserve dates
+      without SCD rows; the ASOF / equi modes of amenity_scd_join() replace
+      the >= / <= range join, which the warehouse plans as a per-listing
+      cartesian product.
+    - enriched → reviews_data: LEFT JOIN because many dates have no reviews;
+      reviews_data is unique per (listing_id, review_date), so the join
+      never changes the grain.
 ================================================================================
 */
 
 {% set amenity_columns = get_amenity_columns() %}
+{% set incremental_mode = var('fct_daily_incremental_mode', 'watermark') %}
+{% set batch = var('fct_daily_batch', none) %}
 
-with calendar_data as (
-    select
-        listing_id,
-        calendar_date,
-        is_available,
-        is_reserved,
-        reservation_id,
-        daily_price,
-        minimum_nights,
-        maximum_nights,
-        calendar_month,
-        calendar_year,
-        day_of_week,
-        is_weekend
+with {% if is_incremental() %}
+-- (listing_id, calendar_date) keys to rebuild on this run
+changed_keys as (
+    {% if incremental_mode == 'watermark' %}
+    -- Keys whose calendar rows or daily review aggregates were loaded since the last run
+    select listing_id, calendar_date
     from {{ ref('stg_calendar') }}
+    where _loaded_at > {{ get_watermark('fct_daily_listing_performance', 'calendar') }}
+      and _loaded_at <= {{ watermark_upper_bound(ref('stg_calendar')) }}
+    union
+    select listing_id, review_date
+    from {{ ref('int_listing_daily_reviews') }}
+    where _loaded_at > {{ get_watermark('fct_daily_listing_performance', 'reviews') }}
+      and _loaded_at <= {{ watermark_upper_bound(ref('int_listing_daily_reviews')) }}
+    union
+    -- Every date of the listings whose attributes (base_price, ...) were loaded
+    select c.listing_id, c.calendar_date
+    from {{ ref('stg_calendar') }} c
+    inner join {{ ref('stg_listings') }} l
+        on c.listing_id = l.listing_id
+    where l._loaded_at > {{ get_watermark('fct_daily_listing_performance', 'listings') }}
+      and l._loaded_at <= {{ watermark_upper_bound(ref('stg_listings')) }}
+    union
+    -- Dates covered by amenity versions written by changelog loads since the last run
+    select c.listing_id, c.calendar_date
+    from {{ ref('stg_calendar') }} c
+    inner join (
+        select listing_id, min(valid_from) as valid_from
+        from {{ ref('int_listing_amenities_scd') }}
+        where changelog_loaded_at > {{ get_watermark('fct_daily_listing_performance', 'amenity_scd') }}
+          and changelog_loaded_at <= {{ watermark_upper_bound(ref('int_listing_amenities_scd'), 'changelog_loaded_at') }}
+        group by listing_id
+    ) a
+        on c.listing_id = a.listing_id
+        and c.calendar_date >= a.valid_from
+    {% else %}
+    -- Recent data only
+    select listing_id, calendar_date
+    from {{ ref('stg_calendar') }}
+    where calendar_date >= {{ dbt.dateadd('day', -7, '(select max(calendar_date) from ' ~ this ~ ')') }}
+    {% endif %}
+    {% if var('repair_slices', []) | length > 0 %}
+    union
+    -- Late-arrival repair slices from check_late_arrivals (var repair_slices)
+    select c.listing_id, c.calendar_date
+    from {{ ref('stg_calendar') }} c
+    inner join ({{ repair_slices_values() }}) r
+        on c.listing_id = r.listing_id
+        and c.calendar_date between r.start_date and r.end_date
+    {% endif %}
+),
+
+{% endif %}
+calendar_data as (
+    select
+        c.listing_id,
+        c.calendar_date,
+        c.is_available,
+        c.is_reserved,
+        c.reservation_id,
+        c.daily_price,
+        c.minimum_nights,
+        c.maximum_nights,
+        c.calendar_month,
+        c.calendar_year,
+        c.day_of_week,
+        c.is_weekend
+    from {{ ref('stg_calendar') }} c
     
     {% if is_incremental() %}
-    -- Only process recent data on incremental runs
-    where calendar_date >= dateadd(day, -7, (select max(calendar_date) from {{ this }}))
+    -- Only the changed (listing_id, calendar_date) rows
+    inner join changed_keys k
+        on c.listing_id = k.listing_id
+        and c.calendar_date = k.calendar_date
+    {% elif batch %}
+    -- One date batch of a batched full refresh (rental_pipeline.BatchRebuild)
+    where c.calendar_date >= '{{ batch['start'] }}'::date
+      and c.calendar_date < '{{ batch['end'] }}'::date
     {% endif %}
 ),
 
@@ -123,13 +246,24 @@ amenities_scd as (
     select * from {{ ref('int_listing_amenities_scd') }}
 ),
 
+-- One row per listing-day (pre-aggregated), only the changed keys when incremental
 reviews_data as (
     select
-        listing_id,
-        review_date,
-        review_score,
-        review_id
-    from {{ ref('stg_reviews') }}
+        r.listing_id,
+        r.review_date,
+        r.review_count,
+        r.review_score_sum,
+        r.avg_review_score,
+        r.latest_review_id
+    from {{ ref('int_listing_daily_reviews') }} r
+    {% if is_incremental() %}
+    inner join changed_keys k
+        on r.listing_id = k.listing_id
+        and r.review_date = k.calendar_date
+    {% elif batch %}
+    where r.review_date >= '{{ batch['start'] }}'::date
+      and r.review_date < '{{ batch['end'] }}'::date
+    {% endif %}
 ),
 
 -- Enrich calendar with listing attributes and time-aware amenities
@@ -172,18 +306,17 @@ enriched as (
     from calendar_data c
     inner join listings_data l 
         on c.listing_id = l.listing_id
-    -- LEFT JOIN for amenities: not all dates may have SCD records
-    left join amenities_scd a
-        on c.listing_id = a.listing_id
-        and c.calendar_date >= a.valid_from 
-        and c.calendar_date <= a.valid_to
+    -- LEFT (ASOF) JOIN for amenities: not all dates may have SCD records
+    {{ amenity_scd_join('c', 'calendar_date', 'calendar_data', 'amenities_scd', 'a') }}
 ),
 
 with_reviews as (
     select
         e.*,
-        coalesce(r.review_score, 0) as daily_review_score,
-        r.review_id
+        coalesce(r.review_count, 0) as daily_review_count,
+        coalesce(r.avg_review_score, 0) as daily_review_score,
+        coalesce(r.review_score_sum, 0) as daily_review_score_total,
+        r.latest_review_id as review_id
     from enriched e
     left join reviews_data r
         on e.listing_id = r.listing_id 
@@ -226,7 +359,9 @@ final as (
         -- Review Metrics
         number_of_reviews,
         review_scores_rating,
+        daily_review_count,
         daily_review_score,
+        daily_review_score_total,
         review_id,
         
         -- Computed Metrics
@@ -259,9 +394,13 @@ final as (
         is_weekend,
         
         -- Amenities (point-in-time correct)
+        {% if amenity_encoding() == 'bitmask' %}
+        {{ amenity_bitmask_select(amenity_columns) }},
+        {% else %}
         {% for amenity in amenity_columns %}
         "{{ amenity }}"{% if not loop.last %},{% endif %}
         {% endfor %},
+        {% endif %}
         
         -- Audit
         current_timestamp() as dbt_updated_at
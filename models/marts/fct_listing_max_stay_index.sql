@@ -0,0 +1,123 @@
+{{
+    config(
+        materialized='incremental',
+        schema='mart',
+        unique_key='listing_id',
+        incremental_strategy='delete+insert',
+        on_schema_change='sync_all_columns',
+        full_refresh=full_refresh_override('fct_listing_max_stay_index'),
+        pre_hook="
+            {% if is_incremental() %}
+            delete from {{ this }}
+            where listing_id in (
+                {{ listings_loaded_since({
+                    'calendar_loaded_at': ref('stg_calendar'),
+                    'listings_loaded_at': ref('stg_listings')
+                }) }}
+            )
+            {% endif %}
+        "
+    )
+}}
+
+/*
+================================================================================
+FILE: fct_listing_max_stay_index.sql
+LAYER: Marts (Fact - Max-Stay Index)
+SCHEMA: mart
+================================================================================
+
+PURPOSE:
+    Precomputed longest stays per listing with a compact amenity key, so
+    "longest stay for listings with amenities X and Y" is a lookup over
+    one small table (max_stay_for_amenities macro) instead of a new model
+    filtering every availability span.
+
+LOGIC:
+    1. Rank each listing's spans from int_availability_spans by
+       effective_max_stay_nights (ties: earliest span first)
+    2. Keep the top var('max_stay_index_top_k') spans per listing
+    3. Carry the listing-level span statistics (total spans, average
+       span duration) on every row
+    4. Amenity key: amenity_bitmask_<n> columns (bit = amenity_id - 1, see
+       amenity_bitmask.sql) in BOTH amenity encodings, so any amenity
+       combination is one bitand per 63 amenities
+
+SOURCE: int_availability_spans
+GRAIN: One row per listing per top-k span (span_rank 1..k)
+
+INCREMENTAL STRATEGY (listing-scoped, as int_availability_spans):
+    - First run: every listing
+    - Subsequent runs: listings whose stg_calendar or stg_listings rows
+      were loaded after the calendar_loaded_at / listings_loaded_at
+      watermarks stored here; pre_hook deletes them first, so a listing
+      with no spans left drops out
+
+DOWNSTREAM DEPENDENCIES:
+    - max_stay_for_amenities() / problem_3a_max_stay_duration
+    - problem_3b_max_stay_lockbox_firstaid
+================================================================================
+*/
+
+-- Incremental scope reads the staging loads (listings_loaded_since):
+-- depends_on: {{ ref('stg_calendar') }}
+-- depends_on: {{ ref('stg_listings') }}
+
+{% set amenity_columns = get_listing_amenity_columns() %}
+
+with spans as (
+    select *
+    from {{ ref('int_availability_spans') }}
+    {% if is_incremental() %}
+    where listing_id in (
+        {{ listings_loaded_since({
+            'calendar_loaded_at': ref('stg_calendar'),
+            'listings_loaded_at': ref('stg_listings')
+        }) }}
+    )
+    {% endif %}
+),
+
+ranked_spans as (
+    select
+        s.*,
+        row_number() over (
+            partition by s.listing_id
+            order by s.effective_max_stay_nights desc, s.span_start_date
+        ) as span_rank,
+        count(*) over (partition by s.listing_id) as total_availability_spans,
+        avg(s.effective_max_stay_nights) over (partition by s.listing_id) as avg_span_duration
+    from spans s
+)
+
+select
+    listing_id,
+    span_rank,
+    span_start_date,
+    span_end_date,
+    effective_max_stay_nights,
+    consecutive_available_days,
+    is_bookable,
+    listing_name,
+    neighborhood,
+    total_availability_spans,
+    avg_span_duration,
+
+    -- Compact amenity key
+    {% if amenity_encoding() == 'bitmask' %}
+    {% for column in amenity_bitmask_columns() %}
+    {{ column }},
+    {% endfor %}
+    {% else %}
+    {{ amenity_bitmask_select(amenity_columns) }},
+    {% endif %}
+
+    -- Incremental watermarks
+    calendar_loaded_at,
+    listings_loaded_at,
+
+    -- Audit
+    current_timestamp() as dbt_updated_at
+
+from ranked_spans
+where span_rank <= {{ var('max_stay_index_top_k', 3) }}
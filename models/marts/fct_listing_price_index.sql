@@ -0,0 +1,69 @@
+{{
+    config(
+        materialized='incremental',
+        schema='mart',
+        unique_key=['listing_id', 'calendar_date'],
+        incremental_strategy='pruned_merge',
+        prune_column='calendar_date',
+        on_schema_change='sync_all_columns',
+        full_refresh=full_refresh_override('fct_listing_price_index'),
+        post_hook="
+            {{ update_watermark('fct_listing_price_index', {
+                'fct_daily_listing_performance': ref('fct_daily_listing_performance')
+            }, column='dbt_updated_at') }}
+        "
+    )
+}}
+
+/*
+================================================================================
+FILE: fct_listing_price_index.sql
+LAYER: Marts (Fact - Price Index)
+SCHEMA: mart
+================================================================================
+
+PURPOSE:
+    Narrow listing × day price table for price comparisons between any two
+    dates or windows (neighborhood_price_comparison macro, problem_2).
+    Carries only the columns a price comparison needs, instead of the
+    ~70-column daily fact with one column per amenity.
+
+LOGIC:
+    1. Take listing, neighborhood and adjusted_price per listing × day from
+       fct_daily_listing_performance
+    2. Flag priced days (adjusted_price > 0), the days comparisons average
+
+SOURCE: fct_daily_listing_performance
+GRAIN: One row per listing per day
+
+INCREMENTAL STRATEGY:
+    - First run: All days
+    - Subsequent runs: daily fact rows inserted or updated since the last
+      run (dbt_updated_at watermark, see changed_months.sql for the same
+      pattern), merged with pruned_merge on calendar_date
+
+DOWNSTREAM DEPENDENCIES:
+    - fct_neighborhood_price_index (neighborhood × day rollup)
+    - neighborhood_price_comparison() / problem_2_neighborhood_pricing
+================================================================================
+*/
+
+select
+    listing_id,
+    calendar_date,
+    listing_name,
+    neighborhood,
+    adjusted_price,
+    case
+        when adjusted_price is not null and adjusted_price > 0 then 1
+        else 0
+    end as is_priced,
+
+    -- Audit
+    current_timestamp() as dbt_updated_at
+
+from {{ ref('fct_daily_listing_performance') }}
+{% if is_incremental() %}
+where dbt_updated_at > {{ get_watermark('fct_listing_price_index', 'fct_daily_listing_performance') }}
+  and dbt_updated_at <= {{ watermark_upper_bound(ref('fct_daily_listing_performance'), 'dbt_updated_at') }}
+{% endif %}
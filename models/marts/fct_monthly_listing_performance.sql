@@ -1,7 +1,16 @@
 {{
     config(
-        materialized='table',
-        schema='mart'
+        materialized='incremental',
+        schema='mart',
+        unique_key='calendar_month',
+        incremental_strategy='delete+insert',
+        on_schema_change='sync_all_columns',
+        full_refresh=full_refresh_override('fct_monthly_listing_performance'),
+        post_hook="
+            {{ update_watermark('fct_monthly_listing_performance', {
+                'fct_daily_listing_performance': ref('fct_daily_listing_performance')
+            }, column='dbt_updated_at') }}
+        "
     )
 }}
 
@@ -36,6 +45,17 @@ KEY METRICS:
 SOURCE: fct_daily_listing_performance
 GRAIN: One row per listing per month
 
+INCREMENTAL STRATEGY:
+    - First run: All months
+    - Subsequent runs: delete+insert whole calendar_months:
+        - months in which fct_daily_listing_performance had rows inserted
+          or updated (dbt_updated_at) since this model last ran - new days,
+          re-priced days and late-arrival repairs alike (changed_months.sql)
+        - var repair_months, if set
+        - the month after each of those, whose MoM columns read it
+    - The month before each recomputed month is aggregated as LAG input
+      only and not written back
+
 DOWNSTREAM DEPENDENCIES:
     - Used directly for monthly reporting dashboards
 ================================================================================
@@ -77,8 +97,8 @@ with monthly_metrics as (
         
         -- Review metrics
         avg(review_scores_rating) as avg_review_score,
-        count(review_id) as review_count,
-        sum(daily_review_score) as total_review_score,
+        sum(daily_review_count) as review_count,
+        sum(daily_review_score_total) as total_review_score,
         
         -- Pricing metrics
         min(adjusted_price) as min_nightly_rate,
@@ -92,6 +112,10 @@ with monthly_metrics as (
         ) as revpar
         
     from {{ ref('fct_daily_listing_performance') }}
+    {% if is_incremental() %}
+    -- Recomputed months plus the month before each (LAG input)
+    where {{ monthly_refresh_filter('calendar_month', lag_months=1) }}
+    {% endif %}
     group by 
         listing_id,
         calendar_month,
@@ -143,3 +167,7 @@ select
     current_timestamp() as dbt_updated_at
     
 from with_mom_changes
+{% if is_incremental() %}
+-- Months only read as LAG input are left as they are
+where {{ monthly_refresh_filter('calendar_month') }}
+{% endif %}
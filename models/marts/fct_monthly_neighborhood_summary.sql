@@ -1,7 +1,16 @@
 {{
     config(
-        materialized='table',
-        schema='mart'
+        materialized='incremental',
+        schema='mart',
+        unique_key='calendar_month',
+        incremental_strategy='delete+insert',
+        on_schema_change='sync_all_columns',
+        full_refresh=full_refresh_override('fct_monthly_neighborhood_summary'),
+        post_hook="
+            {{ update_watermark('fct_monthly_neighborhood_summary', {
+                'fct_daily_listing_performance': ref('fct_daily_listing_performance')
+            }, column='dbt_updated_at') }}
+        "
     )
 }}
 
@@ -42,6 +51,19 @@ USE CASES:
 SOURCE: fct_daily_listing_performance
 GRAIN: One row per neighborhood per month
 
+INCREMENTAL STRATEGY:
+    - First run: All months
+    - Subsequent runs: delete+insert whole calendar_months:
+        - months in which fct_daily_listing_performance had rows inserted
+          or updated (dbt_updated_at) since this model last ran - new days,
+          re-priced days and late-arrival repairs alike (changed_months.sql)
+        - var repair_months, if set
+        - the month after each of those, whose MoM columns read it
+    - The month before each recomputed month is aggregated as LAG input
+      only and not written back
+    - Rankings and market share are per month, so a month is always
+      recomputed across all neighborhoods
+
 DOWNSTREAM DEPENDENCIES:
     - Used directly for executive dashboards
 ================================================================================
@@ -85,7 +107,7 @@ with neighborhood_monthly as (
         
         -- Review metrics
         avg(review_scores_rating) as avg_review_score,
-        count(review_id) as total_reviews,
+        sum(daily_review_count) as total_reviews,
         
         -- RevPAR
         round(
@@ -95,6 +117,10 @@ with neighborhood_monthly as (
         
     from {{ ref('fct_daily_listing_performance') }}
     where neighborhood is not null
+    {% if is_incremental() %}
+    -- Recomputed months plus the month before each (LAG input)
+      and {{ monthly_refresh_filter('calendar_month', lag_months=1) }}
+    {% endif %}
     group by 
         neighborhood,
         calendar_month,
@@ -167,3 +193,7 @@ select
     current_timestamp() as dbt_updated_at
     
 from with_rankings
+{% if is_incremental() %}
+-- Months only read as LAG input are left as they are
+where {{ monthly_refresh_filter('calendar_month') }}
+{% endif %}
@@ -0,0 +1,72 @@
+{{
+    config(
+        materialized='incremental',
+        schema='mart',
+        unique_key='calendar_date',
+        incremental_strategy='delete+insert',
+        on_schema_change='sync_all_columns',
+        full_refresh=full_refresh_override('fct_neighborhood_price_index'),
+        post_hook="
+            {{ update_watermark('fct_neighborhood_price_index', {
+                'fct_listing_price_index': ref('fct_listing_price_index')
+            }, column='dbt_updated_at') }}
+        "
+    )
+}}
+
+/*
+================================================================================
+FILE: fct_neighborhood_price_index.sql
+LAYER: Marts (Fact - Price Index)
+SCHEMA: mart
+================================================================================
+
+PURPOSE:
+    Daily price index per neighborhood: how many listings were priced and
+    their average / min / max nightly price. Neighborhood-level trend and
+    window questions ("average price in Back Bay, June vs July") read this
+    small table instead of the listing-level index or the daily fact.
+
+LOGIC:
+    1. Aggregate fct_listing_price_index to neighborhood × day
+    2. Price metrics cover priced days only (adjusted_price > 0)
+    3. sum_price / priced_listings allow exact averages over any window:
+         sum(sum_price) / sum(priced_listings)
+
+SOURCE: fct_listing_price_index
+GRAIN: One row per neighborhood per day
+
+INCREMENTAL STRATEGY:
+    - First run: All days
+    - Subsequent runs: delete+insert the calendar_dates with listing rows
+      merged into fct_listing_price_index since the last run
+      (dbt_updated_at watermark), across all neighborhoods
+================================================================================
+*/
+
+select
+    neighborhood,
+    calendar_date,
+    count(distinct listing_id) as total_listings,
+    sum(is_priced) as priced_listings,
+    round(avg(case when is_priced = 1 then adjusted_price end), 2) as avg_price,
+    min(case when is_priced = 1 then adjusted_price end) as min_price,
+    max(case when is_priced = 1 then adjusted_price end) as max_price,
+    sum(case when is_priced = 1 then adjusted_price end) as sum_price,
+
+    -- Audit
+    current_timestamp() as dbt_updated_at
+
+from {{ ref('fct_listing_price_index') }}
+where neighborhood is not null
+{% if is_incremental() %}
+  and calendar_date in (
+      select distinct calendar_date
+      from {{ ref('fct_listing_price_index') }}
+      where dbt_updated_at > {{ get_watermark('fct_neighborhood_price_index', 'fct_listing_price_index') }}
+        and dbt_updated_at <= {{ watermark_upper_bound(ref('fct_listing_price_index'), 'dbt_updated_at') }}
+  )
+{% endif %}
+group by
+    neighborhood,
+    calendar_date
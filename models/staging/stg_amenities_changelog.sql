@@ -1,6 +1,11 @@
 {{
     config(
-        materialized='view'
+        materialized=staging_materialization(),
+        unique_key=['listing_id', 'change_at'],
+        incremental_strategy='merge',
+        on_schema_change='append_new_columns',
+        full_refresh=full_refresh_override('stg_amenities_changelog'),
+        post_hook="{{ staging_watermark('stg_amenities_changelog', 'amenities_changelog') }}"
     )
 }}
 
@@ -20,6 +25,16 @@ LOGIC:
     2. Create presence indicator (1) for each amenity
     3. Dynamically PIVOT amenities into boolean columns
     4. Column names are generated at compile time (no hardcoding)
+    5. Keep _loaded_at so int_listing_amenities_scd can pick up only new rows
+       (no ORDER BY: consumers order within their own window functions)
+
+MATERIALIZATION (var staging_materialization, see staging_incremental.sql):
+    - 'view' (default): re-evaluated by every downstream reference
+    - 'incremental': table; each run flattens and pivots only the raw rows
+      loaded since the last run whose row hash changed, keeping the latest
+      load per (listing_id, change date) as int_listing_amenities_scd does.
+      A new amenity column is NULL on existing rows until the model is
+      full-refreshed (the DAG does this on a schema change)
 
 SOURCE: raw.amenities_changelog
 GRAIN: One row per listing per change date (listing_id + change_at)
@@ -35,34 +50,31 @@ DOWNSTREAM DEPENDENCIES:
 
 {% set amenity_columns = get_amenity_columns() %}
 
-with flattened_amenities as (
+{% set key_columns = ['listing_id', 'change_at', '_loaded_at'] %}
+{% if staging_materialization() == 'incremental' %}
+    {% do key_columns.append('_row_hash') %}
+{% endif %}
+
+with source as (
+    {{ staging_source('stg_amenities_changelog', 'amenities_changelog', {'listing_id': 'listing_id', 'change_at': 'change_at::date'}) }}
+),
+
+flattened_amenities as (
     select 
         listing_id,
         change_at::date as change_at,
+        _loaded_at,
+        {% if staging_materialization() == 'incremental' %}
+        _row_hash,
+        {% endif %}
         trim(f.value::string) as amenity_name,
         1 as present
-    from {{ source('raw', 'amenities_changelog') }},
-    lateral flatten(input => parse_json(amenities)) f 
+    from source,
+    {{ json_array_elements('amenities') }}
 ),
 
 pivoted as (
-    select * 
-    from flattened_amenities
-    pivot (
-        max(present) 
-        for amenity_name in (
-            {% for amenity in amenity_columns %}
-                '{{ amenity }}'{% if not loop.last %},{% endif %}
-            {% endfor %}
-        )
-    )
+    {{ pivot_amenity_flags('flattened_amenities', key_columns, amenity_columns) }}
 )
 
-select
-    listing_id,
-    change_at,
-    {% for amenity in amenity_columns %}
-    coalesce("'{{ amenity }}'"::boolean, false) as "{{ amenity }}"{% if not loop.last %},{% endif %}
-    {% endfor %}
-from pivoted
-order by listing_id, change_at
+select * from pivoted
@@ -0,0 +1,156 @@
+{{
+    config(
+        materialized='incremental',
+        unique_key='amenity_name',
+        incremental_strategy='merge',
+        full_refresh=false
+    )
+}}
+
+/*
+================================================================================
+FILE: stg_amenity_registry.sql
+LAYER: Staging
+SCHEMA: stagging
+================================================================================
+
+PURPOSE:
+    Small, incrementally maintained dictionary of every amenity name seen in
+    raw.amenities_changelog and raw.listings. The get_amenity_columns() and
+    get_listing_amenity_columns() macros read THIS table at compile time
+    instead of flattening all raw amenity JSON on every compile.
+
+LOGIC:
+    1. Flatten amenity JSON only for raw rows whose _loaded_at is newer than
+       the last watermark seen per source (max changelog_loaded_at /
+       listings_loaded_at already in this table)
+    2. Combine both sources into one row per amenity name
+    3. Keep existing amenity_id and first_seen_at; assign the next ids to
+       new names in first-seen order
+    4. MERGE on amenity_name (only amenities present in the batch are touched)
+
+KEY PROPERTIES:
+    - amenity_id is stable across runs (never re-numbered)
+    - full_refresh=false: a rebuild would number the names by the current
+      min(_loaded_at), which moves when raw rows are re-loaded, and the
+      amenity_bitmask_<n> bits stored in dim_listings (never rebuilt) and
+      fct_listing_max_stay_index would decode to other amenities.
+      --full-refresh / full_refresh_models leave it as it is; drop the
+      table only together with every table storing bitmasks
+    - Amenities are never removed, so pivot columns never disappear
+    - Compile-time discovery cost is independent of raw table size
+
+SOURCE: raw.amenities_changelog, raw.listings
+GRAIN: One row per amenity name
+
+DOWNSTREAM DEPENDENCIES:
+    - get_amenity_columns() / get_listing_amenity_columns() (compile time)
+    - Every model that pivots amenities (dependency registered by the macros)
+================================================================================
+*/
+
+with changelog_amenities as (
+    select
+        trim(f.value::string) as amenity_name,
+        min(c._loaded_at) as first_seen_at,
+        max(c._loaded_at) as last_loaded_at
+    from {{ source('raw', 'amenities_changelog') }} c,
+    {{ json_array_elements('c.amenities') }}
+    {% if is_incremental() %}
+    where c._loaded_at > (
+        select coalesce(max(changelog_loaded_at), '1900-01-01'::timestamp) from {{ this }}
+    )
+    {% endif %}
+    group by 1
+),
+
+listing_amenities as (
+    select
+        trim(f.value::string) as amenity_name,
+        min(l._loaded_at) as first_seen_at,
+        max(l._loaded_at) as last_loaded_at
+    from {{ source('raw', 'listings') }} l,
+    {{ json_array_elements('l.amenities') }}
+    {% if is_incremental() %}
+    where l._loaded_at > (
+        select coalesce(max(listings_loaded_at), '1900-01-01'::timestamp) from {{ this }}
+    )
+    {% endif %}
+    group by 1
+),
+
+-- One row per amenity seen in this batch (either source)
+batch as (
+    select
+        coalesce(c.amenity_name, l.amenity_name) as amenity_name,
+        least(
+            coalesce(c.first_seen_at, l.first_seen_at),
+            coalesce(l.first_seen_at, c.first_seen_at)
+        ) as first_seen_at,
+        c.last_loaded_at as changelog_loaded_at,
+        l.last_loaded_at as listings_loaded_at
+    from changelog_amenities c
+    full outer join listing_amenities l
+        on c.amenity_name = l.amenity_name
+    where coalesce(c.amenity_name, l.amenity_name) is not null
+),
+
+{% if is_incremental() %}
+
+existing as (
+    select * from {{ this }}
+),
+
+-- Next ids continue after the current maximum, in first-seen order
+new_ids as (
+    select
+        b.amenity_name,
+        m.max_id + row_number() over (order by b.first_seen_at, b.amenity_name) as amenity_id
+    from batch b
+    cross join (select coalesce(max(amenity_id), 0) as max_id from existing) m
+    left join existing e on b.amenity_name = e.amenity_name
+    where e.amenity_name is null
+),
+
+final as (
+    select
+        coalesce(e.amenity_id, n.amenity_id) as amenity_id,
+        b.amenity_name,
+        coalesce(least(e.first_seen_at, b.first_seen_at), e.first_seen_at, b.first_seen_at) as first_seen_at,
+        coalesce(e.in_changelog, false) or b.changelog_loaded_at is not null as in_changelog,
+        coalesce(e.in_listings, false) or b.listings_loaded_at is not null as in_listings,
+        coalesce(greatest(e.changelog_loaded_at, b.changelog_loaded_at), e.changelog_loaded_at, b.changelog_loaded_at) as changelog_loaded_at,
+        coalesce(greatest(e.listings_loaded_at, b.listings_loaded_at), e.listings_loaded_at, b.listings_loaded_at) as listings_loaded_at
+    from batch b
+    left join existing e on b.amenity_name = e.amenity_name
+    left join new_ids n on b.amenity_name = n.amenity_name
+)
+
+{% else %}
+
+final as (
+    select
+        row_number() over (order by first_seen_at, amenity_name) as amenity_id,
+        amenity_name,
+        first_seen_at,
+        changelog_loaded_at is not null as in_changelog,
+        listings_loaded_at is not null as in_listings,
+        changelog_loaded_at,
+        listings_loaded_at
+    from batch
+)
+
+{% endif %}
+
+select
+    amenity_id,
+    amenity_name,
+    first_seen_at,
+    in_changelog,
+    in_listings,
+    changelog_loaded_at,
+    listings_loaded_at,
+
+    -- Audit
+    current_timestamp() as dbt_updated_at
+from final
@@ -1,6 +1,12 @@
 {{
     config(
-        materialized='view'
+        materialized=staging_materialization(),
+        unique_key=['listing_id', 'calendar_date'],
+        incremental_strategy='pruned_merge',
+        prune_column='calendar_date',
+        on_schema_change='append_new_columns',
+        full_refresh=full_refresh_override('stg_calendar'),
+        post_hook="{{ staging_watermark('stg_calendar', 'calendar') }}"
     )
 }}
 
@@ -20,6 +26,12 @@ LOGIC:
     2. Derive reservation status from reservation_id presence
     3. Add time dimension columns (month, year, day_of_week, weekend flag)
     4. Preserve pricing and stay constraint fields
+    5. Keep _loaded_at for listing-scoped incremental models
+
+MATERIALIZATION (var staging_materialization, see staging_incremental.sql):
+    - 'view' (default): re-evaluated by every downstream reference
+    - 'incremental': table; each run parses only raw rows loaded since the
+      last run whose row hash changed, merged on (listing_id, calendar_date)
 
 SOURCE: raw.calendar
 GRAIN: One row per listing per date (listing_id + calendar_date)
@@ -37,7 +49,7 @@ DOWNSTREAM DEPENDENCIES:
 */
 
 with source as (
-    select * from {{ source('raw', 'calendar') }}
+    {{ staging_source('stg_calendar', 'calendar', {'listing_id': 'listing_id', 'calendar_date': 'date'}) }}
 ),
 
 cleaned as (
@@ -69,7 +81,14 @@ cleaned as (
         date_trunc('month', date) as calendar_month,
         date_trunc('year', date) as calendar_year,
         dayofweek(date) as day_of_week,
-        case when dayofweek(date) in (0, 6) then true else false end as is_weekend
+        case when dayofweek(date) in (0, 6) then true else false end as is_weekend,
+
+        -- Load metadata (drives incremental change detection downstream;
+        -- _row_hash only when staging is incremental)
+        {% if staging_materialization() == 'incremental' %}
+        _row_hash,
+        {% endif %}
+        _loaded_at
 
     from source
 )
@@ -1,6 +1,11 @@
 {{
     config(
-        materialized='view'
+        materialized=staging_materialization(),
+        unique_key='listing_id',
+        incremental_strategy='merge',
+        on_schema_change='append_new_columns',
+        full_refresh=full_refresh_override('stg_listings'),
+        post_hook="{{ staging_watermark('stg_listings', 'listings') }}"
     )
 }}
 
@@ -22,6 +27,14 @@ LOGIC:
     4. Parse bathrooms from text field
     5. Standardize date fields (host_since, first_review, last_review)
     6. Join base listing data with pivoted amenities
+    7. Keep _loaded_at for listing-scoped incremental models
+
+MATERIALIZATION (var staging_materialization, see staging_incremental.sql):
+    - 'view' (default): re-evaluated by every downstream reference
+    - 'incremental': table; each run flattens and pivots only the raw rows
+      loaded since the last run whose row hash changed, merged on
+      listing_id. A new amenity column is NULL on existing rows until the
+      model is full-refreshed (the DAG does this on a schema change)
 
 SOURCE: raw.listings
 GRAIN: One row per listing (listing_id)
@@ -42,7 +55,7 @@ DOWNSTREAM DEPENDENCIES:
 {% set amenity_columns = get_listing_amenity_columns() %}
 
 with source as (
-    select * from {{ source('raw', 'listings') }}
+    {{ staging_source('stg_listings', 'listings', {'listing_id': 'id'}) }}
 ),
 
 flattened_amenities as (
@@ -51,30 +64,12 @@ flattened_amenities as (
         trim(f.value::string) as amenity_name,
         1 as present
     from source,
-    lateral flatten(input => parse_json(amenities)) f 
-),
-
-amenities_pivoted as (
-    select * 
-    from flattened_amenities
-    pivot (
-        max(present) 
-        for amenity_name in (
-            {% for amenity in amenity_columns %}
-                '{{ amenity }}'{% if not loop.last %},{% endif %}
-            {% endfor %}
-        )
-    )
+    {{ json_array_elements('amenities') }}
 ),
 
--- Rename pivot columns to clean names
+-- One boolean column per amenity, named like the amenity
 amenities_cleaned as (
-    select
-        listing_id,
-        {% for amenity in amenity_columns %}
-        coalesce("'{{ amenity }}'"::boolean, false) as "{{ amenity }}"{% if not loop.last %},{% endif %}
-        {% endfor %}
-    from amenities_pivoted
+    {{ pivot_amenity_flags('flattened_amenities', ['listing_id'], amenity_columns) }}
 ),
 
 listings_base as (
@@ -92,33 +87,34 @@ listings_base as (
         beds,
         
         -- Parse bathrooms from text
-        try_to_number(
-            regexp_substr(bathrooms_text, '[0-9]+\\.?[0-9]*'),
-            10, 1
-        ) as bathrooms,
+        {{ try_to_number("regexp_substr(bathrooms_text, '[0-9]+[.]?[0-9]*')", 10, 1) }} as bathrooms,
         bathrooms_text as bathrooms_raw,
         
         -- Host information
         host_id,
         host_name,
         host_location,
-        try_to_date(host_since::varchar) as host_since_date,
+        {{ try_to_date('host_since::varchar') }} as host_since_date,
         host_verifications,
         
         -- Pricing (clean $X,XXX.XX format to numeric)
-        try_to_number(
-            replace(replace(price, '$', ''), ',', ''),
-            10, 2
-        ) as base_price,
+        {{ try_to_number("replace(replace(price, '$', ''), ',', '')", 10, 2) }} as base_price,
         
         -- Review metrics
         number_of_reviews,
-        try_to_date(first_review) as first_review_date,
-        try_to_date(last_review) as last_review_date,
+        {{ try_to_date('first_review') }} as first_review_date,
+        {{ try_to_date('last_review') }} as last_review_date,
         review_scores_rating,
         
         -- Raw amenities
-        amenities as amenities_raw
+        amenities as amenities_raw,
+
+        -- Load metadata (drives incremental change detection downstream;
+        -- _row_hash only when staging is incremental)
+        {% if staging_materialization() == 'incremental' %}
+        _row_hash,
+        {% endif %}
+        _loaded_at
 
     from source
 )
@@ -1,6 +1,11 @@
 {{
     config(
-        materialized='view'
+        materialized=staging_materialization(),
+        unique_key='review_id',
+        incremental_strategy='merge',
+        on_schema_change='append_new_columns',
+        full_refresh=full_refresh_override('stg_reviews'),
+        post_hook="{{ staging_watermark('stg_reviews', 'generated_reviews') }}"
     )
 }}
 
@@ -19,6 +24,13 @@ LOGIC:
     1. Rename columns to standard naming convention
     2. Convert review_date to proper date type
     3. Preserve review_score for aggregation
+    4. Keep _loaded_at for watermark-based incremental models
+
+MATERIALIZATION (var staging_materialization, see staging_incremental.sql):
+    - 'view' (default): re-evaluated by every downstream reference
+    - 'incremental': table; each run parses only raw rows loaded since the
+      last run whose row hash changed, merged on review_id (reviews without
+      an id are appended)
 
 SOURCE: raw.generated_reviews
 GRAIN: One row per review (review_id)
@@ -26,12 +38,13 @@ GRAIN: One row per review (review_id)
 NOTE: Source data contains 2 null review IDs (known data quality issue)
 
 DOWNSTREAM DEPENDENCIES:
-    - fct_daily_listing_performance (joins on listing_id + review_date)
+    - int_listing_daily_reviews (listing × day aggregate joined by
+      fct_daily_listing_performance)
 ================================================================================
 */
 
 with source as (
-    select * from {{ source('raw', 'generated_reviews') }}
+    {{ staging_source('stg_reviews', 'generated_reviews', {'review_id': 'id'}) }}
 ),
 
 cleaned as (
@@ -39,7 +52,14 @@ cleaned as (
         id as review_id,
         listing_id,
         review_date::date as review_date,
-        review_score
+        review_score,
+
+        -- Load metadata (drives incremental change detection downstream;
+        -- _row_hash only when staging is incremental)
+        {% if staging_materialization() == 'incremental' %}
+        _row_hash,
+        {% endif %}
+        _loaded_at
     from source
 )
 
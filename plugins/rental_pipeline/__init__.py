@@ -0,0 +1,33 @@
+"""
+================================================================================
+PACKAGE: rental_pipeline
+================================================================================
+
+PURPOSE:
+    Python helpers used by the Airflow DAG (dags/dbt_rental_property_dag.py).
+    Lives in the Airflow plugins folder so it is importable by the scheduler
+    and the workers without packaging.
+
+MODULES:
+    - dbt_session → In-process dbt runner shared by a whole DAG run
+    - build_state → Saved artifacts of the last build; selects only changed models
+    - manifest_graph → Models, sources and tests from manifest.json (DAG tasks)
+    - test_cache  → Skips tests that passed on unchanged inputs
+    - raw_loader  → Chunked, parallel load of landed files into the raw tables
+    - batch_rebuild → Resumable, batched full refresh of the daily fact
+    - parquet_export → Changed partitions of the marts / analytics as Parquet
+================================================================================
+"""
+
+from rental_pipeline.batch_rebuild import BatchRebuild, BatchRebuildError
+from rental_pipeline.build_state import BuildState
+from rental_pipeline.dbt_session import DbtSession, DbtSessionError
+from rental_pipeline.manifest_graph import load_model_graph
+from rental_pipeline.parquet_export import ParquetExport, ParquetExportError
+from rental_pipeline.raw_loader import RawLoader, RawLoadError
+from rental_pipeline.test_cache import TestCache
+
+__all__ = [
+    'BatchRebuild', 'BatchRebuildError', 'BuildState', 'DbtSession', 'DbtSessionError', 'ParquetExport',
+    'ParquetExportError', 'RawLoadError', 'RawLoader', 'TestCache', 'load_model_graph',
+]
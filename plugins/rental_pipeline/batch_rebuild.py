@@ -0,0 +1,353 @@
+"""
+================================================================================
+FILE: batch_rebuild.py
+================================================================================
+
+PURPOSE:
+    Resumable full refresh of fct_daily_listing_performance. A full refresh
+    used to be one CREATE TABLE AS over the whole calendar history: the
+    longest statement of the pipeline, and a failure or a task timeout
+    threw all of its work away. Here the rebuild is split into date
+    batches that run concurrently, are recorded as they finish, and are
+    swapped in together at the end.
+
+LOGIC:
+    1. Template: the model compiled for a full refresh with
+       var fct_daily_batch = {start: BATCH_START, end: BATCH_END}, i.e.
+       restricted to calendar_date >= start and < end. Each batch replaces
+       the two placeholders with its own dates.
+    2. Plan: the date range of the calendar (source relation) cut into
+       'month' or 'week' (Monday) batches
+    3. Shadow table <target>__rebuild, created empty from the template;
+       `workers` threads INSERT one batch each into it
+    4. State file (JSON, next to the saved build state): the plan, the
+       batches started and the batches finished (rows, seconds). A retry
+       with the same template and grain resumes: finished batches are
+       skipped, a batch that started but did not finish is deleted from the
+       shadow and inserted again. A different template (model or vars
+       changed) or a missing shadow starts over.
+    5. Swap: the shadow replaces the target atomically (Snowflake:
+       ALTER TABLE .. SWAP WITH, DuckDB: renames in one transaction), the
+       old table is dropped and the state file removed
+
+    Watermarks are not touched: the next incremental run of the model
+    merges whatever was loaded since its last watermark, which covers rows
+    loaded while the rebuild ran.
+
+USAGE:
+    rebuild = BatchRebuild(connection, compiled['relation_name'], compiled['compiled_code'],
+                           calendar['relation_name'], '/opt/dbt/state/rebuild_fct.json',
+                           dialect='snowflake', grain='month', workers=4)
+    rebuild.plan()        # [(start, end), ...] still to run
+    summary = rebuild.run()
+================================================================================
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+
+
+log = logging.getLogger(__name__)
+
+# Placeholders for the batch bounds in the compiled model (var fct_daily_batch)
+BATCH_START = '__batch_start__'
+BATCH_END = '__batch_end__'
+
+GRAINS = ('month', 'week')
+
+SHADOW_SUFFIX = '__rebuild'
+OLD_SUFFIX = '__replaced'
+
+
+class BatchRebuildError(Exception):
+    """Raised when batches of a rebuild fail (finished batches stay recorded)."""
+
+
+class BatchRebuild:
+    """
+    Batched full refresh of one date-partitioned model into a shadow table.
+
+    Args:
+        connection: DB-API connection (snowflake.connector or duckdb); one
+                    cursor per worker thread is taken from it
+        target: Relation name of the model (as in manifest.json)
+        batch_sql: The model's compiled SELECT containing BATCH_START / BATCH_END
+        source: Relation whose date_column range is split into batches
+        state_path: JSON file recording the plan and finished batches
+        dialect: 'snowflake' or 'duckdb'
+        grain: 'month' or 'week'
+        workers: Batches inserted concurrently
+        date_column: Date column of source (default 'calendar_date')
+    """
+
+    def __init__(self, connection, target, batch_sql, source, state_path, dialect='snowflake',
+                 grain='month', workers=4, date_column='calendar_date'):
+        if dialect not in ('snowflake', 'duckdb'):
+            raise ValueError(f"Unknown dialect {dialect!r}, expected 'snowflake' or 'duckdb'")
+        if grain not in GRAINS:
+            raise ValueError(f"Unknown grain {grain!r}, expected one of {GRAINS}")
+        if BATCH_START not in batch_sql or BATCH_END not in batch_sql:
+            raise BatchRebuildError(
+                f'{target}: compiled SQL has no batch placeholders (compile with var fct_daily_batch)'
+            )
+        self.connection = connection
+        self.target = target
+        self.batch_sql = batch_sql
+        self.source = source
+        self.state_path = state_path
+        self.dialect = dialect
+        self.grain = grain
+        self.workers = workers
+        self.date_column = date_column
+        self.shadow = _suffixed(target, SHADOW_SUFFIX)
+        self.fingerprint = hashlib.sha256(f'{grain}\n{target}\n{batch_sql}'.encode()).hexdigest()
+        self._state_lock = threading.Lock()
+
+    # -------------------------------------------------------------------------
+    # State
+    # -------------------------------------------------------------------------
+
+    def _load_state(self):
+        """
+        Returns:
+            dict|None: Saved state of this rebuild, None if there is none or
+                       it belongs to another template / grain
+        """
+        if not os.path.isfile(self.state_path):
+            return None
+        with open(self.state_path) as f:
+            state = json.load(f)
+        if state.get('fingerprint') != self.fingerprint:
+            log.info('Discarding rebuild state %s (model or grain changed)', self.state_path)
+            return None
+        return state
+
+    def _save_state(self, state):
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        with open(self.state_path + '.tmp', 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(self.state_path + '.tmp', self.state_path)
+
+    def _record(self, state, key, start, value):
+        """Record a started / finished batch and save (worker threads)."""
+        with self._state_lock:
+            state[key][start] = value
+            self._save_state(state)
+
+    def resumable(self):
+        """
+        Returns:
+            bool: run() would resume a saved rebuild (same template and
+                  grain, shadow table still there) instead of starting over
+        """
+        return self._load_state() is not None and self._exists(self.shadow)
+
+    def plan(self):
+        """
+        Returns:
+            list: (start, end) ISO dates of the batches still to run
+                  (end exclusive), from the saved state or a new plan
+        """
+        state = self._load_state()
+        batches = state['batches'] if state else self._batches()
+        done = state['done'] if state else {}
+        return [tuple(batch) for batch in batches if batch[0] not in done]
+
+    def _batches(self):
+        """
+        Returns:
+            list: [start, end] ISO dates covering the source's date range
+        """
+        cursor = self.connection.cursor()
+        cursor.execute(f'select min({self.date_column}), max({self.date_column}) from {self.source}')
+        first, last = cursor.fetchone()
+        if first is None:
+            return []
+        first, last = _as_date(first), _as_date(last)
+        start = first.replace(day=1) if self.grain == 'month' else first - timedelta(days=first.weekday())
+        batches = []
+        while start <= last:
+            end = _next_month(start) if self.grain == 'month' else start + timedelta(days=7)
+            batches.append([start.isoformat(), end.isoformat()])
+            start = end
+        return batches
+
+    # -------------------------------------------------------------------------
+    # Rebuild
+    # -------------------------------------------------------------------------
+
+    def run(self):
+        """
+        Run (or resume) the rebuild and swap the shadow table in.
+
+        Returns:
+            dict: {'target', 'grain', 'batches', 'resumed', 'rows', 'seconds',
+                   'batch_seconds': {start: seconds}}
+
+        Raises:
+            BatchRebuildError: Some batches failed; the finished ones stay
+                               recorded for the next attempt
+        """
+        started = time.monotonic()
+        state = self._load_state()
+        if state is not None and not self._exists(self.shadow):
+            log.info('Shadow table %s is gone - starting the rebuild over', self.shadow)
+            state = None
+        if state is None:
+            state = {
+                'fingerprint': self.fingerprint,
+                'target': self.target,
+                'shadow': self.shadow,
+                'grain': self.grain,
+                'created_at': datetime.now(timezone.utc).isoformat(),
+                'batches': self._batches(),
+                'started': {},
+                'done': {},
+            }
+            cursor = self.connection.cursor()
+            cursor.execute(f'drop table if exists {self.shadow}')
+            # Same SELECT over an empty range: the model's columns and types, no rows
+            cursor.execute(f'create table {self.shadow} as {self._batch_sql("1900-01-01", "1900-01-01")}')
+            self._save_state(state)
+
+        resumed = len(state['done'])
+        pending = [batch for batch in state['batches'] if batch[0] not in state['done']]
+        log.info('Rebuilding %s in %s %s batches (%s already done)',
+                 self.target, len(state['batches']), self.grain, resumed)
+
+        failed = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='rebuild') as pool:
+            futures = {
+                pool.submit(self._run_batch, state, start, end): start for start, end in pending
+            }
+            for future, start in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    log.error('Batch %s of %s failed: %s', start, self.target, e)
+                    failed[start] = e
+        if failed:
+            raise BatchRebuildError(
+                f'{len(failed)} of {len(pending)} batch(es) of {self.target} failed '
+                f'({", ".join(sorted(failed))}): {next(iter(failed.values()))}'
+            )
+
+        self._swap()
+        os.remove(self.state_path)
+        return {
+            'target': self.target,
+            'grain': self.grain,
+            'batches': len(state['batches']),
+            'resumed': resumed,
+            'rows': sum(batch['rows'] for batch in state['done'].values()),
+            'seconds': round(time.monotonic() - started, 2),
+            'batch_seconds': {start: batch['seconds'] for start, batch in sorted(state['done'].items())},
+        }
+
+    def _batch_sql(self, start, end):
+        """
+        Returns:
+            str: SELECT of one batch, wrapped so it can follow INSERT / CREATE TABLE AS
+        """
+        sql = self.batch_sql.replace(BATCH_START, start).replace(BATCH_END, end)
+        return f'select * from (\n{sql}\n) as batch'
+
+    def _run_batch(self, state, start, end):
+        """Insert one batch into the shadow table (worker thread)."""
+        batch_started = time.monotonic()
+        retry = start in state['started']
+        self._record(state, 'started', start, datetime.now(timezone.utc).isoformat())
+        insert = f'insert into {self.shadow} {self._batch_sql(start, end)}'
+        cursor = self.connection.cursor()
+        try:
+            if retry:
+                # Rows of an earlier, interrupted attempt. The batch stays "started"
+                # until its INSERT succeeds, so delete + insert is safe to repeat.
+                cursor.execute(f"""
+                    delete from {self.shadow}
+                    where {self.date_column} >= '{start}' and {self.date_column} < '{end}'
+                """)
+            cursor.execute(insert)
+            rows = cursor.fetchone()[0]
+        finally:
+            cursor.close()
+        seconds = round(time.monotonic() - batch_started, 2)
+        self._record(state, 'done', start, {'end': end, 'rows': rows, 'seconds': seconds})
+        log.info('Batch %s → %s of %s: %s rows in %ss', start, end, self.target, rows, seconds)
+
+    def _swap(self):
+        """Replace the target with the shadow table, atomically."""
+        cursor = self.connection.cursor()
+        if not self._exists(self.target):
+            cursor.execute(f'alter table {self.shadow} rename to {_identifier(self.target)}'
+                           if self.dialect == 'duckdb' else
+                           f'alter table {self.shadow} rename to {self.target}')
+        elif self.dialect == 'snowflake':
+            cursor.execute(f'alter table {self.target} swap with {self.shadow}')
+            cursor.execute(f'drop table {self.shadow}')
+        else:
+            old = _suffixed(self.target, OLD_SUFFIX)
+            cursor.execute('begin')
+            try:
+                cursor.execute(f'drop table if exists {old}')
+                cursor.execute(f'alter table {self.target} rename to {_identifier(old)}')
+                cursor.execute(f'alter table {self.shadow} rename to {_identifier(self.target)}')
+                cursor.execute(f'drop table {old}')
+                cursor.execute('commit')
+            except Exception:
+                cursor.execute('rollback')
+                raise
+
+    def _exists(self, relation):
+        """
+        Returns:
+            bool: True if the table exists
+        """
+        database, schema, name = (_unquote(part) for part in relation.split('.'))
+        cursor = self.connection.cursor()
+        cursor.execute(f"""
+            select count(*)
+            from information_schema.tables
+            where lower(table_catalog) = '{database.lower()}'
+              and lower(table_schema) = '{schema.lower()}'
+              and lower(table_name) = '{name.lower()}'
+        """)
+        return cursor.fetchone()[0] > 0
+
+
+def _unquote(part):
+    return part[1:-1] if part.startswith('"') and part.endswith('"') else part
+
+
+def _identifier(relation):
+    """
+    Returns:
+        str: Table name of a database.schema.table relation, quoted as given
+    """
+    return relation.split('.')[-1]
+
+
+def _suffixed(relation, suffix):
+    """
+    Returns:
+        str: The relation with suffix appended to its table name
+    """
+    *qualifiers, name = relation.split('.')
+    name = f'"{_unquote(name)}{suffix}"' if name.startswith('"') else f'{name}{suffix}'
+    return '.'.join(qualifiers + [name])
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def _next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
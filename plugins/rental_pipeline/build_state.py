@@ -0,0 +1,254 @@
+"""
+================================================================================
+FILE: build_state.py
+================================================================================
+
+PURPOSE:
+    Build only what changed since the last successful build. dbt's state
+    selectors compare this run with the artifacts the previous build left
+    behind:
+
+        state:modified+         → models whose SQL / config / macros changed,
+                                  and everything downstream
+        source_status:fresher+  → models reading a source loaded since the
+                                  previous build, and everything downstream
+
+    Everything else (e.g. dim_date, stg_reviews and the problem_* models on
+    a day when only raw.calendar moved) is skipped, with a reason.
+
+LOGIC:
+    1. write_sources(): dbt's sources.json artifact for THIS run, built from
+       the pre-flight freshness result (no separate `dbt source freshness`)
+    2. selection(): the selectors above, plus models that must run anyway:
+       full refreshes (and downstream) and models tagged `current_date`
+       (output depends on the day, e.g. dim_date.days_ago)
+    3. skipped(): every model of the manifest the build did not run, with
+       the reason (code unchanged + upstream sources not fresher)
+    4. save(): after a successful build, copy target/manifest.json and
+       target/sources.json into the state directory for the next run
+
+    Without saved state (first run, state directory wiped) selection()
+    returns None and the whole project is built.
+
+USAGE:
+    state = BuildState('/opt/dbt', '/opt/dbt/state')
+    state.write_sources(preflight['freshness'])
+    results = session.build(select=state.selection(full_refresh_models),
+                            state=state.state_dir if state.has_state else None)
+    skipped = state.skipped(results)
+    state.save()
+================================================================================
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+
+
+# Models whose output changes with the date alone, rebuilt every run
+CURRENT_DATE_TAG = 'current_date'
+
+SOURCES_SCHEMA = 'https://schemas.getdbt.com/dbt/sources/v3.json'
+STATE_FILES = ('manifest.json', 'sources.json')
+
+
+class BuildState:
+    """
+    Artifacts of the previous successful build and selection against them.
+
+    Args:
+        project_dir: Path to the dbt project
+        state_dir: Folder holding the previous build's manifest.json / sources.json
+        target_path: dbt target folder, relative to project_dir (default 'target')
+    """
+
+    def __init__(self, project_dir, state_dir, target_path='target'):
+        self.project_dir = project_dir
+        self.state_dir = state_dir
+        self.target_dir = os.path.join(project_dir, target_path)
+
+    @property
+    def has_state(self):
+        """True when a previous build saved both artifacts."""
+        return all(os.path.isfile(os.path.join(self.state_dir, name)) for name in STATE_FILES)
+
+    # -------------------------------------------------------------------------
+    # Before the build
+    # -------------------------------------------------------------------------
+
+    def write_sources(self, freshness):
+        """
+        Write target/sources.json from the pre-flight freshness result, in
+        the format `dbt source freshness` writes it.
+
+        Args:
+            freshness: Pre-flight freshness dict (passed / warned / errored
+                       entries with name = source unique_id, max_loaded_at, age_s)
+
+        Returns:
+            str: Path of the written artifact
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        results = []
+        for entry in freshness['passed'] + freshness['warned'] + freshness['errored']:
+            if entry['max_loaded_at'] is None:
+                # Empty or missing source: runtime error, never "fresher"
+                results.append({
+                    'unique_id': entry['name'],
+                    'error': entry.get('error', 'no rows'),
+                    'status': 'runtime error',
+                })
+                continue
+            results.append({
+                'unique_id': entry['name'],
+                'max_loaded_at': datetime.fromisoformat(entry['max_loaded_at']).isoformat(),
+                'snapshotted_at': now,
+                'max_loaded_at_time_ago_in_s': float(entry['age_s']),
+                'status': entry['status'],
+                'criteria': {'warn_after': None, 'error_after': None, 'filter': None},
+                'adapter_response': {},
+                'timing': [],
+                'thread_id': 'preflight',
+                'execution_time': 0.0,
+            })
+
+        artifact = {
+            'metadata': {'dbt_schema_version': SOURCES_SCHEMA, 'generated_at': now},
+            'results': results,
+            'elapsed_time': 0.0,
+        }
+        path = os.path.join(self.target_dir, 'sources.json')
+        os.makedirs(self.target_dir, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(artifact, f, indent=2)
+        return path
+
+    def selection(self, full_refresh_models=()):
+        """
+        dbt selectors for this build.
+
+        Args:
+            full_refresh_models: Models full-refreshed this run (built with
+                                 their downstream even when unchanged)
+
+        Returns:
+            list|None: Selectors, or None (= whole project) without saved state
+        """
+        if not self.has_state:
+            return None
+        return (
+            ['state:modified+', 'source_status:fresher+', f'tag:{CURRENT_DATE_TAG}']
+            + [f'{model}+' for model in full_refresh_models]
+        )
+
+    def manifest(self):
+        """
+        Returns:
+            dict: This run's target/manifest.json
+        """
+        return _read_json(os.path.join(self.target_dir, 'manifest.json'))
+
+    def loaded_at(self, previous=False):
+        """
+        Returns:
+            dict: {source unique_id: max_loaded_at} of this run, or of the
+                  previous build with previous=True (empty if missing)
+        """
+        folder = self.state_dir if previous else self.target_dir
+        return _source_times(os.path.join(folder, 'sources.json'))
+
+    # -------------------------------------------------------------------------
+    # After the build
+    # -------------------------------------------------------------------------
+
+    def skipped(self, results):
+        """
+        Models of the current manifest that the build did not run, and why.
+
+        Args:
+            results: DbtSession.run() / build() results ({node name: result})
+
+        Returns:
+            dict: {model_name: reason}
+        """
+        manifest = self.manifest()
+        current = self.loaded_at()
+        previous = self.loaded_at(previous=True)
+
+        nodes = {**manifest['nodes'], **manifest['sources']}
+        reasons = {}
+        for unique_id, node in manifest['nodes'].items():
+            if node['resource_type'] != 'model' or node['name'] in results:
+                continue
+            sources = sorted(_upstream_sources(unique_id, nodes))
+            if not sources:
+                reasons[node['name']] = 'code unchanged, no source inputs'
+                continue
+            states = []
+            for source_id in sources:
+                source = nodes[source_id]
+                label = f"{source['source_name']}.{source['name']}"
+                loaded = current.get(source_id)
+                if loaded is None:
+                    states.append(f'{label} (no freshness result)')
+                elif loaded == previous.get(source_id):
+                    states.append(f'{label} (not loaded since {loaded})')
+                else:
+                    states.append(f'{label} (loaded {loaded})')
+            reasons[node['name']] = 'code unchanged, sources not fresher: ' + ', '.join(states)
+        return reasons
+
+    def save(self):
+        """
+        Keep this build's manifest.json and sources.json as the state the
+        next build compares against (replaced only after both are copied).
+
+        Returns:
+            str: The state directory
+        """
+        os.makedirs(self.state_dir, exist_ok=True)
+        for name in STATE_FILES:
+            staged = os.path.join(self.state_dir, name + '.tmp')
+            shutil.copyfile(os.path.join(self.target_dir, name), staged)
+        for name in STATE_FILES:
+            os.replace(os.path.join(self.state_dir, name + '.tmp'), os.path.join(self.state_dir, name))
+        return self.state_dir
+
+
+def _read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _source_times(path):
+    """
+    Returns:
+        dict: {source unique_id: max_loaded_at} from a sources.json (empty if missing)
+    """
+    if not os.path.isfile(path):
+        return {}
+    return {
+        result['unique_id']: result['max_loaded_at']
+        for result in _read_json(path)['results']
+        if 'max_loaded_at' in result
+    }
+
+
+def _upstream_sources(unique_id, nodes):
+    """
+    Returns:
+        set: unique_ids of every source the node reads, directly or through models
+    """
+    sources, seen, pending = set(), set(), [unique_id]
+    while pending:
+        node = nodes.get(pending.pop())
+        for parent in (node or {}).get('depends_on', {}).get('nodes', []):
+            if parent in seen:
+                continue
+            seen.add(parent)
+            if parent.startswith('source.'):
+                sources.add(parent)
+            else:
+                pending.append(parent)
+    return sources
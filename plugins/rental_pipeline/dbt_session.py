@@ -0,0 +1,244 @@
+"""
+================================================================================
+FILE: dbt_session.py
+================================================================================
+
+PURPOSE:
+    Run dbt in-process through the programmatic dbtRunner API instead of
+    shelling out to a fresh `dbt` CLI process per model.
+
+WHY:
+    Every `dbt run --select <model>` subprocess pays the same fixed cost:
+    importing dbt, loading the adapter, parsing the whole project and
+    re-running compile-time queries such as get_amenity_columns(). On this
+    project that fixed cost dominates the wall-clock time of a daily run.
+
+LOGIC:
+    1. Parse the project ONCE per session and keep the Manifest in memory
+    2. Hand the cached Manifest to every dbtRunner invocation (no re-parse)
+    3. Build many models in a single invocation so dbt's own graph queue
+       runs independent models concurrently on `threads` worker threads,
+       all sharing the adapter's connection pool for that invocation
+    4. Return per-model results as plain dicts (XCom/JSON friendly)
+
+NOTE:
+    Vars are fixed per session because dbt evaluates `config()` blocks
+    (e.g. full_refresh_override) at parse time. Create a new session when
+    the vars change.
+
+USAGE:
+    session = DbtSession('/opt/dbt', threads=4,
+                         vars={'full_refresh_models': ['fct_daily_listing_performance']})
+    results = session.run()
+    failed = [r for r in results.values() if r['status'] == 'error']
+================================================================================
+"""
+
+import json
+import logging
+import os
+import threading
+
+
+log = logging.getLogger(__name__)
+
+
+class DbtSessionError(Exception):
+    """Raised when a dbt invocation fails before producing node results."""
+
+
+class DbtSession:
+    """
+    A long-lived dbt runner bound to one project, target and set of vars.
+
+    Args:
+        project_dir: Path to the dbt project (folder with dbt_project.yml)
+        profiles_dir: Folder containing profiles.yml (default: $DBT_PROFILES_DIR)
+        target: Profile target to use (default: profile's default target)
+        threads: Worker threads per invocation (default: profile setting)
+        vars: dbt vars applied to parsing and every invocation
+    """
+
+    def __init__(self, project_dir, profiles_dir=None, target=None, threads=None, vars=None):
+        self.project_dir = project_dir
+        self.profiles_dir = profiles_dir or os.environ.get('DBT_PROFILES_DIR', project_dir)
+        self.target = target
+        self.threads = threads
+        self.vars = vars or {}
+        self._manifest = None
+        # dbtRunner is not re-entrant: invocations share global adapter state
+        self._lock = threading.Lock()
+
+    # -------------------------------------------------------------------------
+    # Invocation plumbing
+    # -------------------------------------------------------------------------
+
+    def _common_args(self):
+        args = ['--project-dir', self.project_dir, '--profiles-dir', self.profiles_dir]
+        if self.target:
+            args += ['--target', self.target]
+        if self.vars:
+            args += ['--vars', json.dumps(self.vars)]
+        return args
+
+    def parse(self):
+        """
+        Parse the project once and cache the Manifest.
+
+        Returns:
+            Manifest: The parsed dbt manifest
+        """
+        if self._manifest is None:
+            from dbt.cli.main import dbtRunner
+
+            with self._lock:
+                result = dbtRunner().invoke(['parse'] + self._common_args())
+            if not result.success:
+                raise DbtSessionError(f'dbt parse failed: {result.exception}')
+            self._manifest = result.result
+        return self._manifest
+
+    def invoke(self, command, args=None, callbacks=None):
+        """
+        Run any dbt command against the cached manifest.
+
+        Args:
+            command: dbt sub-command, e.g. 'run', 'test', 'run-operation'
+            args: Extra CLI arguments for the sub-command
+            callbacks: Optional dbt event callbacks
+
+        Returns:
+            dbtRunnerResult: Raw result from dbtRunner
+        """
+        from dbt.cli.main import dbtRunner
+
+        manifest = self.parse()
+        cli_args = [command] + list(args or []) + self._common_args()
+        log.info('dbt %s', ' '.join(cli_args))
+        with self._lock:
+            return dbtRunner(manifest=manifest, callbacks=callbacks).invoke(cli_args)
+
+    # -------------------------------------------------------------------------
+    # High-level commands
+    # -------------------------------------------------------------------------
+
+    def _node_args(self, select, exclude, full_refresh, state):
+        args = []
+        if select:
+            args += ['--select'] + list(select)
+        if exclude:
+            args += ['--exclude'] + list(exclude)
+        if full_refresh:
+            args.append('--full-refresh')
+        if state:
+            args += ['--state', state]
+        if self.threads:
+            args += ['--threads', str(self.threads)]
+        return args
+
+    def run(self, select=None, exclude=None, full_refresh=False, state=None):
+        """
+        Build models in a single invocation.
+
+        Args:
+            select: List of dbt selectors (default: whole project)
+            exclude: List of dbt selectors to exclude
+            full_refresh: Pass --full-refresh to every selected model
+            state: Folder with a previous build's artifacts, for state:modified /
+                   source_status:fresher selectors (see build_state.py)
+
+        Returns:
+            dict: {model_name: node result dict} - see node_result()
+        """
+        result = self.invoke('run', self._node_args(select, exclude, full_refresh, state))
+        if result.exception is not None or result.result is None:
+            raise DbtSessionError(f'dbt run failed: {result.exception}')
+
+        return {r.node.name: node_result(r) for r in result.result.results}
+
+    def build(self, select=None, exclude=None, full_refresh=False, state=None):
+        """
+        Build models AND run their tests in a single invocation (`dbt build`).
+
+        Each model's tests run as soon as the model is built, concurrently
+        with other branches of the graph; a failing test (severity error)
+        skips everything downstream of the model or source it checks.
+
+        Args:
+            Same as run()
+
+        Returns:
+            dict: {node name: node result dict} for models and tests - see node_result()
+        """
+        result = self.invoke('build', self._node_args(select, exclude, full_refresh, state))
+        if result.exception is not None or result.result is None:
+            raise DbtSessionError(f'dbt build failed: {result.exception}')
+
+        return {r.node.name: node_result(r) for r in result.result.results}
+
+    def compile(self, select):
+        """
+        Compile models without running them.
+
+        Args:
+            select: List of dbt selectors
+
+        Returns:
+            dict: {model_name: {'relation_name', 'compiled_code'}}
+        """
+        result = self.invoke('compile', ['--select'] + list(select))
+        if result.exception is not None or result.result is None:
+            raise DbtSessionError(f'dbt compile failed: {result.exception}')
+
+        return {
+            r.node.name: {'relation_name': r.node.relation_name, 'compiled_code': r.node.compiled_code}
+            for r in result.result.results
+        }
+
+    def run_operation(self, macro, macro_args=None):
+        """
+        Execute a macro and capture the lines it logs.
+
+        Args:
+            macro: Macro name
+            macro_args: Dict of macro arguments
+
+        Returns:
+            list: Messages emitted with {{ log(...) }} by the macro
+        """
+        messages = []
+
+        def _capture(event):
+            if event.info.name == 'JinjaLogInfo':
+                messages.append(event.data.msg)
+
+        args = [macro]
+        if macro_args:
+            args += ['--args', json.dumps(macro_args)]
+
+        result = self.invoke('run-operation', args, callbacks=[_capture])
+        if not result.success:
+            raise DbtSessionError(f'dbt run-operation {macro} failed: {result.exception}')
+        return messages
+
+
+def node_result(result):
+    """
+    Convert a dbt RunResult into a JSON-serialisable dict.
+
+    Returns:
+        dict: unique_id, name, resource_type, status, execution_time, message,
+              failures (tests), adapter_response
+    """
+    status = result.status
+    resource_type = result.node.resource_type
+    return {
+        'unique_id': result.node.unique_id,
+        'name': result.node.name,
+        'resource_type': getattr(resource_type, 'value', str(resource_type)),
+        'status': getattr(status, 'value', str(status)),
+        'execution_time': round(result.execution_time or 0.0, 3),
+        'message': result.message,
+        'failures': result.failures,
+        'adapter_response': dict(result.adapter_response or {}),
+    }
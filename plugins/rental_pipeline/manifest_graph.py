@@ -0,0 +1,98 @@
+"""
+================================================================================
+FILE: manifest_graph.py
+================================================================================
+
+PURPOSE:
+    Read the model / source / test graph from dbt's manifest.json so the
+    DAG's per-model tasks are generated from the project itself instead of
+    a hand-maintained model list. A new model or test shows up in the DAG
+    after the next parse, wired to its real parents.
+
+LOGIC:
+    1. Models → Airflow task group from the models/ sub-folder
+       (staging, intermediate, marts, analyses → analytics)
+    2. Parents: the models and sources each model reads
+    3. Tests: each test belongs to the model it is attached to (the model
+       whose yml declares it); tests without one go to every model they
+       read, source tests to their source
+
+USAGE:
+    graph = load_model_graph('/opt/dbt/target/manifest.json')
+    for layer, models in graph['layers'].items():
+        for name, model in models.items():
+            model['parents'], model['sources'], model['tests']
+    graph['sources']['raw.calendar']['tests']
+================================================================================
+"""
+
+import json
+
+
+# models/<folder> → Airflow task group
+LAYER_GROUPS = {
+    'staging': 'staging',
+    'intermediate': 'intermediate',
+    'marts': 'marts',
+    'analyses': 'analytics',
+}
+
+
+def load_model_graph(manifest_path):
+    """
+    Models, sources and their tests from a manifest.json.
+
+    Args:
+        manifest_path: Path to dbt's manifest.json
+
+    Returns:
+        dict: {
+            'layers': {group: {model_name: {'unique_id', 'relation_name', 'parents', 'sources', 'tests'}}},
+            'sources': {'<source>.<table>': {'unique_id', 'tests'}},
+        }
+        Groups follow LAYER_GROUPS order; names within a group are sorted.
+        parents / sources / tests are sorted lists of names.
+    """
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    models, sources = {}, {}
+    for unique_id, node in manifest['sources'].items():
+        sources[unique_id] = {'name': f"{node['source_name']}.{node['name']}", 'unique_id': unique_id, 'tests': []}
+    for unique_id, node in manifest['nodes'].items():
+        if node['resource_type'] == 'model':
+            folder = node['fqn'][1] if len(node['fqn']) > 2 else None
+            models[unique_id] = {
+                'name': node['name'],
+                'unique_id': unique_id,
+                'relation_name': node.get('relation_name'),
+                'group': LAYER_GROUPS.get(folder, 'analytics'),
+                'parents': [],
+                'sources': [],
+                'tests': [],
+            }
+
+    for unique_id, node in manifest['nodes'].items():
+        depends_on = node['depends_on']['nodes']
+        if unique_id in models:
+            model = models[unique_id]
+            model['parents'] = sorted(models[p]['name'] for p in depends_on if p in models)
+            model['sources'] = sorted(sources[p]['name'] for p in depends_on if p in sources)
+        elif node['resource_type'] == 'test':
+            attached = node.get('attached_node')
+            owners = [attached] if attached in models else [p for p in depends_on if p in models]
+            if not owners:
+                owners = [p for p in depends_on if p in sources]
+            for owner in owners:
+                (models.get(owner) or sources[owner])['tests'].append(node['name'])
+
+    layers = {group: {} for group in dict.fromkeys(LAYER_GROUPS.values())}
+    for model in sorted(models.values(), key=lambda m: m['name']):
+        model['tests'].sort()
+        layers[model.pop('group')][model.pop('name')] = model
+    source_tests = {}
+    for source in sorted(sources.values(), key=lambda s: s['name']):
+        source['tests'].sort()
+        source_tests[source.pop('name')] = source
+
+    return {'layers': layers, 'sources': source_tests}
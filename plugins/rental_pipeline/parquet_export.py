@@ -0,0 +1,390 @@
+"""
+================================================================================
+FILE: parquet_export.py
+================================================================================
+
+PURPOSE:
+    Export the mart and analytics tables as partitioned Parquet files at
+    the end of the DAG. BI and data-science users scan the compressed
+    columnar files locally instead of querying the warehouse, which
+    competes with the pipeline for compute.
+
+LOGIC:
+    1. Fingerprint: ONE query per table returns, per partition (values of
+       its partition_by columns), count(*) | hash_agg(<columns>) - the
+       same content hash as the result_cache materialization, minus
+       ignore_columns (default dbt_updated_at, so a month rewritten with
+       identical values is unchanged)
+    2. Diff against the manifest of the previous export:
+         - new or changed fingerprint, or its file is missing → write
+         - partition gone from the table → delete
+         - otherwise the file is kept as it is
+    3. Write: `workers` threads each SELECT one partition (fetched as
+       Arrow) and write it to
+           <export_dir>/<model>/<column>=<value>/part-<fingerprint>.parquet
+       (Hive layout; the partition columns live in the path, not in the
+       file; tables without partition_by: <export_dir>/<model>/part-<fp>)
+    4. Manifest: <export_dir>/manifest.json lists every current file
+       (table, partition values, rows, bytes, fingerprint), replaced
+       atomically. The files it no longer lists are deleted afterwards, so
+       a consumer that reads through the manifest never sees a missing or
+       half-written file.
+
+    A failed partition keeps its previous file and manifest entry; the
+    partitions that were written are recorded, so the next export only
+    retries the rest.
+
+USAGE:
+    export = ParquetExport(connection, '/opt/dbt/exports', {
+        'fct_monthly_listing_performance': {
+            'relation': 'RENTAL_PROPERTY.MART.FCT_MONTHLY_LISTING_PERFORMANCE',
+            'partition_by': ['calendar_month'],
+        },
+    }, dialect='snowflake', workers=4)
+    export.plan()         # {model: {'write': [...], 'delete': [...], 'unchanged': n}}
+    summary = export.run()
+================================================================================
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+
+log = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+
+# Hive's directory name for a NULL partition value
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+
+class ParquetExportError(Exception):
+    """Raised when partitions of an export fail (written ones stay recorded)."""
+
+
+class ParquetExport:
+    """
+    Incremental Parquet export of warehouse tables, one file per partition.
+
+    Args:
+        connection: DB-API connection (snowflake.connector or duckdb); one
+                    cursor per worker thread is taken from it
+        export_dir: Folder receiving <model>/ folders and manifest.json
+        tables: {model: {'relation': relation name, 'partition_by': [columns]}}
+        dialect: 'snowflake' or 'duckdb'
+        workers: Partitions written concurrently
+        ignore_columns: Columns left out of the partition fingerprint
+        compression: Parquet codec
+    """
+
+    def __init__(self, connection, export_dir, tables, dialect='snowflake', workers=4,
+                 ignore_columns=('dbt_updated_at',), compression='zstd'):
+        if dialect not in ('snowflake', 'duckdb'):
+            raise ValueError(f"Unknown dialect {dialect!r}, expected 'snowflake' or 'duckdb'")
+        self.connection = connection
+        self.export_dir = export_dir
+        self.tables = tables
+        self.dialect = dialect
+        self.workers = workers
+        self.ignore_columns = {column.lower() for column in ignore_columns}
+        self.compression = compression
+        self.manifest_path = os.path.join(export_dir, MANIFEST_NAME)
+
+    # -------------------------------------------------------------------------
+    # Manifest
+    # -------------------------------------------------------------------------
+
+    def manifest(self):
+        """
+        Returns:
+            dict: {'exported_at', 'tables': {model: {'relation', 'partition_by',
+                   'columns', 'files': [file entry, ...]}}} of the last export
+        """
+        if not os.path.isfile(self.manifest_path):
+            return {'exported_at': None, 'tables': {}}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest):
+        os.makedirs(self.export_dir, exist_ok=True)
+        with open(self.manifest_path + '.tmp', 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(self.manifest_path + '.tmp', self.manifest_path)
+
+    # -------------------------------------------------------------------------
+    # Plan
+    # -------------------------------------------------------------------------
+
+    def plan(self):
+        """
+        Returns:
+            dict: {model: {'write': [partition values, ...],
+                           'delete': [partition values, ...], 'unchanged': n}}
+        """
+        manifest = self.manifest()
+        plan = {}
+        for model, spec in self.tables.items():
+            diff = self._diff(model, spec, manifest['tables'].get(model))
+            plan[model] = {
+                'write': [list(key) for key in diff['write']],
+                'delete': [entry['partition'] for entry in diff['delete']],
+                'unchanged': len(diff['keep']),
+            }
+        return plan
+
+    def _diff(self, model, spec, previous):
+        """
+        Compare the table's partitions with its entry in the last manifest.
+
+        Returns:
+            dict: {'columns', 'partitions': {key: {'rows', 'fingerprint'}},
+                   'write': [key, ...], 'keep': [entry, ...], 'delete': [entry, ...]}
+        """
+        columns = self._columns(spec['relation'])
+        partitions = self._fingerprints(spec['relation'], spec['partition_by'], columns)
+        stored = {}
+        for entry in (previous or {}).get('files', []):
+            stored[_key(entry['partition'], spec['partition_by'])] = entry
+
+        write, keep = [], []
+        for key, state in sorted(partitions.items(), key=lambda item: json.dumps(item[0])):
+            entry = stored.get(key)
+            if (
+                entry is None
+                or entry['fingerprint'] != state['fingerprint']
+                or not os.path.isfile(os.path.join(self.export_dir, entry['path']))
+            ):
+                write.append(key)
+            else:
+                keep.append(entry)
+        delete = [entry for key, entry in stored.items() if key not in partitions]
+        return {'columns': columns, 'partitions': partitions, 'write': write, 'keep': keep, 'delete': delete}
+
+    def _columns(self, relation):
+        """
+        Returns:
+            list: Column names of the relation, as the warehouse spells them
+        """
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(f'select * from {relation} limit 0')
+            return [column[0] for column in cursor.description]
+        finally:
+            cursor.close()
+
+    def _fingerprints(self, relation, partition_by, columns):
+        """
+        Returns:
+            dict: {(partition value as text | None, ...): {'rows', 'fingerprint'}}
+        """
+        names = {column.lower(): column for column in columns}
+        missing = [column for column in partition_by if column.lower() not in names]
+        if missing:
+            raise ParquetExportError(f'{relation} has no partition column(s) {", ".join(missing)}')
+        keys = [_quote(names[column.lower()]) for column in partition_by]
+        hashed = [_quote(column) for column in columns if column.lower() not in self.ignore_columns]
+        content_hash = (
+            f"sum(hash({', '.join(hashed)}))" if self.dialect == 'duckdb'
+            else f"hash_agg({', '.join(hashed)})"
+        )
+        select = [f'cast({key} as varchar)' for key in keys]
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(f"""
+                select {', '.join(select + ['count(*)', f'cast({content_hash} as varchar)'])}
+                from {relation}
+                {'group by ' + ', '.join(keys) if keys else ''}
+            """)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        # Column names take part in the fingerprint: a new column rewrites every partition
+        schema = ','.join(columns)
+        partitions = {}
+        for row in rows:
+            key, count, digest = tuple(row[:len(keys)]), row[len(keys)], row[len(keys) + 1]
+            if count == 0:
+                continue    # count(*) without group by on an empty table
+            partitions[key] = {
+                'rows': count,
+                'fingerprint': hashlib.md5(f'{schema}|{count}|{digest}'.encode()).hexdigest(),
+            }
+        return partitions
+
+    # -------------------------------------------------------------------------
+    # Export
+    # -------------------------------------------------------------------------
+
+    def run(self):
+        """
+        Write the changed partitions of every table and replace the manifest.
+
+        Returns:
+            dict: {'exported_at', 'seconds', 'manifest',
+                   'tables': {model: {'written', 'deleted', 'unchanged', 'rows_written',
+                                      'files', 'bytes'}}}
+
+        Raises:
+            ParquetExportError: Some partitions failed; the manifest keeps
+                                their previous files
+        """
+        started = time.monotonic()
+        exported_at = datetime.now(timezone.utc).isoformat()
+        manifest = self.manifest()
+        previous_paths = {
+            entry['path'] for table in manifest['tables'].values() for entry in table['files']
+        }
+
+        tables, summary, failed = {}, {}, {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='parquet-export') as pool:
+            for model, spec in self.tables.items():
+                previous = manifest['tables'].get(model)
+                diff = self._diff(model, spec, previous)
+                log.info('%s: %s partition(s) to write, %s to delete, %s unchanged',
+                         model, len(diff['write']), len(diff['delete']), len(diff['keep']))
+                futures = {
+                    pool.submit(self._write_partition, model, spec, diff['columns'], key,
+                                diff['partitions'][key], exported_at): key
+                    for key in diff['write']
+                }
+                files = list(diff['keep'])
+                written = 0
+                stored = {
+                    _key(entry['partition'], spec['partition_by']): entry
+                    for entry in (previous or {}).get('files', [])
+                }
+                for future, key in futures.items():
+                    try:
+                        entry = future.result()
+                    except Exception as e:
+                        log.error('Partition %s of %s failed: %s', list(key), model, e)
+                        failed[f'{model}{list(key)}'] = e
+                        if key in stored:
+                            files.append(stored[key])
+                        continue
+                    if entry is not None:
+                        files.append(entry)
+                        written += 1
+                files.sort(key=lambda entry: entry['path'])
+                tables[model] = {
+                    'relation': spec['relation'],
+                    'partition_by': list(spec['partition_by']),
+                    'columns': diff['columns'],
+                    'files': files,
+                }
+                summary[model] = {
+                    'written': written,
+                    'deleted': len(diff['delete']),
+                    'unchanged': len(diff['keep']),
+                    'rows_written': sum(
+                        entry['rows'] for entry in files if entry['exported_at'] == exported_at
+                    ),
+                    'files': len(files),
+                    'bytes': sum(entry['bytes'] for entry in files),
+                }
+
+        self._save_manifest({'exported_at': exported_at, 'tables': tables})
+
+        # Only now that the manifest no longer lists them
+        current_paths = {entry['path'] for table in tables.values() for entry in table['files']}
+        for path in sorted(previous_paths - current_paths):
+            self._remove(path)
+        if failed:
+            raise ParquetExportError(
+                f'{len(failed)} partition(s) failed ({", ".join(sorted(failed))}): '
+                f'{next(iter(failed.values()))}'
+            )
+        return {
+            'exported_at': exported_at,
+            'seconds': round(time.monotonic() - started, 2),
+            'manifest': self.manifest_path,
+            'tables': summary,
+        }
+
+    def _write_partition(self, model, spec, columns, key, state, exported_at):
+        """
+        Fetch one partition and write it as a Parquet file (worker thread).
+
+        Returns:
+            dict|None: Manifest file entry, None if the partition is empty by now
+        """
+        import pyarrow.parquet as pq
+
+        partition_started = time.monotonic()
+        names = {column.lower(): column for column in columns}
+        conditions = [
+            f'{_quote(names[column.lower()])} is null' if value is None
+            else f"{_quote(names[column.lower()])} = '{_escape(value)}'"
+            for column, value in zip(spec['partition_by'], key)
+        ]
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(
+                f'select * from {spec["relation"]}'
+                + (f' where {" and ".join(conditions)}' if conditions else '')
+            )
+            table = cursor.fetch_arrow_table() if self.dialect == 'duckdb' else cursor.fetch_arrow_all()
+        finally:
+            cursor.close()
+        if table is None or table.num_rows == 0:
+            return None
+        table = table.drop([names[column.lower()] for column in spec['partition_by']])
+
+        folders = [
+            f'{column}={NULL_PARTITION if value is None else quote(value, safe="")}'
+            for column, value in zip(spec['partition_by'], key)
+        ]
+        path = '/'.join([model] + folders + [f'part-{state["fingerprint"][:16]}.parquet'])
+        full_path = os.path.join(self.export_dir, *path.split('/'))
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        pq.write_table(table, full_path + '.tmp', compression=self.compression)
+        os.replace(full_path + '.tmp', full_path)
+
+        entry = {
+            'path': path,
+            'partition': dict(zip(spec['partition_by'], key)),
+            'rows': table.num_rows,
+            'bytes': os.path.getsize(full_path),
+            'fingerprint': state['fingerprint'],
+            'exported_at': exported_at,
+        }
+        log.info('Wrote %s: %s rows in %ss', path, table.num_rows,
+                 round(time.monotonic() - partition_started, 2))
+        return entry
+
+    def _remove(self, path):
+        """Delete a file the manifest no longer lists, and its emptied partition folders."""
+        full_path = os.path.join(self.export_dir, *path.split('/'))
+        if os.path.isfile(full_path):
+            os.remove(full_path)
+        folder = os.path.dirname(full_path)
+        root = os.path.abspath(self.export_dir)
+        while os.path.abspath(folder) != root and os.path.isdir(folder) and not os.listdir(folder):
+            os.rmdir(folder)
+            folder = os.path.dirname(folder)
+
+
+def _key(partition, partition_by):
+    """
+    Returns:
+        tuple: Partition values of a manifest entry, in partition_by order
+               (missing columns as a marker, so a changed partition_by never matches)
+    """
+    return tuple(partition.get(column, '\0missing') for column in partition_by) + (
+        ('\0extra',) if set(partition) - set(partition_by) else ()
+    )
+
+
+def _quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _escape(value):
+    return value.replace("'", "''")
@@ -0,0 +1,421 @@
+"""
+================================================================================
+FILE: raw_loader.py
+================================================================================
+
+PURPOSE:
+    Load landed source files into the raw tables at the front of the DAG.
+    Source freshness, late-arrival detection and every watermark incremental
+    read raw.<table>._loaded_at; this is the step that writes it.
+
+LOGIC:
+    1. Files: <landing_dir>/<table>/*.csv | *.json | *.jsonl | *.ndjson,
+       optionally compressed (.gz, .bz2, .xz). A table's files are loaded
+       one after the other in name order, so a later file wins for a key.
+    2. Skip: a file whose sha256 already has a manifest is not read again
+       (re-delivered or renamed copies included)
+    3. Stream: rows are read chunk_rows at a time and written to CSV chunk
+       files. A pool of `workers` threads bulk-loads the chunks into a
+       per-file staging table (Snowflake: PUT + COPY INTO, DuckDB: COPY)
+       while the next chunk is being read.
+    4. Merge, one transaction per file:
+         - dedupe on the table's natural key (last occurrence in the file wins)
+         - drop rows identical to the stored row: no new _loaded_at, so an
+           unchanged re-delivery does not move any watermark
+         - replace stored rows with the same key, insert new keys, all
+           stamped with this load's _loaded_at
+       Rows with a NULL key cannot be matched and are inserted as they are.
+    5. Manifest: <manifest_dir>/<table>/<sha256>.json, written after the
+       commit (file, rows read / duplicate / unchanged / replaced / inserted,
+       chunks, _loaded_at, seconds)
+
+FORMATS:
+    CSV needs a header row naming the columns; an empty field is NULL.
+    JSON files hold one object per line. Columns missing from a file are
+    loaded as NULL; a column the raw table does not have is an error.
+
+USAGE:
+    loader = RawLoader(connection, '/opt/dbt/landing', '/opt/dbt/state/load_manifests',
+                       dialect='snowflake', workers=4)
+    loader.pending()      # [(table, path), ...] not loaded yet
+    summary = loader.load()
+================================================================================
+"""
+
+import bz2
+import csv
+import gzip
+import hashlib
+import json
+import logging
+import lzma
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+
+log = logging.getLogger(__name__)
+
+# raw table → natural key
+RAW_TABLES = {
+    'listings': ('id',),
+    'calendar': ('listing_id', 'date'),
+    'generated_reviews': ('id',),
+    'amenities_changelog': ('listing_id', 'change_at'),
+}
+
+COMPRESSION = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+FORMATS = {'.csv': 'csv', '.json': 'json', '.jsonl': 'json', '.ndjson': 'json'}
+
+# NULL marker in the chunk files
+NULL = '\\N'
+
+LOADED_AT = '_loaded_at'
+FILE_ROW = '_file_row'
+
+
+class RawLoadError(Exception):
+    """Raised when a landed file cannot be loaded (table, format or columns)."""
+
+
+class RawLoader:
+    """
+    Chunked, parallel loader from a landing folder into the raw schema.
+
+    Args:
+        connection: DB-API connection (snowflake.connector or duckdb); one
+                    cursor per worker thread is taken from it
+        landing_dir: Folder with one sub-folder per raw table
+        manifest_dir: Folder for the per-file load manifests
+        dialect: 'snowflake' or 'duckdb'
+        schema: Schema of the raw tables (default 'raw')
+        workers: Chunks bulk-loaded concurrently
+        chunk_rows: Rows per chunk
+    """
+
+    def __init__(self, connection, landing_dir, manifest_dir, dialect='snowflake',
+                 schema='raw', workers=4, chunk_rows=500_000):
+        if dialect not in ('snowflake', 'duckdb'):
+            raise ValueError(f"Unknown dialect {dialect!r}, expected 'snowflake' or 'duckdb'")
+        self.connection = connection
+        self.landing_dir = landing_dir
+        self.manifest_dir = manifest_dir
+        self.dialect = dialect
+        self.schema = schema
+        self.workers = workers
+        self.chunk_rows = chunk_rows
+
+    # -------------------------------------------------------------------------
+    # Files
+    # -------------------------------------------------------------------------
+
+    def files(self):
+        """
+        Returns:
+            list: (table, path) of every landed file, by table then file name
+        """
+        found = []
+        for table in RAW_TABLES:
+            folder = os.path.join(self.landing_dir, table)
+            if not os.path.isdir(folder):
+                continue
+            for name in sorted(os.listdir(folder)):
+                path = os.path.join(folder, name)
+                if os.path.isfile(path) and not name.startswith('.'):
+                    _file_format(path)
+                    found.append((table, path))
+        return found
+
+    def _manifest_path(self, table, sha256):
+        return os.path.join(self.manifest_dir, table, f'{sha256}.json')
+
+    def pending(self):
+        """
+        Returns:
+            list: (table, path) of landed files without a load manifest
+        """
+        return [
+            (table, path) for table, path in self.files()
+            if not os.path.isfile(self._manifest_path(table, _sha256(path)))
+        ]
+
+    # -------------------------------------------------------------------------
+    # Load
+    # -------------------------------------------------------------------------
+
+    def load(self, loaded_at=None):
+        """
+        Load every pending file.
+
+        Args:
+            loaded_at: _loaded_at to stamp (default: now, UTC)
+
+        Returns:
+            dict: {'loaded_at', 'files': [manifest, ...], 'skipped': [path, ...],
+                   'tables': {table: rows replaced + inserted}}
+        """
+        loaded_at = (loaded_at or datetime.now(timezone.utc).replace(tzinfo=None)).isoformat(sep=' ')
+        summary = {'loaded_at': loaded_at, 'files': [], 'skipped': [], 'tables': {}}
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='raw-load') as pool:
+            for table, path in self.files():
+                sha256 = _sha256(path)
+                if os.path.isfile(self._manifest_path(table, sha256)):
+                    summary['skipped'].append(path)
+                    continue
+                manifest = self._load_file(pool, table, path, sha256, loaded_at)
+                summary['files'].append(manifest)
+                summary['tables'][table] = (
+                    summary['tables'].get(table, 0) + manifest['rows_replaced'] + manifest['rows_inserted']
+                )
+        return summary
+
+    def _columns(self, table):
+        """
+        Returns:
+            dict: {column name as the warehouse spells it: data type} of raw.<table>
+        """
+        cursor = self.connection.cursor()
+        cursor.execute(f"""
+            select column_name, data_type
+            from information_schema.columns
+            where lower(table_schema) = '{self.schema.lower()}' and lower(table_name) = '{table}'
+            order by ordinal_position
+        """)
+        columns = dict(cursor.fetchall())
+        if not columns:
+            raise RawLoadError(f'{self.schema}.{table} does not exist')
+        return columns
+
+    def _load_file(self, pool, table, path, sha256, loaded_at):
+        """Stage, merge and record one file. Returns its manifest."""
+        started = time.monotonic()
+        target = f'{self.schema}.{table}'
+        types = {c: t for c, t in self._columns(table).items() if c.lower() != LOADED_AT}
+        table_columns = {c.lower(): c for c in types}
+        keys = [table_columns[k] for k in RAW_TABLES[table]]
+        stage = f'{self.schema}._load_{table}_{sha256[:12]}'
+        changes = f'{stage}_changes'
+        transient = 'transient ' if self.dialect == 'snowflake' else ''
+
+        rows = _read_rows(path, table_columns)
+        file_columns = next(rows)
+        missing_keys = [k for k in keys if k not in file_columns]
+        if missing_keys:
+            raise RawLoadError(f'{path}: natural key column(s) {missing_keys} missing')
+
+        columns = list(table_columns.values())
+        staged = ', '.join(_quote(c) for c in file_columns)
+        cursor = self.connection.cursor()
+        cursor.execute(
+            f'create or replace {transient}table {stage} as '
+            f'select {staged}, cast(0 as bigint) as {FILE_ROW} from {target} where 1 = 0'
+        )
+
+        chunk_dir = tempfile.mkdtemp(prefix=f'raw_{table}_')
+        rows_read = chunks = 0
+        try:
+            futures = []
+            for chunk in _chunks(rows, self.chunk_rows):
+                chunk_path = os.path.join(chunk_dir, f'chunk_{chunks:05d}.csv')
+                with open(chunk_path, 'w', newline='', encoding='utf-8') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(file_columns + [FILE_ROW])
+                    for row in chunk:
+                        rows_read += 1
+                        writer.writerow([NULL if v is None else v for v in row] + [rows_read])
+                futures.append(pool.submit(self._load_chunk, stage, file_columns, chunk_path))
+                chunks += 1
+                # Bound the chunk files on disk to what the workers can take
+                while len([f for f in futures if not f.done()]) > self.workers * 2:
+                    next(f for f in futures if not f.done()).result()
+            for future in futures:
+                future.result()
+
+            # Latest occurrence per key, classified against the stored rows.
+            # Columns the file lacks are NULL (the stage holds only the file's)
+            values = {
+                c: f's.{_quote(c)}' if c in file_columns else f'cast(null as {types[c]})'
+                for c in columns
+            }
+            key_match = ' and '.join(f't.{_quote(k)} = s.{_quote(k)}' for k in keys)
+            same_row = ' and '.join(
+                f't.{_quote(c)} is not distinct from {values[c]}' for c in columns
+            )
+            select = ', '.join(f'{values[c]} as {_quote(c)}' for c in columns)
+            cursor.execute(f"""
+                create or replace {transient}table {changes} as
+                select
+                    {select},
+                    case
+                        when not exists (select 1 from {target} t where {key_match}) then 'insert'
+                        when exists (select 1 from {target} t where {key_match} and {same_row}) then 'unchanged'
+                        else 'replace'
+                    end as _change
+                from {stage} s
+                qualify {' or '.join(f's.{_quote(k)} is null' for k in keys)}
+                     or row_number() over (partition by {', '.join(f's.{_quote(k)}' for k in keys)}
+                                           order by s.{FILE_ROW} desc) = 1
+            """)
+            cursor.execute(f'select _change, count(*) from {changes} group by _change')
+            counts = dict(cursor.fetchall())
+
+            column_list = ', '.join(_quote(c) for c in columns)
+            cursor.execute('begin')
+            try:
+                cursor.execute(f"""
+                    delete from {target}
+                    where exists (
+                        select 1 from {changes} s
+                        where s._change = 'replace'
+                          and {' and '.join(f's.{_quote(k)} = {target}.{_quote(k)}' for k in keys)}
+                    )
+                """)
+                cursor.execute(f"""
+                    insert into {target} ({column_list}, {_quote(LOADED_AT)})
+                    select {column_list}, cast('{loaded_at}' as timestamp)
+                    from {changes}
+                    where _change <> 'unchanged'
+                """)
+                cursor.execute('commit')
+            except Exception:
+                cursor.execute('rollback')
+                raise
+        finally:
+            shutil.rmtree(chunk_dir, ignore_errors=True)
+            for name in (stage, changes):
+                cursor.execute(f'drop table if exists {name}')
+
+        deduped = sum(counts.values())
+        manifest = {
+            'table': table,
+            'file': path,
+            'sha256': sha256,
+            'bytes': os.path.getsize(path),
+            'chunks': chunks,
+            'rows_read': rows_read,
+            'rows_duplicate': rows_read - deduped,
+            'rows_unchanged': counts.get('unchanged', 0),
+            'rows_replaced': counts.get('replace', 0),
+            'rows_inserted': counts.get('insert', 0),
+            'loaded_at': loaded_at,
+            'seconds': round(time.monotonic() - started, 2),
+        }
+        manifest_path = self._manifest_path(table, sha256)
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        with open(manifest_path + '.tmp', 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(manifest_path + '.tmp', manifest_path)
+        log.info('Loaded %s', manifest)
+        return manifest
+
+    def _load_chunk(self, stage, columns, path):
+        """Bulk-load one chunk file into the staging table (worker thread)."""
+        cursor = self.connection.cursor()
+        column_list = ', '.join(_quote(c) for c in columns + [FILE_ROW])
+        try:
+            if self.dialect == 'snowflake':
+                schema, name = stage.split('.')
+                table_stage = f'@{schema}.%{name}'
+                cursor.execute(f"put 'file://{path}' {table_stage} auto_compress=true overwrite=true")
+                cursor.execute(f"""
+                    copy into {stage} ({column_list})
+                    from {table_stage}
+                    files = ('{os.path.basename(path)}.gz')
+                    file_format = (
+                        type = csv skip_header = 1 field_optionally_enclosed_by = '"'
+                        escape_unenclosed_field = none null_if = ('\\\\N') empty_field_as_null = false
+                    )
+                    purge = true
+                """)
+            else:
+                cursor.execute(f"copy {stage} ({column_list}) from '{path}' (header true, null '{NULL}')")
+        finally:
+            cursor.close()
+            os.remove(path)
+
+
+def _quote(column):
+    return f'"{column}"'
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _file_format(path):
+    """
+    Returns:
+        tuple: (opener, 'csv' | 'json') from the file extension
+    """
+    base, ext = os.path.splitext(path.lower())
+    opener = COMPRESSION.get(ext)
+    if opener:
+        ext = os.path.splitext(base)[1]
+    if ext not in FORMATS:
+        raise RawLoadError(f'{path}: unsupported file type (expected .csv / .json / .jsonl / .ndjson, optionally .gz / .bz2 / .xz)')
+    return opener or open, FORMATS[ext]
+
+
+def _read_rows(path, table_columns):
+    """
+    Stream a landed file.
+
+    Args:
+        path: Landed file
+        table_columns: {lowercase name: warehouse name} of the raw table
+
+    Yields:
+        list: First the file's columns (warehouse names), then one list of
+              values per row (None = NULL)
+    """
+    opener, file_format = _file_format(path)
+    with opener(path, 'rt', newline='', encoding='utf-8') as f:
+        if file_format == 'csv':
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                raise RawLoadError(f'{path}: empty file (a CSV needs a header row)')
+            unknown = [c for c in header if c.lower() not in table_columns]
+            if unknown:
+                raise RawLoadError(f'{path}: column(s) {unknown} not loadable (not in the raw table, or _loaded_at)')
+            yield [table_columns[c.lower()] for c in header]
+            for row in reader:
+                yield [v if v != '' else None for v in row]
+        else:
+            columns = list(table_columns.values())
+            yield columns
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                record = {k.lower(): v for k, v in json.loads(line).items()}
+                unknown = [k for k in record if k not in table_columns]
+                if unknown:
+                    raise RawLoadError(f'{path}:{line_number}: key(s) {unknown} not loadable (not in the raw table, or _loaded_at)')
+                yield [_json_value(record.get(c.lower())) for c in columns]
+
+
+def _json_value(value):
+    """Nested values (e.g. the amenities array) are stored as JSON text."""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+
+def _chunks(rows, size):
+    """Yields: Lists of up to `size` rows from an iterator."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
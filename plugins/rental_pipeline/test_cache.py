@@ -0,0 +1,169 @@
+"""
+================================================================================
+FILE: test_cache.py
+================================================================================
+
+PURPOSE:
+    Skip data tests whose last run passed on exactly the same inputs. A test
+    result only changes when the test, the model it checks or something
+    upstream of that model changes, so re-running it on an unchanged model
+    only costs warehouse time.
+
+LOGIC:
+    1. fingerprints(): per test, a sha256 over
+         - the test itself (checksum, arguments, config)
+         - every node upstream of it, recursively: model checksum + config
+           (full_refresh included), the SQL of the macros it calls, and for
+           sources the max(_loaded_at) of this run (sources.json)
+         - today's date for models tagged current_date
+       A source without a freshness result makes the fingerprint None
+       (never cached).
+    2. cached(): tests whose stored fingerprint matches and whose last
+       result was pass - the build excludes them
+    3. record(): after the build, store the fingerprint of every test that
+       passed; forget tests that failed, warned or errored, so they run
+       again next time
+
+    The cache is a JSON file next to the saved build state
+    (DBT_STATE_DIR/test_cache.json). Deleting it re-runs every test.
+
+USAGE:
+    cache = TestCache('/opt/dbt/state/test_cache.json')
+    fingerprints = cache.fingerprints(manifest, loaded_at)
+    results = session.build(exclude=cache.cached(fingerprints))
+    cache.record(fingerprints, results)
+================================================================================
+"""
+
+import hashlib
+import json
+import os
+from datetime import date, datetime, timezone
+
+from rental_pipeline.build_state import CURRENT_DATE_TAG
+
+
+class TestCache:
+    """
+    Last passing fingerprint per data test.
+
+    Args:
+        path: JSON file holding the cache
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            return {}
+        with open(self.path) as f:
+            return json.load(f)
+
+    def fingerprints(self, manifest, loaded_at, today=None):
+        """
+        Input fingerprint of every data test in the manifest.
+
+        Args:
+            manifest: Parsed manifest.json of this run
+            loaded_at: {source unique_id: max_loaded_at} of this run
+            today: Date for current_date-tagged models (default: today)
+
+        Returns:
+            dict: {test name: sha256 hex, or None when an input has no state}
+        """
+        today = (today or date.today()).isoformat()
+        nodes = {**manifest['nodes'], **manifest['sources']}
+        macros = manifest['macros']
+        node_hashes, macro_hashes = {}, {}
+
+        def macro_hash(unique_id):
+            if unique_id not in macro_hashes:
+                macro_hashes[unique_id] = ''  # recursion guard
+                macro = macros.get(unique_id) or {}
+                parts = [macro.get('macro_sql', '')]
+                parts += [macro_hash(m) for m in sorted(macro.get('depends_on', {}).get('macros', []))]
+                macro_hashes[unique_id] = _sha(parts)
+            return macro_hashes[unique_id]
+
+        def node_hash(unique_id):
+            if unique_id in node_hashes:
+                return node_hashes[unique_id]
+            node = nodes.get(unique_id)
+            if node is None:
+                digest = None
+            elif node['resource_type'] == 'source':
+                loaded = loaded_at.get(unique_id)
+                digest = _sha([unique_id, loaded]) if loaded is not None else None
+            else:
+                parents = [node_hash(p) for p in sorted(node['depends_on']['nodes'])]
+                if None in parents:
+                    digest = None
+                else:
+                    digest = _sha([
+                        unique_id,
+                        node.get('checksum', {}).get('checksum'),
+                        node.get('test_metadata'),
+                        node.get('config'),
+                        [macro_hash(m) for m in sorted(node['depends_on'].get('macros', []))],
+                        today if CURRENT_DATE_TAG in node.get('tags', []) else None,
+                        parents,
+                    ])
+            node_hashes[unique_id] = digest
+            return digest
+
+        return {
+            node['name']: node_hash(unique_id)
+            for unique_id, node in manifest['nodes'].items()
+            if node['resource_type'] == 'test'
+        }
+
+    def cached(self, fingerprints):
+        """
+        Returns:
+            list: Sorted names of tests that passed last time on the same fingerprint
+        """
+        entries = self._load()
+        return sorted(
+            name for name, fingerprint in fingerprints.items()
+            if fingerprint is not None
+            and entries.get(name, {}).get('fingerprint') == fingerprint
+            and entries[name].get('status') == 'pass'
+        )
+
+    def record(self, fingerprints, results):
+        """
+        Store this build's test outcomes.
+
+        Args:
+            fingerprints: fingerprints() computed before the build
+            results: DbtSession.build() results ({node name: result})
+
+        Returns:
+            dict: {'stored': n, 'forgotten': n}
+        """
+        entries = self._load()
+        now = datetime.now(timezone.utc).isoformat()
+        stored = forgotten = 0
+        for name, result in results.items():
+            if result.get('resource_type') != 'test' or result['status'] == 'skipped':
+                continue
+            if result['status'] == 'pass' and fingerprints.get(name) is not None:
+                entries[name] = {'fingerprint': fingerprints[name], 'status': 'pass', 'checked_at': now}
+                stored += 1
+            elif entries.pop(name, None) is not None:
+                forgotten += 1
+        # Tests removed from the project
+        for name in [n for n in entries if n not in fingerprints]:
+            del entries[name]
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        staged = self.path + '.tmp'
+        with open(staged, 'w') as f:
+            json.dump(entries, f, indent=2, sort_keys=True)
+        os.replace(staged, self.path)
+        return {'stored': stored, 'forgotten': forgotten}
+
+
+def _sha(parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()